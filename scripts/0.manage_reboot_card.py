@@ -2,15 +2,45 @@
 """
 Script de monitoring et récupération automatique des cartes Nokia SROS
 Vérifie l'état de la carte 1 et effectue un reboot si nécessaire
+
+Deux modes :
+    - ssh : un thread netmiko par routeur (ROUTERS), pour quelques routeurs
+    - nso : asyncio via NSO live-status (show card 1 / admin reboot now), une
+      coroutine par routeur et un budget fixe de requêtes simultanées, pour
+      surveiller des milliers de routeurs depuis un seul processus
+
+Les reboots sont ordonnancés selon la topologie IGP (miroir de routage du
+script 7 ou Neo4j) : plusieurs routeurs rebootent en parallèle seulement si
+leur perte simultanée ne coupe pas le graphe IGP.
+
+Usage:
+    python 0.manage_reboot_card.py
+    python 0.manage_reboot_card.py --mode nso --group ALL-SROS --concurrency 100
+    python 0.manage_reboot_card.py --mode nso --all --max-reboots 8 --topology neo4j
 """
 
+import argparse
+import asyncio
+import os
+import random
 import time
 import re
+import socket
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from netmiko import ConnectHandler
-from netmiko.exceptions import NetmikoTimeoutException, NetmikoAuthenticationException
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime
+from typing import Optional
+
+from nso_client import LIVE_STATUS_TTLS, LiveStatusCache, NSOClient, NSOConfig
+from topology_mirror import RoutingGraphMirror
+
+try:
+    from netmiko import ConnectHandler
+    from netmiko.exceptions import NetmikoTimeoutException, NetmikoAuthenticationException
+except ImportError:
+    ConnectHandler = None
+    NetmikoTimeoutException = NetmikoAuthenticationException = None
 
 # Configuration
 ROUTERS = [
@@ -19,18 +49,21 @@ ROUTERS = [
         'host': 'clab-SDN-R1',
         'username': 'admin',
         'password': 'admin',
+        'nso_device': 'R1',
     },
     # R2
     {
         'host': 'clab-SDN-R2',
         'username': 'admin',
         'password': 'admin',
+        'nso_device': 'R2',
     },
     # R3
     {
         'host': 'clab-SDN-R3',
         'username': 'admin',
         'password': 'admin',
+        'nso_device': 'R3',
     },    
 ]
 
@@ -39,9 +72,20 @@ CHECK_INTERVAL = 10      # Intervalle de vérification en secondes (état bootin
 REBOOT_TIMEOUT = 180     # Timeout pour attendre le retour après reboot (3 min)
 SSH_RETRY_INTERVAL = 10  # Intervalle entre les tentatives de connexion SSH
 MAX_RETRIES = 100         # Nombre maximum de tentatives de connexion
+SSH_KEEPALIVE = 30       # Keepalive des sessions SSH gardées ouvertes entre deux polls (s)
 
-# Lock global pour s'assurer qu'un seul reboot se fait à la fois
-reboot_lock = threading.Lock()
+# Paramètres du mode nso (asyncio)
+NSO_MAX_CONCURRENT = 50  # Requêtes live-status simultanées (budget fixe, quel que soit le nombre de routeurs)
+NSO_TIMEOUT = 30         # Timeout d'une commande live-status (s)
+NSO_RETRY_INTERVAL = 30  # Attente entre deux tentatives sur un routeur injoignable (s)
+
+# Ordonnancement des reboots
+MAX_PARALLEL_REBOOTS = 4 # Reboots simultanés max (si la topologie IGP le permet)
+ROUTING_MIRROR_FILE = "7.RESULT_ROUTING_MIRROR.npz"
+NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+NEO4J_USER = os.getenv("NEO4J_USERNAME", "neo4j")
+NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
 
 
 def log(message, router_host=None):
@@ -69,14 +113,170 @@ def format_duration(seconds):
     return " ".join(parts)
 
 
-def connect_to_router(router_config):
-    """Établit une connexion SSH au routeur"""
+# ============================================================
+# REBOOT SCHEDULER
+# ============================================================
+
+def load_igp_topology(source, mirror_file=ROUTING_MIRROR_FILE):
+    """
+    Graphe IGP non orienté {routeur: voisins} : PROD_ROUTER / PROD_ROUTING_LINK
+    depuis le miroir de routage (script 7) ou Neo4j. None si indisponible.
+    """
+    if source == "none":
+        return None
+    
+    try:
+        if source == "mirror":
+            mirror = RoutingGraphMirror.load(mirror_file)
+            columns = mirror.edge_columns()
+            names = mirror.names
+            links = [
+                (names[src], names[dst])
+                for src, dst in zip(columns["sourceNodeId"].tolist(), columns["targetNodeId"].tolist())
+            ]
+        else:
+            from neo4j import GraphDatabase
+            
+            with GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD)) as driver:
+                driver.verify_connectivity()
+                records, _, _ = driver.execute_query(
+                    "MATCH (r:PROD_ROUTER) "
+                    "OPTIONAL MATCH (r)-[:PROD_ROUTING_LINK]->(n:PROD_ROUTER) "
+                    "RETURN r.name AS name, collect(n.name) AS neighbors",
+                    database_=NEO4J_DATABASE
+                )
+            names = [record["name"] for record in records]
+            links = [(record["name"], neighbor) for record in records for neighbor in record["neighbors"]]
+    except Exception as e:
+        log(f"Topologie IGP indisponible ({source}: {str(e)}), reboots sérialisés")
+        return None
+    
+    graph = {name: set() for name in names}
+    for src, dst in links:
+        graph[src].add(dst)
+        graph[dst].add(src)
+    log(f"Topologie IGP ({source}): {len(graph)} routeurs, {sum(len(n) for n in graph.values()) // 2} liens")
+    return graph
+
+
+def topology_name(router_config):
+    """Nom du routeur dans la topologie (nom du device NSO)"""
+    return router_config.get('nso_device', router_config['host'])
+
+
+class RebootScheduler:
+    """
+    Remplace le verrou global de reboot : jusqu'à max_concurrent reboots
+    simultanés, à condition que la perte simultanée des routeurs en reboot
+    ne coupe pas le graphe IGP : dans chaque composante connexe d'origine,
+    les routeurs restants doivent rester connexes (une composante entièrement
+    en reboot, ex. un routeur isolé, ne masque pas une coupure ailleurs).
+    
+    Un routeur peut toujours rebooter seul, comme avec le verrou. Sans
+    topologie, ou pour un routeur absent de la topologie, les reboots sont
+    sérialisés. Les demandes en attente sont réévaluées à chaque fin de
+    reboot. Utilisable depuis des threads (slot) ou des coroutines (async_slot).
+    """
+    
+    def __init__(self, topology=None, max_concurrent=MAX_PARALLEL_REBOOTS):
+        self.topology = topology
+        self.max_concurrent = max(1, max_concurrent)
+        self.rebooting = set()
+        self.peak = 0
+        self._component = self._component_ids() if topology else {}
+        self._condition = threading.Condition()
+        self._async_condition = None
+    
+    def _component_ids(self, removed=()):
+        """Composante connexe de chaque routeur du graphe IGP privé des routeurs removed"""
+        component = {}
+        for start in self.topology:
+            if start in component or start in removed:
+                continue
+            component[start] = start
+            stack = [start]
+            while stack:
+                for neighbor in self.topology[stack.pop()]:
+                    if neighbor not in component and neighbor not in removed:
+                        component[neighbor] = start
+                        stack.append(neighbor)
+        return component
+    
+    def _splits(self, removed):
+        """True si une composante d'origine est coupée en plusieurs par le retrait de removed"""
+        after = self._component_ids(removed)
+        return len(set(after.values())) > len({self._component[router] for router in after})
+    
+    def blocker(self, router):
+        """Raison pour laquelle router ne peut pas rebooter maintenant (None = autorisé)"""
+        if not self.rebooting:
+            return None
+        if len(self.rebooting) >= self.max_concurrent:
+            return f"{len(self.rebooting)} reboot(s) en cours (max {self.max_concurrent})"
+        if self.topology is None:
+            return "topologie indisponible, reboots sérialisés"
+        down = self.rebooting | {router}
+        unknown = sorted(name for name in down if name not in self.topology)
+        if unknown:
+            return f"{', '.join(unknown)} absent(s) de la topologie"
+        if self._splits(down):
+            return f"la perte simultanée de {', '.join(sorted(down))} couperait le graphe IGP"
+        return None
+    
+    def _start(self, router):
+        self.rebooting.add(router)
+        self.peak = max(self.peak, len(self.rebooting))
+        log(f"Créneau de reboot obtenu ({len(self.rebooting)} en cours)", router)
+    
+    @contextmanager
+    def slot(self, router):
+        """Créneau de reboot (threads)"""
+        with self._condition:
+            reason = self.blocker(router)
+            if reason:
+                log(f"Reboot en attente: {reason}", router)
+            self._condition.wait_for(lambda: self.blocker(router) is None)
+            self._start(router)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.rebooting.discard(router)
+                self._condition.notify_all()
+    
+    @asynccontextmanager
+    async def async_slot(self, router):
+        """Créneau de reboot (coroutines, boucle asyncio courante)"""
+        if self._async_condition is None:
+            self._async_condition = asyncio.Condition()
+        condition = self._async_condition
+        async with condition:
+            reason = self.blocker(router)
+            if reason:
+                log(f"Reboot en attente: {reason}", router)
+            await condition.wait_for(lambda: self.blocker(router) is None)
+            self._start(router)
+        try:
+            yield
+        finally:
+            async with condition:
+                self.rebooting.discard(router)
+                condition.notify_all()
+
+
+# ============================================================
+# MODE SSH (NETMIKO)
+# ============================================================
+
+def connect_to_router(router_config, keepalive=0):
+    """Établit une connexion SSH au routeur (keepalive SSH en secondes, 0 = aucun)"""
     device = {
         'device_type': 'nokia_sros',
         'host': router_config['host'],
         'username': router_config['username'],
         'password': router_config['password'],
         'timeout': 30,
+        'keepalive': keepalive,
         'session_log': f"session_{router_config['host']}.log"
     }
     
@@ -95,24 +295,99 @@ def connect_to_router(router_config):
         return None
 
 
-def get_card_status(connection, router_host):
-    """Récupère le statut de la carte 1"""
+class SSHSessionPool:
+    """
+    Une session SSH authentifiée par routeur, gardée ouverte par keepalive
+    et réutilisée d'un poll à l'autre : un login seulement à la première
+    utilisation ou après une perte de session (reboot, coupure).
+    """
+    
+    def __init__(self, keepalive=SSH_KEEPALIVE):
+        self.keepalive = keepalive
+        self.logins = 0
+        self._sessions = {}
+        self._lock = threading.Lock()
+    
+    def get(self, router_config):
+        """Session du routeur, reconnectée si elle n'est plus vivante (None si échec)"""
+        router_host = router_config['host']
+        with self._lock:
+            connection = self._sessions.get(router_host)
+        
+        if connection is not None:
+            try:
+                if connection.is_alive():
+                    return connection
+            except Exception:
+                pass
+            log("Session SSH perdue, reconnexion", router_host)
+            self.invalidate(router_host)
+        
+        connection = connect_to_router(router_config, keepalive=self.keepalive)
+        if connection:
+            with self._lock:
+                self._sessions[router_host] = connection
+                self.logins += 1
+        return connection
+    
+    def invalidate(self, router_host):
+        """Ferme et oublie la session d'un routeur"""
+        with self._lock:
+            connection = self._sessions.pop(router_host, None)
+        if connection is not None:
+            try:
+                connection.disconnect()
+            except Exception:
+                pass
+    
+    def send_command(self, router_config, command):
+        """Commande sur la session du routeur, avec une reconnexion si la session a lâché"""
+        for _ in range(2):
+            connection = self.get(router_config)
+            if connection is None:
+                return None
+            try:
+                return connection.send_command(command)
+            except Exception as e:
+                log(f"Échec de la commande sur la session ({str(e)}), reconnexion", router_config['host'])
+                self.invalidate(router_config['host'])
+        return None
+    
+    def close_all(self):
+        for router_host in list(self._sessions):
+            self.invalidate(router_host)
+
+
+def parse_card_state(output):
+    """
+    Extrait (admin, oper) de la sortie de show card 1, None si absent
+    Format: "1    xcm-1s    up    failed/booting/up    [...]"
+    """
+    match = re.search(
+        r'^1\s+\S+\s+(?P<admin_state>\w+)\s+(?P<oper_state>\w+)',
+        output,
+        re.MULTILINE
+    )
+    if not match:
+        return None
+    return match.group('admin_state').lower(), match.group('oper_state').lower()
+
+
+def get_card_status(pool, router_config):
+    """Récupère le statut de la carte 1 (session SSH du pool)"""
+    router_host = router_config['host']
     try:
         # Commande pour vérifier l'état de la carte 1
-        output = connection.send_command("show card 1")
+        output = pool.send_command(router_config, "show card 1")
+        if output is None:
+            log("Routeur injoignable en SSH", router_host)
+            return None
         
         # Parser la sortie pour extraire l'état
-        # Format: "1    xcm-1s    up    failed/booting/up    [...]"
-
-        match = re.search(
-            r'^1\s+\S+\s+(?P<admin_state>\w+)\s+(?P<oper_state>\w+)',
-            output,
-            re.MULTILINE
-        )
+        state = parse_card_state(output)
         
-        if match:
-            admin_state = match.group('admin_state').lower()
-            oper_state = match.group('oper_state').lower()
+        if state:
+            admin_state, oper_state = state
             
             log(f"État de la carte 1 - Admin: {admin_state}, Oper: {oper_state}", router_host)
             
@@ -128,8 +403,13 @@ def get_card_status(connection, router_host):
         return None
 
 
-def reboot_router(connection, router_host):
+def reboot_router(pool, router_config):
     """Effectue un reboot administratif du routeur"""
+    router_host = router_config['host']
+    connection = pool.get(router_config)
+    if connection is None:
+        return False
+    
     try:
         log("Lancement du reboot administratif", router_host)
         
@@ -137,16 +417,33 @@ def reboot_router(connection, router_host):
         time.sleep(3)
         
         log("Commande de reboot envoyée", router_host)
-        return True
         
     except:
         # Toute erreur est acceptable ici
         log("Commande de reboot envoyée (connexion interrompue)", router_host)
-        return True
+    
+    # La session ne survit pas au reboot
+    pool.invalidate(router_host)
+    return True
+
 
+def ssh_port_open(host, port=22, timeout=5):
+    """Test TCP du port SSH (sans login)"""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
 
-def wait_for_router_online(router_config, timeout=REBOOT_TIMEOUT):
-    """Attend que le routeur soit accessible en SSH"""
+
+def wait_for_router_online(router_config, pool, timeout=REBOOT_TIMEOUT):
+    """
+    Attend que le routeur soit accessible en SSH.
+    
+    Le port 22 est sondé en TCP ; le login n'est tenté qu'une fois le port
+    ouvert, et la session obtenue reste dans le pool pour la suite du
+    monitoring.
+    """
     router_host = router_config['host']
     log(f"Attente de la disponibilité SSH du routeur (timeout: {timeout}s)", router_host)
     
@@ -154,24 +451,20 @@ def wait_for_router_online(router_config, timeout=REBOOT_TIMEOUT):
     attempt = 1
     
     while time.time() - start_time < timeout:
-        log(f"Tentative de connexion SSH #{attempt}...", router_host)
-        
-        # Tenter une connexion SSH
-        connection = connect_to_router(router_config)
+        if ssh_port_open(router_host):
+            log(f"Port SSH ouvert, connexion #{attempt}...", router_host)
+            if pool.get(router_config):
+                log("✓ Connexion SSH établie avec succès", router_host)
+                return True
+            attempt += 1
         
-        if connection:
-            log("✓ Connexion SSH établie avec succès", router_host)
-            connection.disconnect()
-            return True
-        
-        attempt += 1
         time.sleep(SSH_RETRY_INTERVAL)
     
     log("Timeout: le routeur n'est pas accessible en SSH", router_host)
     return False
 
 
-def monitor_card(router_config):
+def monitor_card(router_config, pool, scheduler):
     """
     Surveille l'état de la carte 1 d'un routeur et effectue les actions nécessaires
     """
@@ -182,20 +475,18 @@ def monitor_card(router_config):
     while attempt < MAX_RETRIES:
         attempt += 1
         
-        # Connexion au routeur
-        connection = connect_to_router(router_config)
-        if not connection:
+        # Session SSH du routeur (login seulement si aucune session vivante)
+        if not pool.get(router_config):
             log(f"Tentative {attempt}/{MAX_RETRIES} échouée", router_host)
             time.sleep(30)
             continue
         
         try:
             # Vérification du statut de la carte
-            status = get_card_status(connection, router_host)
+            status = get_card_status(pool, router_config)
             
             if status == 'up':
                 log("✓ Carte 1 est UP - OK", router_host)
-                connection.disconnect()
                 return {'host': router_host, 'status': 'OK', 'card_state': 'up'}
             
             elif status == 'booting':
@@ -204,11 +495,10 @@ def monitor_card(router_config):
                 # Attendre que la carte passe à up ou failed
                 while True:
                     time.sleep(CHECK_INTERVAL)
-                    status = get_card_status(connection, router_host)
+                    status = get_card_status(pool, router_config)
                     
                     if status == 'up':
                         log("✓ Carte 1 est maintenant UP", router_host)
-                        connection.disconnect()
                         return {'host': router_host, 'status': 'OK', 'card_state': 'up'}
                     
                     elif status == 'failed':
@@ -224,20 +514,17 @@ def monitor_card(router_config):
             
             else:
                 log(f"État inconnu ou problème: {status}", router_host)
-                connection.disconnect()
                 return {'host': router_host, 'status': 'ERROR', 'card_state': status}
             
             # Si on arrive ici, la carte est failed, il faut rebooter
-            # Utiliser le lock pour s'assurer qu'un seul reboot se fait à la fois
-            with reboot_lock:
-                log("Acquisition du verrou de reboot", router_host)
+            # Le scheduler n'autorise que des reboots simultanés sans coupure du graphe IGP
+            with scheduler.slot(topology_name(router_config)):
                 
                 # Reboot du routeur
-                if reboot_router(connection, router_host):
-                    connection.disconnect()
+                if reboot_router(pool, router_config):
                     
                     # Attendre que le routeur redémarre (vérification SSH)
-                    if wait_for_router_online(router_config):
+                    if wait_for_router_online(router_config, pool):
                         log("Routeur de nouveau accessible, relance du monitoring...", router_host)
                         # Réinitialiser le compteur pour relancer le monitoring
                         attempt = 0
@@ -247,34 +534,28 @@ def monitor_card(router_config):
                         log("Le routeur n'est pas revenu en ligne", router_host)
                         return {'host': router_host, 'status': 'TIMEOUT', 'card_state': 'failed'}
                 else:
-                    connection.disconnect()
                     return {'host': router_host, 'status': 'REBOOT_FAILED', 'card_state': 'failed'}
         
         except Exception as e:
             log(f"Erreur inattendue: {str(e)}", router_host)
-            try:
-                connection.disconnect()
-            except:
-                pass
+            pool.invalidate(router_host)
             time.sleep(30)
     
     log(f"Nombre maximum de tentatives atteint ({MAX_RETRIES})", router_host)
     return {'host': router_host, 'status': 'MAX_RETRIES_EXCEEDED', 'card_state': 'unknown'}
 
 
-def main():
-    """Fonction principale"""
-    start_time = time.time()
-
-    log("=" * 80)
-    log("Démarrage du monitoring des routeurs Nokia SROS")
-    log(f"Nombre de routeurs à surveiller: {len(ROUTERS)}")
-    log("=" * 80)
+def run_ssh(routers, scheduler):
+    """Mode ssh : un thread netmiko par routeur"""
+    if ConnectHandler is None:
+        raise SystemExit("✗ netmiko n'est pas installé (pip install netmiko), utiliser --mode nso")
+    
+    pool = SSHSessionPool()
     
     # Exécution en parallèle avec ThreadPoolExecutor
-    with ThreadPoolExecutor(max_workers=len(ROUTERS)) as executor:
+    with ThreadPoolExecutor(max_workers=len(routers)) as executor:
         # Soumettre toutes les tâches
-        futures = {executor.submit(monitor_card, router): router for router in ROUTERS}
+        futures = {executor.submit(monitor_card, router, pool, scheduler): router for router in routers}
         
         # Récupérer les résultats au fur et à mesure
         results = []
@@ -287,8 +568,240 @@ def main():
             except Exception as e:
                 log(f"Erreur pour {router['host']}: {str(e)}")
                 results.append({'host': router['host'], 'status': 'EXCEPTION', 'error': str(e)})
+    
+    pool.close_all()
+    log(f"Logins SSH: {pool.logins} pour {len(routers)} routeurs")
+    return results
+
+
+# ============================================================
+# MODE NSO (ASYNCIO, LIVE-STATUS)
+# ============================================================
+
+class AsyncCardMonitor:
+    """
+    Surveillance de la carte 1 via NSO live-status, une coroutine par routeur.
+    
+    Les attentes (carte en démarrage, reboot) ne consomment rien : seules
+    les commandes live-status passent par le sémaphore, qui fixe le nombre
+    de requêtes simultanées vers NSO quel que soit le nombre de routeurs.
+    Les reboots passent par le RebootScheduler, comme en mode ssh.
+    Les lectures (show card) passent par un LiveStatusCache qui fusionne
+    les demandes simultanées pour un même routeur ; la commande de reboot
+    n'est jamais mise en cache et invalide les entrées du routeur.
+    """
+    
+    def __init__(
+        self,
+        client: NSOClient,
+        max_concurrent: int = NSO_MAX_CONCURRENT,
+        timeout: float = NSO_TIMEOUT,
+        check_interval: float = CHECK_INTERVAL,
+        retry_interval: float = NSO_RETRY_INTERVAL,
+        reboot_timeout: float = REBOOT_TIMEOUT,
+        online_interval: float = SSH_RETRY_INTERVAL,
+        max_retries: int = MAX_RETRIES,
+        scheduler: Optional[RebootScheduler] = None,
+        cache: Optional[LiveStatusCache] = None
+    ):
+        self.client = client
+        self.slots = asyncio.Semaphore(max_concurrent)
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.retry_interval = retry_interval
+        self.reboot_timeout = reboot_timeout
+        self.online_interval = online_interval
+        self.max_retries = max_retries
+        self.scheduler = scheduler or RebootScheduler(max_concurrent=1)
+        # Un état mis en cache ne doit pas survivre à l'intervalle de sondage
+        self.cache = cache or LiveStatusCache(ttls={
+            **LIVE_STATUS_TTLS, "show card": min(LIVE_STATUS_TTLS["show card"], check_interval / 2)
+        })
+    
+    async def _cli(self, device: str, command: str) -> tuple[Optional[str], Optional[str]]:
+        """Commande MD-CLI en live-status : (sortie, erreur), lectures servies par le cache"""
+        if command.startswith("admin "):
+            return await self._run_cli(device, command)
+        return await self.cache.get_or_fetch(
+            device, command,
+            lambda: self._run_cli(device, command),
+            cacheable=lambda result: result[1] is None
+        )
+    
+    async def _run_cli(self, device: str, command: str) -> tuple[Optional[str], Optional[str]]:
+        url = (
+            f"/restconf/operations/tailf-ncs:devices/device={device}/live-status/"
+            f"global-operations/md-cli-raw-command"
+        )
+        payload = {"input": {"md-cli-input-line": command}}
+        async with self.slots:
+            # Pas de reprise : un routeur injoignable est retenté au prochain cycle
+            response = await self.client.post(url, json=payload, timeout=self.timeout, retries=0)
+        if not response.ok:
+            return None, response.error
+        try:
+            return response.data["nokia-oper-global:output"]["results"]["md-cli-output-block"], None
+        except (KeyError, TypeError) as e:
+            return None, f"Invalid response format: {e}"
+    
+    async def get_card_status(self, device: str) -> tuple[Optional[str], Optional[str]]:
+        """État opérationnel de la carte 1 : (état, erreur de connexion)"""
+        output, error = await self._cli(device, "show card 1")
+        if error:
+            return None, error
+        state = parse_card_state(output)
+        if state is None:
+            log("Impossible de déterminer l'état de la carte", device)
+            return None, None
+        log(f"État de la carte 1 - Admin: {state[0]}, Oper: {state[1]}", device)
+        return state[1], None
+    
+    async def reboot(self, device: str) -> None:
+        """Reboot administratif (la perte de connexion pendant la commande est attendue)"""
+        log("Lancement du reboot administratif", device)
+        _, error = await self._cli(device, "admin reboot now")
+        # L'état d'avant reboot ne doit pas répondre à wait_online
+        self.cache.invalidate(device)
+        log("Commande de reboot envoyée" + (" (connexion interrompue)" if error else ""), device)
+    
+    async def wait_online(self, device: str) -> bool:
+        """Attend que le routeur réponde de nouveau en live-status"""
+        log(f"Attente de la disponibilité du routeur (timeout: {self.reboot_timeout}s)", device)
+        deadline = time.monotonic() + self.reboot_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.online_interval)
+            _, error = await self._cli(device, "show card 1")
+            if error is None:
+                log("✓ Routeur de nouveau joignable", device)
+                return True
+        log("Timeout: le routeur n'est pas joignable", device)
+        return False
+    
+    async def monitor(self, device: str) -> dict:
+        """Même logique que monitor_card, sans thread ni connexion SSH"""
+        log("Démarrage de la surveillance", device)
+        
+        attempt = 0
+        while attempt < self.max_retries:
+            attempt += 1
+            status, error = await self.get_card_status(device)
+            
+            if error:
+                log(f"Tentative {attempt}/{self.max_retries} échouée: {error[:100]}", device)
+                await asyncio.sleep(self.retry_interval)
+                continue
+            
+            # Attendre que la carte passe de booting à up ou failed
+            while status == 'booting':
+                log("Carte 1 en cours de démarrage, attente...", device)
+                await asyncio.sleep(self.check_interval)
+                status, error = await self.get_card_status(device)
+                if error:
+                    break
+            
+            if error:
+                continue
+            if status == 'up':
+                log("✓ Carte 1 est UP - OK", device)
+                return {'host': device, 'status': 'OK', 'card_state': 'up'}
+            if status != 'failed':
+                log(f"État inconnu ou problème: {status}", device)
+                return {'host': device, 'status': 'ERROR', 'card_state': status}
+            
+            log("✗ Carte 1 est FAILED", device)
+            async with self.scheduler.async_slot(device):
+                await self.reboot(device)
+                online = await self.wait_online(device)
+            
+            if not online:
+                return {'host': device, 'status': 'TIMEOUT', 'card_state': 'failed'}
+            log("Routeur de nouveau accessible, relance du monitoring...", device)
+            attempt = 0
+        
+        log(f"Nombre maximum de tentatives atteint ({self.max_retries})", device)
+        return {'host': device, 'status': 'MAX_RETRIES_EXCEEDED', 'card_state': 'unknown'}
+    
+    async def run(self, devices: list[str]) -> list[dict]:
+        """Surveille tous les routeurs, résultats au fur et à mesure"""
+        
+        async def staggered(device: str) -> dict:
+            # Premières requêtes étalées sur un intervalle pour éviter une rafale initiale
+            await asyncio.sleep(random.uniform(0, self.check_interval))
+            try:
+                return await self.monitor(device)
+            except Exception as e:
+                log(f"Erreur inattendue: {str(e)}", device)
+                return {'host': device, 'status': 'EXCEPTION', 'error': str(e)}
+        
+        results = []
+        for future in asyncio.as_completed([staggered(device) for device in devices]):
+            result = await future
+            results.append(result)
+            log(f"Terminé pour {result['host']}: {result['status']}")
+        return results
 
 
+async def nso_devices(client: NSOClient, group: Optional[str]) -> list[str]:
+    """Membres d'un device-group NSO, ou tout l'inventaire NSO"""
+    if group:
+        response = await client.get(f"/restconf/data/tailf-ncs:devices/device-group={group}?fields=member")
+        groups = (response.data or {}).get("tailf-ncs:device-group", []) if response.ok else []
+        return groups[0].get("member", []) if groups else []
+    response = await client.get("/restconf/data/tailf-ncs:devices/device?fields=name")
+    return [device["name"] for device in (response.data or {}).get("tailf-ncs:device", [])] if response.ok else []
+
+
+async def run_nso(args, scheduler):
+    """Mode nso : surveillance asyncio via NSO live-status"""
+    async with NSOClient(NSOConfig(limit_per_host=args.concurrency)) as nso:
+        if args.devices:
+            devices = args.devices
+        elif args.group or args.all:
+            devices = await nso_devices(nso, args.group)
+        else:
+            devices = [router['nso_device'] for router in ROUTERS]
+        
+        log(f"Nombre de routeurs à surveiller: {len(devices)} ({args.concurrency} requêtes simultanées max)")
+        monitor = AsyncCardMonitor(nso, max_concurrent=args.concurrency, timeout=args.timeout, scheduler=scheduler)
+        results = await monitor.run(devices)
+        log(monitor.cache.summary())
+        return results
+
+
+def main():
+    """Fonction principale"""
+    parser = argparse.ArgumentParser(description="Monitoring et reboot de la carte 1 des routeurs Nokia SROS")
+    parser.add_argument("--mode", choices=["ssh", "nso"], default="ssh",
+                        help="ssh: netmiko, un thread par routeur de ROUTERS ; nso: asyncio via NSO live-status")
+    parser.add_argument("--devices", nargs="+", help="Devices NSO à surveiller (mode nso, défaut: ROUTERS)")
+    parser.add_argument("--group", help="Device-group NSO à surveiller (mode nso)")
+    parser.add_argument("--all", action="store_true", help="Tout l'inventaire NSO (mode nso)")
+    parser.add_argument("--concurrency", type=int, default=NSO_MAX_CONCURRENT,
+                        help="Requêtes live-status simultanées (mode nso)")
+    parser.add_argument("--timeout", type=float, default=NSO_TIMEOUT, help="Timeout d'une commande live-status (s)")
+    parser.add_argument("--max-reboots", type=int, default=MAX_PARALLEL_REBOOTS,
+                        help="Reboots simultanés max (1 = un seul à la fois)")
+    parser.add_argument("--topology", choices=["mirror", "neo4j", "none"], default="mirror",
+                        help="Topologie IGP consultée avant un reboot parallèle (none: reboots sérialisés)")
+    parser.add_argument("--mirror", default=ROUTING_MIRROR_FILE, help="Miroir de routage (--topology mirror)")
+    args = parser.parse_args()
+    
+    start_time = time.time()
+
+    log("=" * 80)
+    log("Démarrage du monitoring des routeurs Nokia SROS")
+    if args.mode == "ssh":
+        log(f"Nombre de routeurs à surveiller: {len(ROUTERS)}")
+    log("=" * 80)
+    
+    topology = load_igp_topology(args.topology, args.mirror) if args.max_reboots > 1 else None
+    scheduler = RebootScheduler(topology, max_concurrent=args.max_reboots)
+    
+    if args.mode == "ssh":
+        results = run_ssh(ROUTERS, scheduler)
+    else:
+        results = asyncio.run(run_nso(args, scheduler))
+
     # Calcul du temps d'exécution
     end_time = time.time()
     duration = end_time - start_time
@@ -304,6 +817,7 @@ def main():
         log(f"{status_icon} {result['host']}: {result['status']} (Carte: {result.get('card_state', 'N/A')})")
     
     log("=" * 80)
+    log(f"Reboots simultanés (pic): {scheduler.peak}")
     log(f"Temps d'exécution total: {duration_formatted}")
     log("Fin du monitoring")
 
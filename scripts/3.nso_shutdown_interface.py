@@ -1,30 +1,56 @@
 """
 Script pour shutdown/no shutdown l'interface d'un routeur depuis NSO en RESTCONF.
 
+Plusieurs interfaces (sur un ou plusieurs devices) peuvent être modifiées en
+une seule transaction NSO : un YANG-Patch (ou un PATCH fusionné à la racine)
+avec dry-run et commit-queue, et un rapport par device.
+
+L'admin-state courant de toutes les cibles est lu dans la CDB en une
+immediate-query avant d'écrire : les interfaces déjà dans l'état demandé ne
+sont pas envoyées (ni commit ni push device inutiles), et l'état final est
+relu après la transaction pour vérification.
+
+Le mode --pre-check n'applique rien : il retire les liens des interfaces du
+miroir de routage en mémoire et liste les chemins SR, services TE et VPRN
+clients re-routés ou cassés (voir impact_analysis.py).
+
 Auteur: Marc De Oliveira
 Date: 2025
 """
 
+import argparse
 import asyncio
+import json
 import sys
+import time
 from dataclasses import dataclass
-from typing import Literal
+from typing import Any, Literal, Optional
 
-import aiohttp
-from aiohttp import ClientTimeout, BasicAuth
+from impact_analysis import (
+    BROKEN,
+    NSO_CDB_SNAPSHOT_FILE,
+    REROUTED,
+    ROUTING_MIRROR_FILE,
+    TrafficImpactAnalyzer
+)
+from nso_client import YANG_JSON, NSOClient, NSOConfig, NSOError
 
 
 # ============================================================
 # CONFIGURATION & TYPES
 # ============================================================
 
-@dataclass
-class NSOConfig:
-    """Configuration de connexion NSO"""
-    base_url: str = "http://localhost:8080"
-    username: str = "admin"
-    password: str = "admin"
-    timeout: int = 30
+ACTIONS = ["shutdown", "no-shutdown"]
+YANG_PATCH_JSON = "application/yang-patch+json"
+BULK_TIMEOUT = 300.0            # Une transaction multi-devices peut être longue
+DRY_RUN_FORMAT = "native"       # Diff par device (configuration native envoyée)
+TE_SERVICES_PATH = "/restconf/data/traffic-engineering:traffic-engineering"
+QUERY_PATH = "/restconf/tailf/query"
+DEFAULT_ADMIN_STATE = "enable"  # admin-state non configuré en CDB (défaut SR OS)
+MISSING_INTERFACE = "Interface absente de la CDB NSO"
+FAILED_STATUSES = ("failed", "mismatch")
+PRE_CHECK_BROKEN_EXIT = 2       # Code de sortie si la pré-vérification casse du trafic
+PRE_CHECK_PRINT_LIMIT = 20      # Chemins affichés par catégorie (le rapport JSON est complet)
 
 
 @dataclass
@@ -34,6 +60,24 @@ class InterfaceAction:
     interface_name: str
     router_name: str = "Base"
     action: Literal["shutdown", "no-shutdown"] = "shutdown"
+    
+    @property
+    def admin_state(self) -> str:
+        """admin-state Nokia SR OS: enable = up, disable = shutdown"""
+        return "disable" if self.action == "shutdown" else "enable"
+    
+    @property
+    def key(self) -> tuple[str, str, str]:
+        return self.device_name, self.router_name, self.interface_name
+    
+    @classmethod
+    def parse(cls, target: str, action: str = "shutdown") -> "InterfaceAction":
+        """Construit une action depuis DEVICE:INTERFACE[:ROUTER]"""
+        device, _, rest = target.partition(":")
+        interface, _, router = rest.partition(":")
+        if not device or not interface:
+            raise ValueError(f"Cible invalide '{target}' (attendu DEVICE:INTERFACE[:ROUTER])")
+        return cls(device, interface, router or "Base", action)
 
 
 # ============================================================
@@ -41,33 +85,51 @@ class InterfaceAction:
 # ============================================================
 
 class NSORestconfClient:
-    """Client RESTCONF pour NSO"""
-    
-    def __init__(self, config: NSOConfig):
-        self.config = config
-        self.timeout = ClientTimeout(total=config.timeout)
-        self.auth = BasicAuth(config.username, config.password)
-        self.headers = {
-            "Content-Type": "application/yang-data+json",
-            "Accept": "application/yang-data+json"
-        }
+    """Actions RESTCONF sur les interfaces (session NSO partagée)"""
     
-    def _build_interface_url(self, device: str, router: str, interface: str) -> str:
-        """Construit l'URL RESTCONF pour une interface"""
+    def __init__(self, client: NSOClient):
+        self.client = client
+    
+    @staticmethod
+    def _interface_path(device: str, router: str, interface: str) -> str:
+        """Chemin de données d'une interface (relatif à /restconf/data)"""
         # Encoder les caractères spéciaux dans l'interface name si nécessaire
         interface_encoded = interface.replace("/", "%2F")
         
         return (
-            f"{self.config.base_url}/restconf/data/"
             f"devices/device={device}/config/"
             f"configure/router={router}/interface={interface_encoded}"
         )
     
+    def _build_interface_url(self, device: str, router: str, interface: str) -> str:
+        """Construit le chemin RESTCONF pour une interface"""
+        return f"/restconf/data/{self._interface_path(device, router, interface)}"
+    
     async def set_interface_admin_state(
         self,
-        action: InterfaceAction
+        action: InterfaceAction,
+        read_before_write: bool = True
     ) -> dict:
-        """Configure l'admin-state d'une interface (shutdown/no-shutdown)"""
+        """
+        Configure l'admin-state d'une interface (shutdown/no-shutdown).
+        
+        read_before_write : ne PATCH pas une interface déjà dans l'état demandé
+        (ou absente de la CDB) et relit l'état après écriture.
+        """
+        
+        if read_before_write:
+            current = (await self.get_admin_states([action])).get(action.key)
+            if current is None:
+                return {"success": False, "status": 0, "error": f"{MISSING_INTERFACE}: {action.interface_name}"}
+            if current == action.admin_state:
+                print(f"= {action.device_name} {action.interface_name}: déjà {current}, aucune modification")
+                return {
+                    "success": True,
+                    "unchanged": True,
+                    "device": action.device_name,
+                    "interface": action.interface_name,
+                    "admin_state": current
+                }
         
         url = self._build_interface_url(
             action.device_name,
@@ -76,8 +138,7 @@ class NSORestconfClient:
         )
         
         # Payload pour modifier l'admin-state
-        # Pour Nokia SR OS: enable = up, disable = shutdown
-        admin_state = "disable" if action.action == "shutdown" else "enable"
+        admin_state = action.admin_state
         
         payload = {
             "nokia-conf:interface": {
@@ -92,50 +153,40 @@ class NSORestconfClient:
         print(f"Router: {action.router_name}")
         print(f"Interface: {action.interface_name}")
         print(f"Admin State: {admin_state}")
-        print(f"URL: {url}")
+        print(f"URL: {self.client.url(url)}")
         print(f"{'='*60}\n")
         
-        try:
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.patch(
-                    url,
-                    json=payload,
-                    headers=self.headers,
-                    auth=self.auth,
-                    ssl=False
-                ) as response:
-                    
-                    status = response.status
-                    response_text = await response.text()
-                    
-                    if 200 <= status < 300:
-                        print(f"✓ SUCCESS ({status}): Interface {action.interface_name} "
-                              f"{'shutdown' if action.action == 'shutdown' else 'activated'}")
-                        
-                        return {
-                            "success": True,
-                            "status": status,
-                            "device": action.device_name,
-                            "interface": action.interface_name,
-                            "admin_state": admin_state,
-                            "response": response_text
-                        }
-                    else:
-                        print(f"✗ ERROR ({status}): {response_text[:200]}")
-                        
-                        return {
-                            "success": False,
-                            "status": status,
-                            "error": response_text
-                        }
-                        
-        except aiohttp.ClientError as e:
-            print(f"✗ CLIENT ERROR: {e}")
-            return {"success": False, "error": f"CLIENT_ERROR: {e}"}
+        response = await self.client.patch(url, json=payload)
+        
+        if response.ok:
+            print(f"✓ SUCCESS ({response.status}): Interface {action.interface_name} "
+                  f"{'shutdown' if action.action == 'shutdown' else 'activated'}")
+            
+            if read_before_write:
+                final = (await self.get_admin_states([action])).get(action.key)
+                if final != action.admin_state:
+                    return {
+                        "success": False,
+                        "status": response.status,
+                        "error": f"Vérification: admin-state lu après commit = {final or 'absente'}"
+                    }
+            
+            return {
+                "success": True,
+                "status": response.status,
+                "device": action.device_name,
+                "interface": action.interface_name,
+                "admin_state": admin_state,
+                "response": response.text
+            }
+        
+        print(f"✗ ERROR ({response.status}): {response.error[:200]}")
         
-        except Exception as e:
-            print(f"✗ UNKNOWN ERROR: {e}")
-            return {"success": False, "error": f"UNKNOWN_ERROR: {e}"}
+        return {
+            "success": False,
+            "status": response.status,
+            "error": response.error
+        }
     
     async def get_interface_status(
         self,
@@ -147,50 +198,438 @@ class NSORestconfClient:
         
         url = self._build_interface_url(device, router, interface)
         
-        try:
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(
-                    url,
-                    headers=self.headers,
-                    auth=self.auth,
-                    ssl=False
-                ) as response:
-                    
-                    if response.status == 200:
-                        data = await response.json()
-                        return {"success": True, "data": data}
-                    else:
-                        error_text = await response.text()
-                        return {
-                            "success": False,
-                            "status": response.status,
-                            "error": error_text
+        response = await self.client.get(url)
+        
+        if response.ok:
+            return {"success": True, "data": response.data}
+        
+        return {
+            "success": False,
+            "status": response.status,
+            "error": response.error
+        }
+    
+    # ==============================================
+    # Lecture avant écriture
+    # ==============================================
+    
+    async def get_admin_states(self, actions: list[InterfaceAction]) -> dict[tuple[str, str, str], str]:
+        """
+        admin-state CDB des interfaces visées : une immediate-query par
+        instance de routage (Base en général), quel que soit le nombre de
+        devices et d'interfaces.
+        
+        Returns:
+            dict: {(device, router, interface): admin-state} ; une interface
+                  absente de la CDB n'a pas d'entrée
+        """
+        by_router: dict[str, list[InterfaceAction]] = {}
+        for action in actions:
+            by_router.setdefault(action.router_name, []).append(action)
+        
+        wanted = {action.key for action in actions}
+        states = {}
+        for router, router_actions in by_router.items():
+            devices = " or ".join(f"name='{d}'" for d in sorted({a.device_name for a in router_actions}))
+            interfaces = " or ".join(f"interface-name='{i}'" for i in sorted({a.interface_name for a in router_actions}))
+            payload = {
+                "tailf-rest-query:immediate-query": {
+                    "foreach": f"/devices/device[{devices}]/config/configure/"
+                               f"router[router-name='{router}']/interface[{interfaces}]",
+                    "select": [
+                        {"label": "device", "expression": "../../../../name", "result-type": "string"},
+                        {"label": "name", "expression": "./interface-name", "result-type": "string"},
+                        {"label": "admin-state", "expression": "./admin-state", "result-type": "string"}
+                    ]
+                }
+            }
+            response = await self.client.post(QUERY_PATH, json=payload)
+            if not response.ok:
+                raise NSOError(response)
+            
+            for item in (response.data or {}).get("tailf-rest-query:query-result", {}).get("result", []):
+                row = {field["label"]: field.get("value", "") for field in item.get("select", [])}
+                key = (row.get("device"), router, row.get("name"))
+                # Le foreach croise devices et interfaces : ne garder que les cibles
+                if key in wanted:
+                    states[key] = row.get("admin-state") or DEFAULT_ADMIN_STATE
+        return states
+    
+    async def apply_admin_state(
+        self,
+        actions: list[InterfaceAction],
+        dry_run: bool = False,
+        commit_queue: Optional[Literal["async", "sync"]] = None,
+        mode: Literal["yang-patch", "merge"] = "yang-patch",
+        read_before_write: bool = True
+    ) -> list[dict]:
+        """
+        Transaction groupée limitée aux interfaces à modifier.
+        
+        Avec read_before_write, les interfaces déjà dans l'état demandé sont
+        rapportées "unchanged" sans être envoyées, les interfaces absentes de
+        la CDB sont refusées (un merge les créerait), et l'état final des
+        interfaces commitées est relu : un écart passe le device en "mismatch".
+        """
+        current = await self.get_admin_states(actions) if read_before_write else {}
+        pending: list[InterfaceAction] = []
+        skipped: list[tuple[InterfaceAction, Optional[str]]] = []
+        for action in actions:
+            state = current.get(action.key)
+            if not read_before_write or (state is not None and state != action.admin_state):
+                pending.append(action)
+            else:
+                skipped.append((action, None if state is not None else MISSING_INTERFACE))
+        
+        if skipped:
+            print(f"\n= {sum(1 for _, error in skipped if error is None)} interface(s) déjà dans l'état demandé, "
+                  f"{sum(1 for _, error in skipped if error)} absente(s) de la CDB")
+        
+        reports = await self.bulk_set_admin_state(pending, dry_run, commit_queue, mode) if pending else []
+        
+        if read_before_write and not dry_run:
+            committed = {r["device"] for r in reports if r["status"] in ("committed", "queued")}
+            verified = [a for a in pending if a.device_name in committed]
+            final = await self.get_admin_states(verified) if verified else {}
+            for report in reports:
+                if report["device"] not in committed:
+                    continue
+                for interface in report["interfaces"]:
+                    key = (report["device"], interface["router"], interface["interface"])
+                    if final.get(key) != interface["admin_state"]:
+                        interface["error"] = f"Vérification: admin-state lu = {final.get(key) or 'absente'}"
+                        report["status"] = "mismatch"
+        
+        by_device = {report["device"]: report for report in reports}
+        for action, error in skipped:
+            report = by_device.get(action.device_name)
+            if report is None:
+                report = by_device[action.device_name] = {
+                    "device": action.device_name,
+                    "status": "unchanged",
+                    "interfaces": []
+                }
+                reports.append(report)
+            interface = {
+                "interface": action.interface_name,
+                "router": action.router_name,
+                "admin_state": action.admin_state,
+                "unchanged": error is None
+            }
+            if error:
+                interface["error"] = error
+                if report["status"] == "unchanged":
+                    report["status"] = "failed"
+            report["interfaces"].append(interface)
+        
+        return reports
+    
+    async def get_te_services(self) -> list[dict]:
+        """Services traffic-engineering déployés dans NSO (lecture seule)"""
+        response = await self.client.get(TE_SERVICES_PATH)
+        if response.status == 404:
+            return []
+        if not response.ok:
+            print(f"⚠ Services TE non lus ({response.status}): {(response.error or '')[:200]}")
+            return []
+        return (response.data or {}).get("traffic-engineering:traffic-engineering", [])
+    
+    # ==============================================
+    # Transaction multi-interfaces
+    # ==============================================
+    
+    def build_yang_patch(self, actions: list[InterfaceAction], patch_id: str) -> dict:
+        """YANG-Patch (RFC 8072) : une édition merge par interface, edit-id = position"""
+        return {
+            "ietf-yang-patch:yang-patch": {
+                "patch-id": patch_id,
+                "edit": [
+                    {
+                        "edit-id": str(position),
+                        "operation": "merge",
+                        "target": "/" + self._interface_path(action.device_name, action.router_name, action.interface_name),
+                        "value": {
+                            "nokia-conf:interface": [{
+                                "interface-name": action.interface_name,
+                                "admin-state": action.admin_state
+                            }]
                         }
-                        
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+                    }
+                    for position, action in enumerate(actions, start=1)
+                ]
+            }
+        }
+    
+    @staticmethod
+    def build_merge_payload(actions: list[InterfaceAction]) -> dict:
+        """PATCH fusionné à la racine /restconf/data : devices > routers > interfaces"""
+        devices: dict[str, dict[str, list[dict]]] = {}
+        for action in actions:
+            devices.setdefault(action.device_name, {}).setdefault(action.router_name, []).append({
+                "interface-name": action.interface_name,
+                "admin-state": action.admin_state
+            })
+        return {
+            "tailf-ncs:devices": {
+                "device": [
+                    {
+                        "name": device,
+                        "config": {
+                            "nokia-conf:configure": {
+                                "router": [
+                                    {"router-name": router, "interface": interfaces}
+                                    for router, interfaces in routers.items()
+                                ]
+                            }
+                        }
+                    }
+                    for device, routers in devices.items()
+                ]
+            }
+        }
+    
+    @staticmethod
+    def _dry_run_diffs(data: Any) -> dict[str, str]:
+        """Diff par device d'une réponse dry-run=native"""
+        result = (data or {}).get("dry-run-result", {})
+        devices = result.get("native", {}).get("device", [])
+        return {device.get("name", ""): device.get("data", "") for device in devices}
+    
+    @staticmethod
+    def _commit_queue_id(data: Any) -> Optional[Any]:
+        """Identifiant de l'item de commit-queue dans la réponse (format tolérant)"""
+        if isinstance(data, dict):
+            queue = data.get("commit-queue")
+            if isinstance(queue, dict) and "id" in queue:
+                return queue["id"]
+            for value in data.values():
+                queue_id = NSORestconfClient._commit_queue_id(value)
+                if queue_id is not None:
+                    return queue_id
+        return None
+    
+    @staticmethod
+    def _edit_errors(data: Any) -> dict[str, str]:
+        """Erreurs par edit-id d'un yang-patch-status ('' = erreur globale)"""
+        status = (data or {}).get("ietf-yang-patch:yang-patch-status", {})
+        errors = {}
+        for edit in status.get("edit-status", {}).get("edit", []):
+            messages = [e.get("error-message", "") for e in edit.get("errors", {}).get("error", [])]
+            if messages:
+                errors[str(edit.get("edit-id"))] = "; ".join(messages)
+        global_messages = [e.get("error-message", "") for e in status.get("global-errors", {}).get("error", [])]
+        if global_messages:
+            errors[""] = "; ".join(global_messages)
+        return errors
+    
+    async def bulk_set_admin_state(
+        self,
+        actions: list[InterfaceAction],
+        dry_run: bool = False,
+        commit_queue: Optional[Literal["async", "sync"]] = None,
+        mode: Literal["yang-patch", "merge"] = "yang-patch",
+        timeout: float = BULK_TIMEOUT
+    ) -> list[dict]:
+        """
+        Applique toutes les actions en une seule transaction NSO (tout ou rien).
+        
+        dry_run       : calcule le diff natif par device sans rien valider
+        commit_queue  : "async" rend la main dès la mise en file, "sync" attend l'application
+        mode          : "yang-patch" (une édition par interface) ou "merge" (PATCH racine)
+        
+        Returns:
+            list[dict]: Rapport par device (statut, interfaces, diff ou erreur)
+        """
+        params = []
+        if dry_run:
+            params.append(f"dry-run={DRY_RUN_FORMAT}")
+        if commit_queue:
+            params.append(f"commit-queue={commit_queue}")
+        query = f"?{'&'.join(params)}" if params else ""
+        
+        if mode == "yang-patch":
+            payload = self.build_yang_patch(actions, patch_id=f"admin-state-{time.strftime('%Y%m%d-%H%M%S')}")
+            headers = {"Content-Type": YANG_PATCH_JSON, "Accept": YANG_JSON}
+        else:
+            payload = self.build_merge_payload(actions)
+            headers = None
+        
+        print(f"\n{'='*60}")
+        print(f"Transaction NSO: {len(actions)} interface(s) sur "
+              f"{len({a.device_name for a in actions})} device(s) ({mode}{', ' + ', '.join(params) if params else ''})")
+        print(f"{'='*60}")
+        
+        response = await self.client.patch(f"/restconf/data{query}", json=payload, headers=headers, timeout=timeout)
+        
+        diffs = self._dry_run_diffs(response.data) if response.ok and dry_run else {}
+        queue_id = self._commit_queue_id(response.data) if response.ok and commit_queue else None
+        edit_errors = {} if response.ok else self._edit_errors(self._json(response.text))
+        
+        if response.ok:
+            status = "dry-run" if dry_run else "queued" if commit_queue == "async" else "committed"
+        else:
+            status = "failed"
+        
+        reports: dict[str, dict] = {}
+        for position, action in enumerate(actions, start=1):
+            report = reports.setdefault(action.device_name, {
+                "device": action.device_name,
+                "status": status,
+                "interfaces": []
+            })
+            interface = {
+                "interface": action.interface_name,
+                "router": action.router_name,
+                "admin_state": action.admin_state
+            }
+            if str(position) in edit_errors:
+                interface["error"] = edit_errors[str(position)]
+            report["interfaces"].append(interface)
+        
+        for device, report in reports.items():
+            if dry_run and response.ok:
+                report["diff"] = diffs.get(device, "")
+            if queue_id is not None:
+                report["commit_queue_id"] = queue_id
+            if not response.ok:
+                # Transaction atomique : aucun device n'est modifié
+                if edit_errors:
+                    report["error"] = "Transaction annulée: " + "; ".join(edit_errors.values())
+                else:
+                    report["error"] = response.error
+        
+        return list(reports.values())
+    
+    @staticmethod
+    def _json(text: str) -> Any:
+        try:
+            return json.loads(text) if text else None
+        except ValueError:
+            return None
 
 
 # ============================================================
 # HELPER FUNCTIONS
 # ============================================================
 
-def print_usage():
-    """Affiche l'aide d'utilisation"""
-    print("""
-Usage: python nso_shutdown_interface.py <device> <interface> [action] [router]
+def load_actions(filename: str, default_action: str) -> list[InterfaceAction]:
+    """Actions depuis un fichier JSON [{"device", "interface", "action"?, "router"?}, ...]"""
+    with open(filename, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    return [
+        InterfaceAction(
+            device_name=entry["device"],
+            interface_name=entry["interface"],
+            router_name=entry.get("router", "Base"),
+            action=entry.get("action", default_action)
+        )
+        for entry in entries
+    ]
+
+
+def print_report(reports: list[dict]) -> None:
+    """Affiche le rapport par device d'une transaction"""
+    for report in reports:
+        marker = "✗" if report["status"] in FAILED_STATUSES else "✓"
+        queue = f" (commit-queue {report['commit_queue_id']})" if "commit_queue_id" in report else ""
+        print(f"\n{marker} {report['device']}: {report['status']}{queue}")
+        for interface in report["interfaces"]:
+            error = f"  ✗ {interface['error']}" if "error" in interface else ""
+            arrow = "=" if interface.get("unchanged") else "→"
+            print(f"    {interface['interface']} ({interface['router']}) {arrow} {interface['admin_state']}{error}")
+        if report.get("diff"):
+            for line in report["diff"].rstrip().splitlines():
+                print(f"      {line}")
+        if report.get("error"):
+            print(f"    Erreur: {report['error'][:200]}")
 
-Arguments:
-    device      : Nom du device dans NSO (ex: R1, R2, R3)
-    interface   : Nom de l'interface (ex: to-R3, to-R1)
-    action      : shutdown | no-shutdown (défaut: shutdown)
-    router      : Nom du router (défaut: Base)
 
+def print_impact_report(impact: dict) -> None:
+    """Affiche le rapport de pré-vérification"""
+    print(f"\n{'='*60}")
+    print(f"Pré-vérification: {len(impact['links'])} lien(s) retiré(s) en {impact['elapsed_ms']:.1f} ms")
+    print(f"{'='*60}")
+    for link in impact["links"]:
+        print(f"  - {link['src_rtr']} ({link['src_ip']}) -> {link['dest_rtr']} ({link['dest_ip']}) "
+              f"SID {link['sr_adjacency_sid']}")
+    
+    paths = impact["paths"]
+    print(f"\nChemins SR: {len(paths[REROUTED])} re-routé(s), {len(paths[BROKEN])} cassé(s)")
+    for change in paths[REROUTED][:PRE_CHECK_PRINT_LIMIT]:
+        print(f"  ↻ {change['source']} -> {change['destination']}: "
+              f"{' > '.join(change['before']['node_names'])} ({change['cost_before']:g}) → "
+              f"{' > '.join(change['after']['node_names'])} ({change['cost_after']:g})")
+    for change in paths[BROKEN][:PRE_CHECK_PRINT_LIMIT]:
+        print(f"  ✗ {change['source']} -> {change['destination']}: plus de chemin")
+    hidden = max(0, len(paths[REROUTED]) - PRE_CHECK_PRINT_LIMIT) + max(0, len(paths[BROKEN]) - PRE_CHECK_PRINT_LIMIT)
+    if hidden:
+        print(f"  ... {hidden} autre(s) chemin(s), voir --report")
+    
+    print(f"\nServices TE impactés: {len(impact['te_services'])}")
+    for service in impact["te_services"]:
+        after = service.get("labels_after")
+        print(f"  {'✗' if service['status'] == BROKEN else '↻'} {service['service_name']} "
+              f"{service['source']} -> {service['destination']} (color {service['color']}): "
+              f"{service['labels_before']} → {after if after is not None else 'aucun chemin'}")
+    
+    if impact["vprns"] is None:
+        print("\n⚠ VPRN clients: NON ÉVALUÉS, section VPRN absente du snapshot CDB "
+              "(relancer le script 5 avec le collecteur vprns)")
+        return
+    print(f"\nVPRN clients impactés: {len(impact['vprns'])}")
+    for vprn in impact["vprns"]:
+        print(f"  {'✗' if vprn[BROKEN] else '↻'} {vprn['service_name']} (PE: {', '.join(vprn['pes'])}): "
+              f"{len(vprn[REROUTED])} re-routé(s), {len(vprn[BROKEN])} cassé(s)")
+
+
+async def run_pre_check(args: argparse.Namespace, actions: list[InterfaceAction]) -> dict:
+    """Analyse d'impact des shutdown demandés, sans rien écrire (ni NSO ni Neo4j)"""
+    analyzer = TrafficImpactAnalyzer.from_files(args.mirror, args.snapshot, args.weight)
+    links = []
+    for action in actions:
+        if action.action == "shutdown":
+            links += analyzer.interface_links(action.device_name, action.interface_name)
+    
+    te_services = []
+    if not args.no_te:
+        async with NSOClient(NSOConfig()) as nso:
+            te_services = await NSORestconfClient(nso).get_te_services()
+    
+    return analyzer.analyze(links, te_services)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Shutdown / no shutdown d'interfaces via NSO RESTCONF",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
 Exemples:
-    python nso_shutdown_interface.py R1 to-R3
-    python nso_shutdown_interface.py R1 to-R3 shutdown
-    python nso_shutdown_interface.py R1 to-R3 no-shutdown
-    """)
+    python 3.nso_shutdown_interface.py R1 to-R3
+    python 3.nso_shutdown_interface.py R1 to-R3 no-shutdown
+    python 3.nso_shutdown_interface.py --targets R1:to-R3 R3:to-R1 --dry-run
+    python 3.nso_shutdown_interface.py --file maintenance.json --commit-queue async
+    python 3.nso_shutdown_interface.py R1 to-R3 --pre-check
+"""
+    )
+    parser.add_argument("device", nargs="?", help="Nom du device dans NSO (ex: R1, R2, R3)")
+    parser.add_argument("interface", nargs="?", help="Nom de l'interface (ex: to-R3, to-R1)")
+    parser.add_argument("action", nargs="?", choices=ACTIONS, default="shutdown", help="Défaut: shutdown")
+    parser.add_argument("router", nargs="?", default="Base", help="Nom du router (défaut: Base)")
+    parser.add_argument("--targets", nargs="+", metavar="DEVICE:INTERFACE[:ROUTER]", help="Interfaces supplémentaires")
+    parser.add_argument("--file", help="Fichier JSON d'actions [{device, interface, action?, router?}]")
+    parser.add_argument("--dry-run", action="store_true", help="Affiche le diff par device sans appliquer")
+    parser.add_argument("--commit-queue", choices=["async", "sync"], help="Passe la transaction par la commit-queue NSO")
+    parser.add_argument("--mode", choices=["yang-patch", "merge"], default="yang-patch", help="Format de la transaction groupée")
+    parser.add_argument("--report", help="Sauvegarde le rapport par device (JSON)")
+    parser.add_argument("--force", action="store_true",
+                        help="Écrit sans lire l'état courant ni vérifier l'état final")
+    parser.add_argument("--pre-check", action="store_true",
+                        help=f"Analyse d'impact trafic sans appliquer (code {PRE_CHECK_BROKEN_EXIT} si du trafic est cassé)")
+    parser.add_argument("--mirror", default=ROUTING_MIRROR_FILE, help="Miroir de routage (pré-vérification)")
+    parser.add_argument("--snapshot", default=NSO_CDB_SNAPSHOT_FILE, help="Snapshot CDB NSO (pré-vérification)")
+    parser.add_argument("--weight", choices=["igp_metric", "distance"], default="igp_metric", help="Poids des chemins")
+    parser.add_argument("--no-te", action="store_true", help="Ne lit pas les services TE dans NSO")
+    return parser
 
 
 # ============================================================
@@ -201,43 +640,93 @@ async def main():
     """Point d'entrée principal"""
     
     # Parsing des arguments
-    if len(sys.argv) < 3:
+    parser = build_parser()
+    args = parser.parse_args()
+    
+    actions = []
+    if args.device or args.interface:
+        if not (args.device and args.interface):
+            parser.error("device et interface doivent être fournis ensemble")
+        actions.append(InterfaceAction(args.device, args.interface, args.router, args.action))
+    try:
+        actions += [InterfaceAction.parse(target, args.action) for target in args.targets or []]
+        if args.file:
+            actions += load_actions(args.file, args.action)
+    except (ValueError, KeyError, OSError) as e:
+        parser.error(str(e))
+    
+    if not actions:
         print("✗ Error: Missing required arguments")
-        print_usage()
+        parser.print_help()
         sys.exit(1)
     
-    device_name = sys.argv[1]
-    interface_name = sys.argv[2]
-    action = sys.argv[3] if len(sys.argv) > 3 else "shutdown"
-    router_name = sys.argv[4] if len(sys.argv) > 4 else "Base"
+    invalid = [a for a in actions if a.action not in ACTIONS]
+    if invalid:
+        parser.error(f"Invalid action '{invalid[0].action}'. Must be 'shutdown' or 'no-shutdown'")
     
-    # Validation de l'action
-    if action not in ["shutdown", "no-shutdown"]:
-        print(f"✗ Error: Invalid action '{action}'. Must be 'shutdown' or 'no-shutdown'")
-        print_usage()
-        sys.exit(1)
+    if args.pre_check:
+        try:
+            impact = await run_pre_check(args, actions)
+        except KeyError as e:
+            print(f"✗ Pré-vérification impossible: {e.args[0]}")
+            sys.exit(1)
+        except (OSError, ValueError) as e:
+            print(f"✗ Pré-vérification impossible: {e}")
+            sys.exit(1)
+        print_impact_report(impact)
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as f:
+                json.dump(impact, f, indent=2, ensure_ascii=False)
+            print(f"\n✓ Rapport sauvegardé dans {args.report}")
+        broken = impact["paths"][BROKEN] or any(s["status"] == BROKEN for s in impact["te_services"])
+        if broken:
+            sys.exit(PRE_CHECK_BROKEN_EXIT)
+        return
     
     # Configuration
     nso_config = NSOConfig()
-    client = NSORestconfClient(nso_config)
-    
-    # Action sur l'interface
-    interface_action = InterfaceAction(
-        device_name=device_name,
-        interface_name=interface_name,
-        router_name=router_name,
-        action=action
-    )
+    bulk = len(actions) > 1 or args.dry_run or args.commit_queue or args.report
     
     # Exécution
-    result = await client.set_interface_admin_state(interface_action)
+    async with NSOClient(nso_config) as nso:
+        client = NSORestconfClient(nso)
+        try:
+            if bulk:
+                reports = await client.apply_admin_state(
+                    actions,
+                    dry_run=args.dry_run,
+                    commit_queue=args.commit_queue,
+                    mode=args.mode,
+                    read_before_write=not args.force
+                )
+            else:
+                result = await client.set_interface_admin_state(actions[0], read_before_write=not args.force)
+        except NSOError as e:
+            print(f"✗ Lecture de l'état courant impossible ({e.response.status}): {str(e)[:200]}")
+            sys.exit(1)
+    
+    if bulk:
+        print_report(reports)
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as f:
+                json.dump(reports, f, indent=2, ensure_ascii=False)
+            print(f"\n✓ Rapport sauvegardé dans {args.report}")
+        if any(report["status"] in FAILED_STATUSES or any("error" in i for i in report["interfaces"])
+               for report in reports):
+            sys.exit(1)
+        return
     
     # Affichage du résultat
     print(f"\n{'='*60}")
     print("Result:")
     print(f"{'='*60}")
     
-    if result.get("success"):
+    if result.get("unchanged"):
+        print(f"✓ Nothing to do: interface already in the requested state")
+        print(f"  Device: {result.get('device')}")
+        print(f"  Interface: {result.get('interface')}")
+        print(f"  Admin State: {result.get('admin_state')}")
+    elif result.get("success"):
         print(f"✓ Operation completed successfully")
         print(f"  Device: {result.get('device')}")
         print(f"  Interface: {result.get('interface')}")
@@ -34,6 +34,16 @@ NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
 GDS_GRAPH_PROJECTION_NAME = 'my_graph'
 WEIGHT_PROPERTY = 'weight'
 
+# === Miroir CSR de la topologie (produit par 7.push_ALL_to_neo4j.py) ===
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROUTING_MIRROR_FILE = os.getenv("ROUTING_MIRROR_FILE", os.path.join(SCRIPTS_DIR, "7.RESULT_ROUTING_MIRROR.npz"))
+
+# Moteur de calcul de chemin:
+#   "mirror"   -> Dijkstra sur le miroir CSR en mémoire (repli GDS store)
+#   "snapshot" -> projection GDS construite depuis le miroir (gds.graph.construct, Arrow)
+#   "store"    -> projection GDS native depuis la base (gds.graph.project)
+PATH_ENGINE = os.getenv("PATH_ENGINE", "mirror")
+
 # === MCP Neo4j Cypher ===
 args = ["--db-url", NEO4J_URI, "--username", NEO4J_USER, "--password", NEO4J_PASSWORD, "--database", NEO4J_DATABASE]
 MCP_SERVER_PARAMS = StdioServerParameters(
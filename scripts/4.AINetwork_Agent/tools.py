@@ -6,10 +6,25 @@ Auteur: Marc De Oliveira
 Date: 2025
 """
 
+import os
+import sys
+
 from neo4j import GraphDatabase, Driver
 from vertexai.generative_models import FunctionDeclaration
 import config
 
+if config.SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, config.SCRIPTS_DIR)
+
+from topology_mirror import RoutingGraphMirror
+
+try:
+    import pandas as pd
+    from graphdatascience import GraphDataScience
+except ImportError:
+    pd = None
+    GraphDataScience = None
+
 
 class NetworkTools:
     """
@@ -25,10 +40,19 @@ class NetworkTools:
         self.graph_name = config.GDS_GRAPH_PROJECTION_NAME
         self.database = config.NEO4J_DATABASE
         self.weight_property_alias = config.WEIGHT_PROPERTY
+        self.mirror: RoutingGraphMirror | None = None
+        self._mirror_mtime: float | None = None
+        self.path_engine = config.PATH_ENGINE
+        self._gds = None
+        self._snapshot_graph = None
+        self._snapshot_key: tuple | None = None
         print("   🔌 Connexion Neo4j établie")
     
     def close(self):
         """Ferme la connexion Neo4j."""
+        if self._gds is not None:
+            self._gds.close()
+            self._gds = None
         if self.driver:
             self.driver.close()
             print("   🔌 Connexion Neo4j fermée")
@@ -115,11 +139,122 @@ class NetworkTools:
         except Exception as e:
             return f"Erreur: {e}"
     
+    def _gds_client(self):
+        """Client Python graphdatascience (Arrow si le serveur l'expose), créé à la demande."""
+        if GraphDataScience is None:
+            raise RuntimeError("Client graphdatascience non installé")
+        if self._gds is None:
+            self._gds = GraphDataScience(
+                config.NEO4J_URI,
+                auth=(config.NEO4J_USER, config.NEO4J_PASSWORD),
+                database=self.database
+            )
+        return self._gds
+    
+    def create_graph_projection_from_snapshot(self, weight_property_name: str = 'igp_metric') -> str:
+        """
+        Crée la projection GDS PROD_ROUTER/PROD_ROUTING_LINK depuis le snapshot collecté.
+        
+        Les DataFrames nœuds/relations sont construits depuis le miroir CSR et
+        envoyés par gds.graph.construct (Arrow) : pas de scan du store, le temps
+        de projection dépend de la taille de la topologie, pas de la base.
+        Les identifiants GDS sont les identifiants entiers du miroir.
+        """
+        try:
+            mirror = self._refresh_mirror()
+            if mirror is None:
+                return "Erreur: Miroir de routage indisponible"
+            
+            # Projection déjà à jour pour ce snapshot et ce poids
+            gds = self._gds_client()
+            key = (self._mirror_mtime, weight_property_name)
+            if (self._snapshot_graph is not None and self._snapshot_key == key
+                    and gds.graph.exists(self.graph_name)["exists"]):
+                return f"Projection '{self.graph_name}' à jour"
+            
+            gds.graph.drop(self.graph_name, failIfMissing=False)
+            
+            nodes = pd.DataFrame({
+                "nodeId": range(len(mirror.names)),
+                "labels": "PROD_ROUTER",
+            })
+            relationships = pd.DataFrame(mirror.edge_columns(weight_property_name))
+            relationships["relationshipType"] = "PROD_ROUTING_LINK"
+            
+            self._snapshot_graph = gds.graph.construct(self.graph_name, nodes, relationships)
+            self._snapshot_key = key
+            print(f"   ✅ Projection construite: {self._snapshot_graph.node_count()} nœuds, "
+                  f"{self._snapshot_graph.relationship_count()} relations")
+            return f"Projection '{self.graph_name}' créée"
+        except Exception as e:
+            self._snapshot_graph = None
+            return f"Erreur: {e}"
+    
+    def _snapshot_shortest_path_data(self, start_node: str, end_node: str, weight_property: str) -> dict:
+        """Dijkstra GDS (client Python) sur la projection construite depuis le snapshot."""
+        create_result = self.create_graph_projection_from_snapshot(weight_property)
+        if "Erreur" in create_result:
+            return {"error": create_result}
+        
+        mirror = self.mirror
+        try:
+            result = self._gds_client().shortestPath.dijkstra.stream(
+                self._snapshot_graph,
+                sourceNode=mirror.index[start_node],
+                targetNode=mirror.index[end_node],
+                relationshipWeightProperty=self.weight_property_alias
+            )
+            if result.empty:
+                return {"error": f"Aucun chemin trouvé entre {start_node} et {end_node}"}
+            
+            node_names = [mirror.names[int(node_id)] for node_id in result["nodeIds"].iloc[0]]
+            return {
+                "total_cost": float(result["totalCost"].iloc[0]),
+                "node_names": node_names,
+                "segments": mirror.path_segments(node_names, weight_property),
+            }
+        except Exception as e:
+            return {"error": f"Erreur GDS: {e}"}
+    
+    # ==============================================
+    # Miroir CSR en mémoire
+    # ==============================================
+
+    def _refresh_mirror(self) -> RoutingGraphMirror | None:
+        """Charge (ou recharge si le fichier a changé) le miroir CSR de la topologie."""
+        try:
+            mtime = os.path.getmtime(config.ROUTING_MIRROR_FILE)
+        except OSError:
+            self.mirror = None
+            return None
+        
+        if self.mirror is None or mtime != self._mirror_mtime:
+            try:
+                self.mirror = RoutingGraphMirror.load(config.ROUTING_MIRROR_FILE)
+                self._mirror_mtime = mtime
+                print(f"   🧭 Miroir de routage chargé: {len(self.mirror.names)} routeurs")
+            except Exception as e:
+                print(f"   ⚠️  Miroir de routage illisible, repli sur GDS: {e}")
+                self.mirror = None
+        return self.mirror
+    
     def _calculate_shortest_path_data(self, start_node: str, end_node: str, weight_property: str) -> dict:
         """
         Méthode privée: calcule le plus court chemin (Dijkstra) et retourne les données brutes.
         Utilisée par find_shortest_path() et perform_traffic_engineering().
+        Selon config.PATH_ENGINE : miroir CSR en mémoire, projection GDS construite
+        depuis le snapshot, ou projection GDS native (repli si le miroir est absent).
         """
+        mirror = self._refresh_mirror()
+        if (self.path_engine != "store" and mirror is not None
+                and start_node in mirror.index and end_node in mirror.index):
+            if self.path_engine == "snapshot":
+                return self._snapshot_shortest_path_data(start_node, end_node, weight_property)
+            try:
+                return mirror.shortest_path(start_node, end_node, weight_property)
+            except ValueError as e:
+                return {"error": f"Erreur miroir: {e}"}
+        
         create_result = self.create_graph_projection(weight_property)
         if "Erreur" in create_result:
             return {"error": create_result}
@@ -5,25 +5,50 @@ Auteur: Marc De Oliveira
 Date: 2025
 """
 
+import argparse
 import asyncio
+import codecs
 import json
-import re
 import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
 from pprint import pprint
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Callable, Optional
 from ipaddress import IPv4Interface, IPv4Address
 
-import aiohttp
-from aiohttp import ClientTimeout, BasicAuth
-from jsonpath_ng.ext import parse
+from nso_client import AIMDLimiter, NSOClient, NSOConfig, NSOError, NSOMetrics, backoff_delay
+from snapshot_file import SnapshotReader, write_snapshot
 
 
 # ============================================================
 # CONFIGURATION & TYPES
 # ============================================================
 
+# Pagination immediate-query (limit/offset) et lecture en flux de la réponse
+QUERY_PAGE_SIZE = 5000          # Résultats par page (limit), 0 = pas de pagination
+STREAM_CHUNK_SIZE = 64 * 1024   # Octets lus par bloc sur la réponse HTTP
+ANALYSIS_BATCH_SIZE = 500       # Résultats passés ensemble aux analyseurs
+
+# Snapshot unique à sections (DEVICE, ISIS, IP_RELATION...) lu par le script 7
+SNAPSHOT_FILE = "5.RESULT_NSO_CDB.jsonl"
+
+# Collecte incrémentale : marqueurs de changement par device
+MARKERS_FILE = "5.RESULT_NSO_CDB_MARKERS.json"
+MARKER_HEADERS = ("etag", "last-modified")
+
+# Mode shardé : requêtes découpées par groupe de devices ou par lots de noms
+SHARD_SIZE = 50                 # Devices par shard (lots de noms)
+ADAPTIVE_MAX_CONCURRENT = 16    # Plafond AIMD (et du pool de connexions NSO)
+ADAPTIVE_TARGET_LATENCY = 30.0  # Latence par page au-delà de laquelle on réduit
+
+# Analyseurs coûteux en CPU exécutés dans un pool de processus
+ANALYSIS_WORKERS = 4            # Processus du pool, 0 = analyse dans la boucle asyncio
+ANALYSIS_MAX_PENDING = 8        # Lots en cours d'analyse par page avant de ralentir la lecture
+
+
 @dataclass
 class RequestConfig:
     """Configuration pour une requête NSO"""
@@ -32,12 +57,17 @@ class RequestConfig:
     payload: dict[str, Any]
     analysis_func: Callable[[dict], dict]
     method: str = "POST"
-    username: str = "admin"
-    password: str = "admin"
-    headers: dict[str, str] = field(default_factory=lambda: {
-        "Content-Type": "application/yang-data+json",
-        "Accept": "application/yang-data+json"
-    })
+    page_size: int = QUERY_PAGE_SIZE
+    cpu_bound: bool = False
+    
+    def page_payload(self, page: int) -> dict[str, Any]:
+        """Payload de la page demandée (offset NSO à partir de 1)"""
+        if not self.page_size:
+            return self.payload
+        query = dict(self.payload["tailf-rest-query:immediate-query"])
+        query["limit"] = self.page_size
+        query["offset"] = page * self.page_size + 1
+        return {"tailf-rest-query:immediate-query": query}
 
 
 class NSOQueryBuilder:
@@ -51,94 +81,261 @@ class NSOQueryBuilder:
                 "select": selectors
             }
         }
+    
+    @staticmethod
+    def wrap(items: list[dict]) -> dict:
+        """Reconstruit une réponse query autour d'un lot de résultats"""
+        return {"tailf-rest-query:query-result": {"result": items}}
 
 
 # ============================================================
 # HTTP CLIENT
 # ============================================================
 
-class NSOClient:
-    """Client HTTP pour NSO avec gestion asynchrone"""
+class NSOQueryCollector:
+    """
+    Exécute les requêtes de collecte sur la session NSO partagée.
+    
+    Chaque requête est paginée (limit/offset) et chaque page est lue en flux :
+    les résultats sont décodés au fil de l'eau et passés par lots aux
+    analyseurs, la mémoire reste bornée par la taille d'un lot et l'analyse
+    se fait pendant le transfert.
     
-    def __init__(self, timeout: int = 600):
-        self.timeout = ClientTimeout(total=timeout)
+    Les analyseurs cpu_bound tournent dans executor (pool de processus) : la
+    lecture des pages suivantes continue pendant l'analyse, au plus
+    max_pending lots en attente par page. Les lots sont fusionnés dans
+    l'ordre de lecture.
+    """
+    
+    def __init__(
+        self,
+        client: NSOClient,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        batch_size: int = ANALYSIS_BATCH_SIZE,
+        executor: Optional[Executor] = None,
+        max_pending: int = ANALYSIS_MAX_PENDING
+    ):
+        self.client = client
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.executor = executor
+        self.max_pending = max_pending
+    
+    def _analyze(self, config: RequestConfig, items: list[dict]) -> asyncio.Future:
+        """Lance l'analyse d'un lot (pool de processus si cpu_bound)"""
+        loop = asyncio.get_running_loop()
+        data = NSOQueryBuilder.wrap(items)
+        if config.cpu_bound and self.executor is not None:
+            return loop.run_in_executor(self.executor, config.analysis_func, data)
+        future = loop.create_future()
+        future.set_result(config.analysis_func(data))
+        return future
+    
+    async def _fetch_page(self, config: RequestConfig, page: int, result: dict) -> tuple[int, dict]:
+        """Lit une page en flux ; retourne (nombre de résultats, résultat fusionné)"""
+        parser = ResultStreamParser()
+        pending: deque[asyncio.Future] = deque()
+        batch = []
+        count = 0
+        
+        def add_batch(items: list[dict]) -> None:
+            nonlocal result
+            if config.analysis_func:
+                pending.append(self._analyze(config, items))
+            else:
+                result.setdefault("tailf-rest-query:query-result", {}).setdefault("result", []).extend(items)
+        
+        try:
+            async for chunk in self.client.stream(
+                config.method,
+                config.url,
+                json=config.page_payload(page),
+                chunk_size=self.chunk_size
+            ):
+                for item in parser.feed(chunk):
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        add_batch(batch)
+                        count += len(batch)
+                        batch = []
+                
+                # Fusionner les lots déjà analysés, attendre si trop sont en cours
+                while pending and (pending[0].done() or len(pending) > self.max_pending):
+                    result = DataMerger.merge(result, await pending.popleft())
+            parser.close()
+            
+            if batch:
+                add_batch(batch)
+                count += len(batch)
+            while pending:
+                result = DataMerger.merge(result, await pending.popleft())
+        finally:
+            for future in pending:
+                future.cancel()
+        return count, result
     
     async def fetch(
         self,
-        session: aiohttp.ClientSession,
         config: RequestConfig,
-        semaphore: asyncio.Semaphore
+        limiter: AIMDLimiter
     ) -> tuple[str, dict | None, int | str]:
-        """Exécute une requête HTTP asynchrone"""
+        """
+        Exécute une requête paginée et retourne le résultat déjà analysé.
         
-        auth = BasicAuth(config.username, config.password) if config.username else None
+        Chaque page prend une place du limiteur et lui remonte sa latence et
+        ses erreurs 5xx/timeout. Une page en échec transitoire est relue, dans
+        la limite du budget de reprises de la session NSO ;
+        l'analyse étant une fusion de dictionnaires, relire des résultats déjà
+        fusionnés est sans effet.
+        """
+        start_time = time.monotonic()
+        result = {}
+        total = 0
+        page = 0
+        attempt = 0
         
-        try:
-            async with semaphore:
-                start_time = time.monotonic()
+        while True:
+            error = None
+            async with limiter:
                 #print(f"→ Starting: {config.name}")
-                
-                async with session.request(
-                    config.method,
-                    config.url,
-                    json=config.payload,
-                    headers=config.headers,
-                    auth=auth,
-                    ssl=False
-                ) as response:
-                    duration = time.monotonic() - start_time
-                    print(f"✓ Données collectées : {config.name} ({response.status}) in {duration:.2f}s")
-                    
-                    if 200 <= response.status < 300:
-                        return config.name, await response.json(), response.status
-                    
-                    error_text = await response.text()
-                    return config.name, None, f"{response.status}: {error_text[:200]}"
-                    
-        except aiohttp.ClientError as e:
-            return config.name, None, f"CLIENT_ERROR: {e}"
-        except Exception as e:
-            return config.name, None, f"UNKNOWN_ERROR: {e}"
+                page_start = time.monotonic()
+                try:
+                    count, result = await self._fetch_page(config, page, result)
+                    limiter.record(time.monotonic() - page_start)
+                except NSOError as e:
+                    error = e
+                    limiter.record(time.monotonic() - page_start, overloaded=e.transient)
+                except ValueError as e:
+                    return config.name, None, f"INVALID_JSON: {e}"
+            
+            if error is not None:
+                nso_config = self.client.config
+                if error.transient and attempt < nso_config.retries and self.client.retry_budget.try_retry():
+                    await asyncio.sleep(backoff_delay(nso_config.backoff, attempt, nso_config.max_backoff))
+                    attempt += 1
+                    continue
+                return config.name, None, error.response.error
+            
+            total += count
+            attempt = 0
+            if not config.page_size or count < config.page_size:
+                break
+            page += 1
+        
+        duration = time.monotonic() - start_time
+        print(f"✓ Données collectées : {config.name} ({total} résultats, {page + 1} pages) in {duration:.2f}s")
+        return config.name, result, 200
     
     async def fetch_all(
         self,
         configs: list[RequestConfig],
-        max_concurrent: int = 5
-    ) -> dict[str, Any]:
-        """Exécute toutes les requêtes en parallèle"""
+        target: dict,
+        max_concurrent: int = 5,
+        adaptive: bool = False
+    ) -> dict[str, int | str]:
+        """
+        Exécute toutes les requêtes en parallèle et fusionne chaque résultat
+        dans target dès que sa requête se termine.
         
-        semaphore = asyncio.Semaphore(max_concurrent)
+        adaptive=False : concurrence fixe max_concurrent.
+        adaptive=True  : AIMD à partir de max_concurrent, jusqu'à ADAPTIVE_MAX_CONCURRENT.
         
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
-            tasks = [self.fetch(session, config, semaphore) for config in configs]
-            results = await asyncio.gather(*tasks)
+        Returns:
+            dict: Statut par requête (200 ou message d'erreur)
+        """
+        if adaptive:
+            limiter = AIMDLimiter(
+                initial=max_concurrent,
+                maximum=max(max_concurrent, ADAPTIVE_MAX_CONCURRENT),
+                target_latency=ADAPTIVE_TARGET_LATENCY
+            )
+        else:
+            limiter = AIMDLimiter(initial=max_concurrent, minimum=max_concurrent, maximum=max_concurrent)
         
-        return self._process_results(results, configs)
-    
-    @staticmethod
-    def _process_results(
-        results: list[tuple],
-        configs: list[RequestConfig]
-    ) -> dict[str, Any]:
-        """Traite les résultats et applique les fonctions d'analyse"""
-        
-        processed = {}
-        
-        for (name, data, status), config in zip(results, configs):
-            if data and config.analysis_func:
-                processed[name] = config.analysis_func(data)
-            elif data:
-                processed[name] = {"status": status, "data": data}
+        analyzed = {config.name: config.analysis_func is not None for config in configs}
+        statuses = {}
+        
+        for next_result in asyncio.as_completed([self.fetch(config, limiter) for config in configs]):
+            name, data, status = await next_result
+            statuses[name] = status
+            if data is None:
+                print(f"✗ {name}: {status}")
+            elif analyzed[name]:
+                DataMerger.merge(target, data)
             else:
-                processed[name] = {"error": status}
+                DataMerger.merge(target, {name: {"status": status, "data": data}})
         
-        return processed
+        if adaptive:
+            print(f"ℹ Concurrence adaptative finale: {int(limiter.limit)}")
+        return statuses
 
 
 # ============================================================
 # DATA PARSERS
 # ============================================================
 
+class ResultStreamParser:
+    """
+    Décodeur JSON incrémental d'une réponse immediate-query.
+    
+    Repère le tableau "result" puis décode chaque élément dès qu'il est
+    complet (json.JSONDecoder.raw_decode) : la réponse n'est jamais chargée
+    entière en mémoire.
+    """
+    
+    RESULT_KEY = '"result"'
+    
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._in_array = False
+        self._done = False
+    
+    def feed(self, chunk: bytes) -> list[dict]:
+        """Ajoute un bloc reçu et retourne les éléments complets"""
+        if self._done:
+            return []
+        self._buffer += self._utf8.decode(chunk)
+        
+        if not self._in_array:
+            key = self._buffer.find(self.RESULT_KEY)
+            bracket = self._buffer.find("[", key) if key >= 0 else -1
+            if bracket < 0:
+                # Conserver la fin du buffer au cas où la clé serait coupée
+                self._buffer = self._buffer[-len(self.RESULT_KEY):] if key < 0 else self._buffer
+                return []
+            self._buffer = self._buffer[bracket + 1:]
+            self._in_array = True
+        
+        items = []
+        position = 0
+        buffer = self._buffer
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position >= len(buffer):
+                break
+            if buffer[position] == "]":
+                self._done = True
+                position = len(buffer)
+                break
+            try:
+                item, position = self._decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break   # Élément incomplet : attendre le bloc suivant
+            items.append(item)
+        
+        self._buffer = buffer[position:]
+        return items
+    
+    def close(self) -> None:
+        """Vérifie qu'aucun élément n'est resté tronqué en fin de flux"""
+        self._buffer += self._utf8.decode(b"", final=True)
+        if self._in_array and not self._done:
+            raise ValueError("Réponse query tronquée (tableau result non terminé)")
+
+
 class ResultParser:
     """Parse les résultats des requêtes NSO"""
     
@@ -255,26 +452,68 @@ class DeviceAnalyzer:
         
         return result
     
+    @staticmethod
+    def analyze_bgp_neighbors(data: dict) -> dict:
+        """Analyse les voisins BGP (routeur Base)"""
+        items = ResultParser.extract_items(data)
+        result = {'BGP': {}}
+        
+        for item in items:
+            device = item.get('device')
+            if not device or not item.get('ip-address'):
+                continue
+            
+            neighbor = result['BGP'].setdefault(device, {}).setdefault(item['ip-address'], {})
+            neighbor['GROUP'] = item.get('group', '')
+            neighbor['PEER_AS'] = ASConverter.plain_to_dot(item['peer-as']) if item.get('peer-as') else ''
+            neighbor['ADMIN_STATE'] = item.get('admin-state', '')
+            neighbor['DESCRIPTION'] = item.get('description', '')
+        
+        return result
+    
+    @staticmethod
+    def analyze_vprns(data: dict) -> dict:
+        """Analyse les services VPRN"""
+        items = ResultParser.extract_items(data)
+        result = {'VPRN': {}}
+        
+        for item in items:
+            device = item.get('device')
+            if not device or not item.get('service-name'):
+                continue
+            
+            vprn = result['VPRN'].setdefault(device, {}).setdefault(item['service-name'], {})
+            vprn['SERVICE_ID'] = int(item['service-id']) if item.get('service-id') else ''
+            vprn['CUSTOMER'] = item.get('customer', '')
+            vprn['ADMIN_STATE'] = item.get('admin-state', '')
+        
+        return result
+    
 
 # ============================================================
 # DATA PROCESSING
 # ============================================================
 
 class DataMerger:
-    """Fusion récursive de dictionnaires"""
+    """Fusion récursive de dictionnaires, en place"""
     
     @staticmethod
-    def merge(dict1: dict, dict2: dict) -> dict:
-        """Fusionne deux dictionnaires récursivement"""
-        merged = dict1.copy()
+    def merge(target: dict, source: dict) -> dict:
+        """
+        Fusionne source dans target récursivement, sans copie, et retourne target.
         
-        for key, value in dict2.items():
-            if key in merged and isinstance(merged[key], dict) and isinstance(value, dict):
-                merged[key] = DataMerger.merge(merged[key], value)
-            elif key not in merged or (value and value != ""):
-                merged[key] = value
+        Une valeur non vide de source remplace celle de target. Les
+        sous-dictionnaires de source absents de target sont repris tels quels :
+        source appartient ensuite à target et ne doit plus être réutilisé.
+        """
+        for key, value in source.items():
+            current = target.get(key)
+            if isinstance(current, dict) and isinstance(value, dict):
+                DataMerger.merge(current, value)
+            elif key not in target or (value and value != ""):
+                target[key] = value
         
-        return merged
+        return target
 
 
 class IPRelationshipBuilder:
@@ -282,32 +521,42 @@ class IPRelationshipBuilder:
     
     @staticmethod
     def build(device_data: dict) -> dict:
-        """Crée un dictionnaire de relations IP par réseau"""
-        ip_relations = {}
+        """
+        Crée un dictionnaire de relations IP par réseau.
         
-        query = parse('$..LOGICAL.*')
-        interfaces = query.find(device_data)
+        Parcours direct DEVICE -> LOGICAL (linéaire), regroupement sur l'adresse
+        réseau entière et la longueur de préfixe. Sur un réseau à exactement deux
+        interfaces (point à point), chacune reçoit la clé de l'autre dans PEER.
+        """
+        networks: dict[tuple[int, int], tuple[str, dict]] = {}
         
-        for interface in interfaces:
-            data = interface.value
-            
-            network = data.get('NETWORK', '')
-            ip = data.get('IP', '')
-            description = data.get('DESCRIPTION', '')
-            
-            if not network or not ip:
-                continue
-            
-            # Extraction du device name depuis le path
-            path_str = str(interface.full_path).replace("'", "")
-            device_match = re.search(r'^(.+)\.LOGICAL', path_str)
-            
-            if device_match:
-                ip_relations.setdefault(network, {})[path_str] = {
+        for device, device_dict in device_data.items():
+            for name, data in device_dict.get('LOGICAL', {}).items():
+                network = data.get('NETWORK', '')
+                ip = data.get('IP', '')
+                
+                if not network or not ip:
+                    continue
+                
+                address, _, prefix = network.partition('/')
+                key = (int(IPv4Address(address)), int(prefix))
+                
+                entry = networks.get(key)
+                if entry is None:
+                    entry = networks[key] = (network, {})
+                entry[1][f"{device}.LOGICAL.{name}"] = {
                     'IP': ip,
-                    'DESCRIPTION': description
+                    'DESCRIPTION': data.get('DESCRIPTION', '')
                 }
         
+        ip_relations = {}
+        for network, members in networks.values():
+            if len(members) == 2:
+                (first, first_data), (second, second_data) = members.items()
+                first_data['PEER'] = second
+                second_data['PEER'] = first
+            ip_relations[network] = members
+        
         return ip_relations
 
 
@@ -342,74 +591,323 @@ class FileManager:
             print(f"\n✗ Error loading {filepath}: {e}")
         
         return None
+    
+    @staticmethod
+    def save_snapshot(sections: dict, filename: str):
+        """Sauvegarde les sections dans un snapshot compact (une passe)"""
+        try:
+            write_snapshot(filename, sections)
+            print(f"\n✓ Snapshot sauvegardé dans {filename} ({', '.join(sections)})")
+        except Exception as e:
+            print(f"\n✗ Error saving {filename}: {e}")
+    
+    @staticmethod
+    def load_snapshot(filename: str) -> dict | None:
+        """Charge toutes les sections d'un snapshot"""
+        try:
+            return SnapshotReader(filename).load_all()
+        except FileNotFoundError:
+            print(f"\n✗ File not found: {filename}")
+        except (ValueError, json.JSONDecodeError) as e:
+            print(f"\n✗ Invalid snapshot {filename}: {e}")
+        except Exception as e:
+            print(f"\n✗ Error loading {filename}: {e}")
+        
+        return None
 
 
 # ============================================================
-# CONFIGURATION
+# CHANGE TRACKING
 # ============================================================
 
-def get_request_configs() -> list[RequestConfig]:
-    """Définit toutes les configurations de requêtes"""
+class ChangeTracker:
+    """
+    Détecte les devices dont la configuration a changé depuis le dernier snapshot.
     
-    base_url = "http://localhost:8080/restconf/tailf/query/"
+    Le marqueur d'un device est le couple ETag / Last-Modified renvoyé par
+    RESTCONF sur devices/device={name}/config (requête HEAD, sans corps).
+    Un device sans marqueur est considéré comme modifié.
+    """
     
-    return [
-        RequestConfig(
-            name="logical_interfaces",
-            url=base_url,
-            payload=NSOQueryBuilder.build(
-                foreach="/devices/device/config/configure/router[router-name='Base']/interface",
-                selectors=[
-                    {"label": "device", "expression": "../../../../name", "result-type": "string"},
-                    {"label": "name", "expression": "./interface-name", "result-type": "string"},
-                    {"label": "path", "expression": ".", "result-type": "path"},
-                    {"label": "address", "expression": "./ipv4/primary/address", "result-type": "string"},
-                    {"label": "mask", "expression": "./ipv4/primary/prefix-length", "result-type": "string"},
-                    {"label": "port", "expression": "./port", "result-type": "string"}
-                ]
-            ),
-            analysis_func=DeviceAnalyzer.analyze_logical_interfaces
-        ),
-        
-        RequestConfig(
-            name="lags",
-            url=base_url,
-            payload=NSOQueryBuilder.build(
-                foreach="/devices/device/config/configure/lag/port/port-id",
-                selectors=[
-                    {"label": "device", "expression": "../../../../../name", "result-type": "string"},
-                    {"label": "lag-name", "expression": "../../lag-name", "result-type": "string"},
-                    {"label": "admin-state", "expression": "../../admin-state", "result-type": "string"},
-                    {"label": "port", "expression": ".", "result-type": "string"}
-                ]
-            ),
-            analysis_func=DeviceAnalyzer.analyze_lags
-        ),
+    def __init__(self, client: NSOClient, max_concurrent: int = 20):
+        self.client = client
+        self.max_concurrent = max_concurrent
+    
+    async def list_devices(self) -> list[str] | None:
+        """Liste des devices NSO (None si la liste n'a pas pu être lue)"""
+        response = await self.client.get("/restconf/data/tailf-ncs:devices/device?fields=name")
+        if not response.ok:
+            print(f"✗ Liste des devices indisponible: {response.error}")
+            return None
+        devices = (response.data or {}).get("tailf-ncs:device", [])
+        return [device["name"] for device in devices]
+    
+    async def list_groups(self) -> dict[str, list[str]] | None:
+        """
+        Device-groups NSO et leurs membres, groupes imbriqués inclus (leaf-list
+        member). None si la liste n'a pas pu être lue.
+        """
+        response = await self.client.get("/restconf/data/tailf-ncs:devices/device-group?fields=name;member")
+        if not response.ok:
+            print(f"✗ Liste des device-groups indisponible: {response.error}")
+            return None
+        groups = (response.data or {}).get("tailf-ncs:device-group", [])
+        return {group["name"]: group.get("member", []) for group in groups}
+    
+    async def fetch_marker(self, device: str, semaphore: asyncio.Semaphore) -> tuple[str, dict | None]:
+        """Marqueur de changement d'un device"""
+        async with semaphore:
+            response = await self.client.head(f"/restconf/data/tailf-ncs:devices/device={device}/config")
         
-        RequestConfig(
-            name="isis",
-            url=base_url,
+        if not response.ok:
+            return device, None
+        marker = {header: response.headers[header] for header in MARKER_HEADERS if header in response.headers}
+        return device, marker or None
+    
+    async def fetch_markers(self, devices: list[str]) -> dict[str, dict | None]:
+        """Marqueurs de tous les devices, en parallèle"""
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        results = await asyncio.gather(*(self.fetch_marker(device, semaphore) for device in devices))
+        return dict(results)
+    
+    @staticmethod
+    def changed_devices(previous: dict[str, dict], current: dict[str, dict | None]) -> list[str]:
+        """Devices modifiés, nouveaux ou sans marqueur"""
+        return [
+            device for device, marker in current.items()
+            if marker is None or previous.get(device) != marker
+        ]
+    
+    @staticmethod
+    def drop_devices(snapshot: dict, devices: list[str], sections: list[str]) -> None:
+        """Retire des devices du snapshot (sections par device), en place"""
+        for section in sections:
+            for device in devices:
+                snapshot.get(section, {}).pop(device, None)
+
+
+# ============================================================
+# COLLECTOR PLUGINS
+# ============================================================
+
+@dataclass
+class CollectorPlugin:
+    """
+    Type de données collecté : requête immediate-query et analyseur associé.
+    
+    Attributes:
+        name (str): Nom de la requête et du collecteur (option --collectors)
+        foreach (str): Chemin foreach relatif au device (après /devices/device[...])
+        selectors (list): Sélecteurs immediate-query
+        analysis_func (Callable): Analyseur d'une réponse query
+        sections (tuple): Sections par device produites par l'analyseur
+        cpu_bound (bool): Analyse exécutée dans le pool de processus
+        default (bool): Collecté quand --collectors n'est pas précisé
+    """
+    name: str
+    foreach: str
+    selectors: list[dict[str, str]]
+    analysis_func: Callable[[dict], dict]
+    sections: tuple[str, ...] = ('DEVICE',)
+    cpu_bound: bool = False
+    default: bool = True
+    
+    def request_config(self, devices_path: str, suffix: str = "") -> RequestConfig:
+        return RequestConfig(
+            name=f"{self.name}{suffix}",
+            url="/restconf/tailf/query/",
             payload=NSOQueryBuilder.build(
-                foreach="/devices/device/config/configure/router[router-name='Base']/isis/interface",
-                selectors=[
-                    {"label": "device", "expression": "../../../../../name", "result-type": "string"},
-                    {"label": "path", "expression": ".", "result-type": "path"},
-                    {"label": "node-sid", "expression": "./ipv4-node-sid/index", "result-type": "string"},
-                    {"label": "adj-sid", "expression": "./ipv4-adjacency-sid/label", "result-type": "string"},
-                    {"label": "metric", "expression": "./level/metric", "result-type": "string"},
-                    {"label": "name", "expression": "./interface-name", "result-type": "string"}
-                ]
+                foreach=f"{devices_path}/{self.foreach}",
+                selectors=self.selectors
             ),
-            analysis_func=DeviceAnalyzer.analyze_isis
+            analysis_func=self.analysis_func,
+            cpu_bound=self.cpu_bound
         )
+
+
+COLLECTORS: dict[str, CollectorPlugin] = {}
+
+
+def register_collector(plugin: CollectorPlugin) -> CollectorPlugin:
+    """Ajoute un collecteur au registre (le nom doit être unique)"""
+    if plugin.name in COLLECTORS:
+        raise ValueError(f"Collecteur déjà enregistré: {plugin.name}")
+    COLLECTORS[plugin.name] = plugin
+    return plugin
+
+
+def default_collectors() -> list[str]:
+    return [name for name, plugin in COLLECTORS.items() if plugin.default]
+
+
+def collector_sections(collectors: list[str]) -> list[str]:
+    """Sections par device alimentées par les collecteurs"""
+    return list(dict.fromkeys(
+        section for name in collectors for section in COLLECTORS[name].sections
+    ))
+
+
+register_collector(CollectorPlugin(
+    name="logical_interfaces",
+    foreach="config/configure/router[router-name='Base']/interface",
+    selectors=[
+        {"label": "device", "expression": "../../../../name", "result-type": "string"},
+        {"label": "name", "expression": "./interface-name", "result-type": "string"},
+        {"label": "path", "expression": ".", "result-type": "path"},
+        {"label": "address", "expression": "./ipv4/primary/address", "result-type": "string"},
+        {"label": "mask", "expression": "./ipv4/primary/prefix-length", "result-type": "string"},
+        {"label": "port", "expression": "./port", "result-type": "string"}
+    ],
+    analysis_func=DeviceAnalyzer.analyze_logical_interfaces,
+    cpu_bound=True
+))
+
+register_collector(CollectorPlugin(
+    name="lags",
+    foreach="config/configure/lag/port/port-id",
+    selectors=[
+        {"label": "device", "expression": "../../../../../name", "result-type": "string"},
+        {"label": "lag-name", "expression": "../../lag-name", "result-type": "string"},
+        {"label": "admin-state", "expression": "../../admin-state", "result-type": "string"},
+        {"label": "port", "expression": ".", "result-type": "string"}
+    ],
+    analysis_func=DeviceAnalyzer.analyze_lags
+))
+
+register_collector(CollectorPlugin(
+    name="isis",
+    foreach="config/configure/router[router-name='Base']/isis/interface",
+    selectors=[
+        {"label": "device", "expression": "../../../../../name", "result-type": "string"},
+        {"label": "path", "expression": ".", "result-type": "path"},
+        {"label": "node-sid", "expression": "./ipv4-node-sid/index", "result-type": "string"},
+        {"label": "adj-sid", "expression": "./ipv4-adjacency-sid/label", "result-type": "string"},
+        {"label": "metric", "expression": "./level/metric", "result-type": "string"},
+        {"label": "name", "expression": "./interface-name", "result-type": "string"}
+    ],
+    analysis_func=DeviceAnalyzer.analyze_isis,
+    sections=('ISIS',)
+))
+
+register_collector(CollectorPlugin(
+    name="bgp_neighbors",
+    foreach="config/configure/router[router-name='Base']/bgp/neighbor",
+    selectors=[
+        {"label": "device", "expression": "../../../../../name", "result-type": "string"},
+        {"label": "ip-address", "expression": "./ip-address", "result-type": "string"},
+        {"label": "group", "expression": "./group", "result-type": "string"},
+        {"label": "peer-as", "expression": "./peer-as", "result-type": "string"},
+        {"label": "admin-state", "expression": "./admin-state", "result-type": "string"},
+        {"label": "description", "expression": "./description", "result-type": "string"}
+    ],
+    analysis_func=DeviceAnalyzer.analyze_bgp_neighbors,
+    sections=('BGP',),
+    default=False
+))
+
+register_collector(CollectorPlugin(
+    name="vprns",
+    foreach="config/configure/service/vprn",
+    selectors=[
+        {"label": "device", "expression": "../../../../name", "result-type": "string"},
+        {"label": "service-name", "expression": "./service-name", "result-type": "string"},
+        {"label": "service-id", "expression": "./service-id", "result-type": "string"},
+        {"label": "customer", "expression": "./customer", "result-type": "string"},
+        {"label": "admin-state", "expression": "./admin-state", "result-type": "string"}
+    ],
+    analysis_func=DeviceAnalyzer.analyze_vprns,
+    sections=('VPRN',),
+    default=False
+))
+
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+
+def device_xpath(devices: Optional[list[str]] = None, group: Optional[str] = None) -> str:
+    """
+    Chemin foreach des devices, restreint à une liste ou à un device-group
+    (member : membres directs et des groupes imbriqués)
+    """
+    if group is not None:
+        return f"/devices/device[name=/devices/device-group[name='{group}']/member]"
+    if devices is None:
+        return "/devices/device"
+    names = " or ".join(f"name='{device}'" for device in devices)
+    return f"/devices/device[{names}]"
+
+
+def get_request_configs(
+    devices: Optional[list[str]] = None,
+    group: Optional[str] = None,
+    shard: str = "",
+    collectors: Optional[list[str]] = None
+) -> list[RequestConfig]:
+    """
+    Requêtes des collecteurs choisis (collecteurs par défaut et tous les
+    devices si non précisés).
+    
+    shard suffixe le nom des requêtes pour distinguer les shards d'un même type.
+    """
+    
+    devices_path = device_xpath(devices, group)
+    suffix = f"[{shard}]" if shard else ""
+    
+    return [
+        COLLECTORS[name].request_config(devices_path, suffix)
+        for name in collectors or default_collectors()
     ]
 
 
+def get_sharded_request_configs(
+    devices: list[str],
+    groups: Optional[dict[str, list[str]]] = None,
+    shard_size: int = SHARD_SIZE,
+    collectors: Optional[list[str]] = None
+) -> list[RequestConfig]:
+    """
+    Découpe les requêtes en shards : un par device-group non vide si groups
+    ({groupe: membres}) est fourni, sinon par lots de shard_size noms de devices.
+    
+    En mode groupe, un device membre de plusieurs groupes est collecté plusieurs
+    fois (la fusion est idempotente) et les devices hors groupe sont collectés
+    par lots de noms, pour que tous les devices listés soient couverts.
+    """
+    configs = []
+    if groups is not None:
+        grouped = set()
+        for group, members in groups.items():
+            if members:
+                grouped.update(members)
+                configs.extend(get_request_configs(group=group, shard=group, collectors=collectors))
+        devices = [device for device in devices if device not in grouped]
+    
+    prefix = "hors-groupe-" if groups is not None else ""
+    configs.extend(
+        config
+        for start in range(0, len(devices), shard_size)
+        for config in get_request_configs(
+            devices[start:start + shard_size],
+            shard=f"{prefix}{start // shard_size}",
+            collectors=collectors
+        )
+    )
+    return configs
+
+
 # ============================================================
 # MAIN
 # ============================================================
 
-async def main():
+async def main(
+    full: bool = False,
+    shard_by: Optional[str] = None,
+    shard_size: int = SHARD_SIZE,
+    only_devices: Optional[list[str]] = None,
+    collectors: Optional[list[str]] = None,
+    analysis_workers: int = ANALYSIS_WORKERS
+):
     """Point d'entrée principal"""
     start_time = time.time()
     
@@ -417,38 +915,138 @@ async def main():
     print("NSO Data Collector")
     print("="*60)
     
-    # Exécuter les requêtes
-    client = NSOClient(timeout=600)
-    configs = get_request_configs()
-    results = await client.fetch_all(configs, max_concurrent=2)
-
-    # Fusionner les résultats
-    final_data = {}
-    for analysis_result in results.values():
-        if isinstance(analysis_result, dict) and 'error' not in analysis_result:
-            final_data = DataMerger.merge(final_data, analysis_result)
+    collectors = list(collectors or default_collectors())
+    sections = collector_sections(collectors)
+    print(f"ℹ Collecteurs: {', '.join(collectors)}")
+    
+    # Snapshot et marqueurs du run précédent (collecte incrémentale), valables
+    # uniquement s'ils ont été produits par les mêmes collecteurs
+    snapshot = None
+    previous_markers = {}
+    if not full and Path(SNAPSHOT_FILE).exists() and Path(MARKERS_FILE).exists():
+        snapshot = FileManager.load_snapshot(SNAPSHOT_FILE)
+        if snapshot is not None and snapshot.get('COLLECTORS') != sorted(collectors):
+            print("ℹ Collecteurs différents du snapshot précédent")
+            snapshot = None
+        else:
+            previous_markers = FileManager.load(MARKERS_FILE) or {}
+    
+    metrics = NSOMetrics()
+    nso_config = NSOConfig(timeout=600, limit_per_host=ADAPTIVE_MAX_CONCURRENT)
+    cpu_bound = any(COLLECTORS[name].cpu_bound for name in collectors)
+    executor = ProcessPoolExecutor(max_workers=analysis_workers) if cpu_bound and analysis_workers else nullcontext()
+    
+    async with NSOClient(nso_config, metrics_hook=metrics) as nso:
+        tracker = ChangeTracker(nso)
+        
+        # Devices à recollecter (None = tous)
+        changed = None
+        if only_devices and snapshot is not None:
+            # Recollecte ciblée (ex: déclenchée par un événement NSO)
+            devices = only_devices
+            markers = {**previous_markers, **await tracker.fetch_markers(only_devices)}
+            changed = list(only_devices)
+            ChangeTracker.drop_devices(snapshot, changed, sections)
+            print(f"ℹ Collecte ciblée: {', '.join(changed)}")
+        else:
+            devices = await tracker.list_devices()
+            markers = await tracker.fetch_markers(devices) if devices is not None else {}
+            
+            if snapshot is not None and previous_markers and devices is not None:
+                changed = ChangeTracker.changed_devices(previous_markers, markers)
+                removed = [device for device in snapshot.get('DEVICE', {}) if device not in markers]
+                ChangeTracker.drop_devices(snapshot, changed + removed, sections)
+                print(f"ℹ Collecte incrémentale: {len(changed)} device(s) modifié(s), "
+                      f"{len(removed)} supprimé(s) sur {len(devices)}")
+            else:
+                print("ℹ Collecte complète")
+        
+        # Fusionner les résultats dans le snapshot (vide en collecte complète)
+        final_data = snapshot if changed is not None else {}
+        
+        # Exécuter les requêtes, chaque résultat est fusionné dès réception
+        statuses = {}
+        if changed is None or changed:
+            targets = changed if changed is not None else devices
+            groups = None
+            if shard_by == "group" and changed is None and targets is not None:
+                groups = await tracker.list_groups()
+            
+            with executor as pool:
+                collector = NSOQueryCollector(nso, executor=pool)
+                if shard_by and targets is not None:
+                    configs = get_sharded_request_configs(targets, groups, shard_size, collectors)
+                    print(f"ℹ Mode shardé: {len(configs)} requêtes")
+                    statuses = await collector.fetch_all(configs, final_data, max_concurrent=2, adaptive=True)
+                else:
+                    configs = get_request_configs(changed, collectors=collectors)
+                    statuses = await collector.fetch_all(configs, final_data, max_concurrent=2)
+    print(metrics.summary())
+    
+    errors = any(status != 200 for status in statuses.values())
+    final_data['COLLECTORS'] = sorted(collectors)
     
     # Créer les relations IP
     if 'DEVICE' in final_data:
         final_data['IP_RELATION'] = IPRelationshipBuilder.build(final_data['DEVICE'])
-    
-    # order execution
-    order = "5."
 
     # Sauvegarder les résultats
-    FileManager.save(final_data, f"{order}RESULT_NSO_CDB_ALLinONE.json")
+    FileManager.save_snapshot(final_data, SNAPSHOT_FILE)
     
-    if 'ISIS' in final_data:
-        FileManager.save(final_data['ISIS'], f"{order}RESULT_NSO_CDB_ISIS.json")
-    
-    if 'IP_RELATION' in final_data:
-        FileManager.save(final_data['IP_RELATION'], f"{order}RESULT_NSO_CDB_IP_RELATION.json")
-    
-    if 'DEVICE' in final_data:
-        FileManager.save(final_data['DEVICE'], f"{order}RESULT_NSO_CDB_DEVICE.json")
+    # Les marqueurs ne sont enregistrés que si toutes les requêtes ont abouti.
+    # Sinon les anciens marqueurs sont supprimés : comparés au snapshot partiel,
+    # ils feraient passer les devices manquants pour inchangés
+    if errors or devices is None:
+        Path(MARKERS_FILE).unlink(missing_ok=True)
+        print("\n⚠ Snapshot partiel, marqueurs supprimés: le prochain run fera une collecte complète")
+    else:
+        FileManager.save(markers, MARKERS_FILE)
     
     print(f"\n⏱️  Total time: {time.time() - start_time:.2f}s")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Collecte CDB NSO (collecteurs enregistrés: interfaces, LAG, ISIS, ...)")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore le snapshot et les marqueurs, recollecte tous les devices"
+    )
+    parser.add_argument(
+        "--shard-by",
+        choices=["name", "group"],
+        help="Découpe les requêtes par lots de noms ou par device-group, concurrence adaptative (AIMD)"
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=SHARD_SIZE,
+        help=f"Devices par shard en mode --shard-by name (défaut: {SHARD_SIZE})"
+    )
+    parser.add_argument(
+        "--devices",
+        nargs="+",
+        help="Recollecte uniquement ces devices et les fusionne dans le snapshot existant"
+    )
+    parser.add_argument(
+        "--collectors",
+        nargs="+",
+        choices=list(COLLECTORS),
+        help=f"Collecteurs à exécuter (défaut: {' '.join(default_collectors())})"
+    )
+    parser.add_argument(
+        "--analysis-workers",
+        type=int,
+        default=ANALYSIS_WORKERS,
+        help=f"Processus pour les analyseurs coûteux, 0 = dans la boucle asyncio (défaut: {ANALYSIS_WORKERS})"
+    )
+    args = parser.parse_args()
+    
+    asyncio.run(main(
+        full=args.full,
+        shard_by=args.shard_by,
+        shard_size=args.shard_size,
+        only_devices=args.devices,
+        collectors=args.collectors,
+        analysis_workers=args.analysis_workers
+    ))
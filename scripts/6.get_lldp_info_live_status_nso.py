@@ -5,21 +5,48 @@ Auteur: Marc De Oliveira
 Date: 2025
 """
 
+import argparse
 import asyncio
 import json
+import math
 import re
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 
-import aiohttp
-from aiohttp import BasicAuth, ClientTimeout
+from nso_client import BREAKER_STATE_FILE, CLOSED, OPEN, DeviceBreakers, LiveStatusCache, NSOClient, NSOConfig, NSOMetrics, NSOResponse
 
 
 # ============================================================
 # CONFIGURATION & TYPES
 # ============================================================
 
+# Balayage LLDP : pool de workers borné et timeout par device
+DEFAULT_WORKERS = 20
+DEVICE_TIMEOUT = 15.0
+NED_FILTER = "nokia"            # Sous-chaîne du ned-id des devices à interroger
+CIRCUIT_OPEN = "CIRCUIT_OPEN"   # Erreur d'un device écarté par son disjoncteur
+BATCH_MAX_ATTEMPTS = 4          # Requêtes groupées max (devices cités en erreur retirés à chaque essai)
+
+# État opérationnel LLDP (YANG nokia-state) lu au travers du live-status NSO
+LLDP_STATE_FOREACH = "live-status/state/port/ethernet/lldp/dest-mac/remote-system"
+LLDP_STATE_SELECTORS = [
+    {"label": "device", "expression": "../../../../../../../name", "result-type": "string"},
+    {"label": "local_port", "expression": "../../../../port-id", "result-type": "string"},
+    {"label": "mac_type", "expression": "../mac-type", "result-type": "string"},
+    {"label": "index", "expression": "./remote-index", "result-type": "string"},
+    {"label": "chassis_id", "expression": "./chassis-id", "result-type": "string"},
+    {"label": "remote_port", "expression": "./port-id", "result-type": "string"},
+    {"label": "system_name", "expression": "./system-name", "result-type": "string"}
+]
+# Scope affiché par la CLI pour chaque dest-mac
+LLDP_SCOPES = {
+    "nearest-bridge": "NB",
+    "nearest-non-tpmr": "NNT",
+    "nearest-customer": "NC"
+}
+
+
 @dataclass
 class LLDPNeighbor:
     """Représente un voisin LLDP"""
@@ -97,41 +124,96 @@ class LLDPParser:
         return neighbors
 
 
+class LLDPStateParser:
+    """Construit les voisins LLDP depuis l'état opérationnel structuré (nokia-state)"""
+    
+    @staticmethod
+    def neighbor(local_port: str, mac_type: str, remote: dict) -> LLDPNeighbor:
+        return LLDPNeighbor(
+            local_port=local_port,
+            scope=LLDP_SCOPES.get(mac_type, mac_type),
+            remote_chassis_id=str(remote.get("chassis-id", "")),
+            index=int(remote.get("remote-index", 0)),
+            remote_port=str(remote.get("port-id", "")).split(',')[0],
+            remote_system_name=str(remote.get("system-name", ""))
+        )
+    
+    @classmethod
+    def parse_ports(cls, data: dict) -> list[LLDPNeighbor]:
+        """Voisins d'un device depuis la réponse GET .../live-status/nokia-state:state/port"""
+        neighbors = []
+        for port in data.get("nokia-state:port", []):
+            lldp = port.get("ethernet", {}).get("lldp", {})
+            for dest_mac in lldp.get("dest-mac", []):
+                for remote in dest_mac.get("remote-system", []):
+                    neighbors.append(cls.neighbor(port.get("port-id", ""), dest_mac.get("mac-type", ""), remote))
+        return neighbors
+    
+    @classmethod
+    def parse_query(cls, data: dict) -> dict[str, list[LLDPNeighbor]]:
+        """Voisins par device depuis la réponse immediate-query multi-devices"""
+        by_device: dict[str, list[LLDPNeighbor]] = {}
+        for item in data.get("tailf-rest-query:query-result", {}).get("result", []):
+            values = {field["label"]: field.get("value", "") for field in item.get("select", [])}
+            remote = {
+                "remote-index": values.get("index") or 0,
+                "chassis-id": values.get("chassis_id", ""),
+                "port-id": values.get("remote_port", ""),
+                "system-name": values.get("system_name", "")
+            }
+            by_device.setdefault(values["device"], []).append(
+                cls.neighbor(values.get("local_port", ""), values.get("mac_type", ""), remote)
+            )
+        return by_device
+
+
 # ============================================================
 # NSO CLIENT
 # ============================================================
 
 class NSOLiveStatusClient:
-    """Client pour exécuter des commandes live-status sur NSO"""
+    """
+    Client pour exécuter des commandes live-status sur NSO.
+    
+    Avec un LiveStatusCache, les appels identiques (device, commande ou chemin)
+    sont servis depuis le cache ou coalescés avec l'appel déjà en cours.
+    Avec des DeviceBreakers, un device en échec répété est écarté sans appel
+    (erreur CIRCUIT_OPEN) jusqu'à son prochain essai.
+    """
     
     def __init__(
         self,
-        base_url: str = "http://localhost:8080",
-        username: str = "admin",
-        password: str = "admin",
-        timeout: int = 30
+        client: NSOClient,
+        cache: Optional[LiveStatusCache] = None,
+        breakers: Optional[DeviceBreakers] = None
     ):
-        self.base_url = base_url
-        self.auth = BasicAuth(username, password)
-        self.headers = {
-            "Content-Type": "application/yang-data+json",
-            "Accept": "application/yang-data+json"
-        }
-        self.timeout = ClientTimeout(total=timeout)
+        self.client = client
+        self.cache = cache
+        self.breakers = breakers
+    
+    async def _call(self, device: str, send: Callable[[], Awaitable[NSOResponse]]) -> NSOResponse:
+        """Appel live-status protégé par le disjoncteur du device"""
+        if self.breakers is None:
+            return await send()
+        if not self.breakers.allow(device):
+            return NSOResponse(method="", url="", error=CIRCUIT_OPEN)
+        response = await send()
+        self.breakers.record(device, response)
+        return response
     
     def _build_command_url(self, device: str) -> str:
-        """Construit l'URL pour exécuter une commande MD-CLI"""
+        """Construit le chemin pour exécuter une commande MD-CLI"""
         return (
-            f"{self.base_url}/restconf/operations/"
+            f"/restconf/operations/"
             f"tailf-ncs:devices/device={device}/live-status/"
             f"global-operations/md-cli-raw-command"
         )
     
     async def execute_command(
         self,
-        session: aiohttp.ClientSession,
         device: str,
-        command: str
+        command: str,
+        timeout: Optional[float] = None
     ) -> tuple[str, str | None, str | None]:
         """
         Exécute une commande MD-CLI sur un device
@@ -139,62 +221,292 @@ class NSOLiveStatusClient:
         Returns:
             (device, output, error)
         """
+        if self.cache is None:
+            return await self._execute_command(device, command, timeout)
+        return await self.cache.get_or_fetch(
+            device,
+            command,
+            lambda: self._execute_command(device, command, timeout),
+            cacheable=lambda result: result[2] is None
+        )
+    
+    async def _execute_command(
+        self,
+        device: str,
+        command: str,
+        timeout: Optional[float] = None
+    ) -> tuple[str, str | None, str | None]:
         url = self._build_command_url(device)
         payload = {"input": {"md-cli-input-line": command}}
         
+        # Avec un timeout par device, pas de reprise : un device injoignable est écarté vite
+        retries = 0 if timeout else None
+        response = await self._call(
+            device,
+            lambda: self.client.post(url, json=payload, timeout=timeout, retries=retries)
+        )
+        
+        if not response.ok:
+            return device, None, response.error
+        
         try:
-            async with session.post(
-                url,
-                json=payload,
-                headers=self.headers,
-                auth=self.auth,
-                ssl=False
-            ) as response:
-                
-                if response.status != 200:
-                    error_text = await response.text()
-                    return device, None, f"HTTP {response.status}: {error_text[:200]}"
-                
-                data = await response.json()
-                output = data["nokia-oper-global:output"]["results"]["md-cli-output-block"]
-                
-                return device, output, None
-                
-        except aiohttp.ClientError as e:
-            return device, None, f"Client error: {e}"
-        except KeyError as e:
+            output = response.data["nokia-oper-global:output"]["results"]["md-cli-output-block"]
+        except (KeyError, TypeError) as e:
             return device, None, f"Invalid response format: {e}"
-        except Exception as e:
-            return device, None, f"Unexpected error: {e}"
+        
+        return device, output, None
+    
+    async def _sweep(
+        self,
+        devices: list[str],
+        fetch: Callable[[str], Awaitable[LLDPResult]],
+        max_concurrent: int
+    ) -> list[LLDPResult]:
+        """
+        Exécute fetch(device) sur tous les devices avec un pool de workers borné.
+        Les résultats suivent l'ordre de devices.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for position, device in enumerate(devices):
+            queue.put_nowait((position, device))
+        results: list[LLDPResult | None] = [None] * len(devices)
+        
+        async def worker():
+            while True:
+                try:
+                    position, device = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                results[position] = await fetch(device)
+        
+        workers = max(1, min(max_concurrent, len(devices)))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
     
     async def get_lldp_neighbors(
         self,
         devices: list[str],
-        max_concurrent: int = 5
+        max_concurrent: int = DEFAULT_WORKERS,
+        timeout: float = DEVICE_TIMEOUT
     ) -> list[LLDPResult]:
-        """Récupère les voisins LLDP de plusieurs devices en parallèle"""
+        """
+        Récupère les voisins LLDP de plusieurs devices par la CLI (md-cli-raw-command).
         
-        semaphore = asyncio.Semaphore(max_concurrent)
+        max_concurrent workers consomment une file de devices ; chaque device a
+        son propre timeout, la durée du balayage est donc bornée par
+        ceil(devices / workers) * timeout. Les résultats suivent l'ordre de devices.
+        """
+        async def fetch(device: str) -> LLDPResult:
+            print(f"→ Fetching LLDP neighbors from {device}")
+            device_name, output, error = await self.execute_command(
+                device,
+                "show system lldp neighbor",
+                timeout=timeout
+            )
+            print(f"{'✗ Skipped' if error else '✓ Completed'} {device_name}")
+            
+            if error:
+                return LLDPResult(device=device_name, neighbors=[], error=error)
+            return LLDPResult(device=device_name, neighbors=LLDPParser.parse(output))
         
-        async def fetch_with_semaphore(session: aiohttp.ClientSession, device: str):
-            async with semaphore:
-                print(f"→ Fetching LLDP neighbors from {device}")
-                device_name, output, error = await self.execute_command(
-                    session,
-                    device,
-                    "show system lldp neighbor"
-                )
-                print(f"✓ Completed {device_name}")
-                
+        return await self._sweep(devices, fetch, max_concurrent)
+    
+    async def query_lldp_state(
+        self,
+        devices: list[str],
+        timeout: float
+    ) -> tuple[list[LLDPResult] | None, NSOResponse]:
+        """
+        Voisins LLDP de tous les devices en une seule immediate-query sur l'état
+        opérationnel. Retourne (None, réponse) si la requête groupée échoue.
+        """
+        names = " or ".join(f"name='{device}'" for device in devices)
+        payload = {
+            "tailf-rest-query:immediate-query": {
+                "foreach": f"/devices/device[{names}]/{LLDP_STATE_FOREACH}",
+                "select": LLDP_STATE_SELECTORS
+            }
+        }
+        response = await self.client.post("/restconf/tailf/query", json=payload, timeout=timeout)
+        if not response.ok:
+            print(f"✗ Requête LLDP groupée en échec: {response.error}")
+            return None, response
+        
+        by_device = LLDPStateParser.parse_query(response.data or {})
+        return [LLDPResult(device=device, neighbors=by_device.get(device, [])) for device in devices], response
+    
+    @staticmethod
+    def _devices_in_error(devices: list[str], error: Optional[str]) -> list[str]:
+        """Devices du lot cités dans le message d'erreur NSO (ex: Failed to connect to device R7)"""
+        words = set(re.findall(r"[\w.-]+", error or ""))
+        return [device for device in devices if device in words]
+    
+    async def get_lldp_state(self, device: str, timeout: Optional[float] = None) -> LLDPResult:
+        """Voisins LLDP d'un device depuis son état opérationnel (GET live-status)"""
+        if self.cache is None:
+            return await self._get_lldp_state(device, timeout)
+        return await self.cache.get_or_fetch(
+            device,
+            "nokia-state:state/port",
+            lambda: self._get_lldp_state(device, timeout),
+            cacheable=lambda result: result.error is None
+        )
+    
+    async def _get_lldp_state(self, device: str, timeout: Optional[float] = None) -> LLDPResult:
+        response = await self._call(device, lambda: self.client.get(
+            f"/restconf/data/tailf-ncs:devices/device={device}/live-status/nokia-state:state/port",
+            timeout=timeout,
+            retries=0 if timeout else None
+        ))
+        if not response.ok:
+            return LLDPResult(device=device, neighbors=[], error=response.error)
+        return LLDPResult(device=device, neighbors=LLDPStateParser.parse_ports(response.data or {}))
+    
+    async def collect_lldp(
+        self,
+        devices: list[str],
+        max_concurrent: int = DEFAULT_WORKERS,
+        timeout: float = DEVICE_TIMEOUT,
+        batch_timeout: Optional[float] = None
+    ) -> list[LLDPResult]:
+        """
+        Collecte structurée avec repli.
+        
+        1. Une immediate-query groupée sur l'état LLDP de tous les devices dont
+           le disjoncteur est fermé, avec le timeout d'un seul device. Un device
+           injoignable fait échouer la requête : les devices cités dans l'erreur
+           sont imputés à leur disjoncteur, retirés du lot, et la requête est
+           relancée (BATCH_MAX_ATTEMPTS au plus).
+        2. Pour les autres, ou si l'échec n'est imputable à aucun device
+           (timeout), un GET de l'état par device (pool de workers).
+        3. Pour les devices dont l'état n'a pas pu être lu, la commande CLI.
+        """
+        by_device: dict[str, LLDPResult] = {}
+        batch_devices = [
+            device for device in devices
+            if self.breakers is None or self.breakers.state(device) == CLOSED
+        ]
+        batch_timeout = batch_timeout or timeout
+        for _ in range(BATCH_MAX_ATTEMPTS):
+            if not batch_devices:
+                break
+            results, response = await self.query_lldp_state(batch_devices, batch_timeout)
+            if results is not None:
+                print(f"✓ État LLDP de {len(batch_devices)} devices lu en une requête")
+                by_device.update((result.device, result) for result in results)
+                break
+            
+            failed = self._devices_in_error(batch_devices, response.error)
+            if not failed:
+                break
+            for device in failed:
+                if self.breakers is not None:
+                    self.breakers.record(device, response)
+                print(f"✗ Skipped {device} ({response.error[:60]})")
+                by_device[device] = LLDPResult(device=device, neighbors=[], error=response.error)
+            batch_devices = [device for device in batch_devices if device not in failed]
+        
+        async def fetch(device: str) -> LLDPResult:
+            result = await self.get_lldp_state(device, timeout)
+            if result.error == CIRCUIT_OPEN:
+                print(f"✗ Skipped {device} (disjoncteur ouvert)")
+                return result
+            if result.error:
+                print(f"→ Repli CLI pour {device} ({result.error[:60]})")
+                _, output, error = await self.execute_command(device, "show system lldp neighbor", timeout=timeout)
                 if error:
-                    return LLDPResult(device=device_name, neighbors=[], error=error)
-                
-                neighbors = LLDPParser.parse(output)
-                return LLDPResult(device=device_name, neighbors=neighbors)
+                    return LLDPResult(device=device, neighbors=[], error=error)
+                return LLDPResult(device=device, neighbors=LLDPParser.parse(output))
+            print(f"✓ Completed {device}")
+            return result
+        
+        remaining = [device for device in devices if device not in by_device]
+        if remaining:
+            for result in await self._sweep(remaining, fetch, max_concurrent):
+                by_device[result.device] = result
+        return [by_device[device] for device in devices]
+
+
+# ============================================================
+# DEVICE INVENTORY
+# ============================================================
+
+class DeviceInventory:
+    """Découverte des devices à interroger (NSO, device-group ou Neo4j)"""
+    
+    def __init__(self, client: NSOClient, breakers: Optional[DeviceBreakers] = None):
+        self.client = client
+        self.breakers = breakers
+    
+    @staticmethod
+    def _ned_ids(device: dict) -> list[str]:
+        """ned-id des différents types de device (cli, netconf, generic...)"""
+        return [
+            device_type.get("ned-id", "")
+            for device_type in device.get("device-type", {}).values()
+            if isinstance(device_type, dict)
+        ]
+    
+    async def from_nso(self, ned_filter: Optional[str] = NED_FILTER) -> list[str]:
+        """
+        Devices NSO joignables dont le ned-id contient ned_filter : déverrouillés
+        (admin-state unlocked), non désactivés (oper-state) et dont le
+        disjoncteur n'est pas ouvert (ils seront réessayés une fois half-open)
+        """
+        response = await self.client.get(
+            "/restconf/data/tailf-ncs:devices/device?fields=name;device-type;state(admin-state;oper-state)"
+        )
+        if not response.ok:
+            print(f"✗ Inventaire NSO indisponible: {response.error}")
+            return []
+        
+        devices = []
+        unreachable = 0
+        for device in (response.data or {}).get("tailf-ncs:device", []):
+            state = device.get("state", {})
+            if ned_filter and not any(ned_filter in ned_id for ned_id in self._ned_ids(device)):
+                continue
+            if (
+                state.get("admin-state", "unlocked") != "unlocked"
+                or state.get("oper-state", "enabled") == "disabled"
+                or (self.breakers is not None and self.breakers.state(device["name"]) == OPEN)
+            ):
+                unreachable += 1
+                continue
+            devices.append(device["name"])
+        if unreachable:
+            print(f"ℹ {unreachable} device(s) écarté(s): verrouillé, désactivé ou disjoncteur ouvert")
+        return devices
+    
+    async def from_group(self, group: str) -> list[str]:
+        """Membres (y compris groupes imbriqués) d'un device-group NSO"""
+        response = await self.client.get(f"/restconf/data/tailf-ncs:devices/device-group={group}?fields=member")
+        if not response.ok:
+            print(f"✗ Device-group {group} indisponible: {response.error}")
+            return []
+        groups = (response.data or {}).get("tailf-ncs:device-group", [])
+        return groups[0].get("member", []) if groups else []
+    
+    @staticmethod
+    async def from_neo4j(
+        uri: str = "bolt://localhost:7687",
+        user: str = "",
+        password: str = "",
+        database: str = "neo4j"
+    ) -> list[str]:
+        """Routeurs PROD_ROUTER présents dans Neo4j (driver synchrone, hors de la boucle)"""
+        return await asyncio.to_thread(DeviceInventory._neo4j_routers, uri, user, password, database)
+    
+    @staticmethod
+    def _neo4j_routers(uri: str, user: str, password: str, database: str) -> list[str]:
+        from neo4j import GraphDatabase
         
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
-            tasks = [fetch_with_semaphore(session, device) for device in devices]
-            return await asyncio.gather(*tasks)
+        with GraphDatabase.driver(uri, auth=(user, password)) as driver:
+            records, _, _ = driver.execute_query(
+                "MATCH (r:PROD_ROUTER) RETURN r.name AS name ORDER BY name",
+                database_=database
+            )
+        return [record["name"] for record in records]
 
 
 # ============================================================
@@ -295,23 +607,53 @@ class LLDPFormatter:
 # MAIN
 # ============================================================
 
-async def main():
+async def main(args: argparse.Namespace):
     """Point d'entrée principal"""
     print("="*60)
     print("NSO LLDP Neighbor Collector")
     print("="*60)
     
     # Configuration
-    devices = ["R1", "R2", "R3"]
-    client = NSOLiveStatusClient(
+    nso_config = NSOConfig(
         base_url="http://localhost:8080",
         username="admin",
-        password="admin"
+        password="admin",
+        limit_per_host=args.workers
     )
+    metrics = NSOMetrics()
     
-    # Récupérer les voisins LLDP
-    print(f"\nFetching LLDP data from {len(devices)} devices...\n")
-    results = await client.get_lldp_neighbors(devices, max_concurrent=3)
+    async with NSOClient(nso_config, metrics_hook=metrics) as nso:
+        # Découverte des devices
+        breakers = DeviceBreakers(BREAKER_STATE_FILE) if args.reset_breakers else DeviceBreakers.load(BREAKER_STATE_FILE)
+        inventory = DeviceInventory(nso, breakers)
+        if args.devices:
+            devices = args.devices
+        elif args.source == "group":
+            devices = await inventory.from_group(args.group)
+        elif args.source == "neo4j":
+            devices = await inventory.from_neo4j()
+        else:
+            devices = await inventory.from_nso(args.ned or None)
+        
+        if not devices:
+            print("✗ Aucun device à interroger")
+            return
+        
+        # Récupérer les voisins LLDP
+        workers = min(args.workers, len(devices))
+        bound = math.ceil(len(devices) / workers) * args.timeout
+        print(f"\nFetching LLDP data from {len(devices)} devices "
+              f"({workers} workers, timeout {args.timeout:.0f}s/device, max ~{bound:.0f}s)...\n")
+        cache = LiveStatusCache()
+        client = NSOLiveStatusClient(nso, cache=cache, breakers=breakers)
+        if args.mode == "cli":
+            results = await client.get_lldp_neighbors(devices, max_concurrent=args.workers, timeout=args.timeout)
+        else:
+            results = await client.collect_lldp(devices, max_concurrent=args.workers, timeout=args.timeout)
+    breakers.save()
+    print(metrics.summary())
+    print(cache.summary())
+    print(breakers.summary())
     
     # Afficher le résumé
     print("\n" + LLDPFormatter.format_summary(results))
@@ -326,14 +668,61 @@ async def main():
 
     # Format détaillé
     detailed_results = [result.to_dict() for result in results]
-    FileManager.save(detailed_results, f"{order}RESULT_LLDP_DETAILED.json")
     
     # Format topologie
     topology = LLDPFormatter.to_topology_dict(results)
+    
+    # Mise à jour des seuls devices collectés dans les fichiers existants
+    if args.merge:
+        collected = {result.device for result in results}
+        if Path(f"{order}RESULT_LLDP_DETAILED.json").exists():
+            previous = FileManager.load(f"{order}RESULT_LLDP_DETAILED.json") or []
+            detailed_results = [r for r in previous if r.get("device") not in collected] + detailed_results
+        if Path(f"{order}RESULT_LLDP_TOPOLOGY.json").exists():
+            topology = {**(FileManager.load(f"{order}RESULT_LLDP_TOPOLOGY.json") or {}), **topology}
+    
+    FileManager.save(detailed_results, f"{order}RESULT_LLDP_DETAILED.json")
     FileManager.save(topology, f"{order}RESULT_LLDP_TOPOLOGY.json")
     
     print("\n✅ Done!")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Collecte LLDP via NSO live-status")
+    parser.add_argument(
+        "--source",
+        choices=["nso", "group", "neo4j"],
+        default="nso",
+        help="Origine de la liste des devices (défaut: inventaire NSO)"
+    )
+    parser.add_argument("--group", help="Device-group NSO (avec --source group)")
+    parser.add_argument(
+        "--ned",
+        default=NED_FILTER,
+        help=f"Filtre sur le ned-id (--source nso, défaut: '{NED_FILTER}', '' = aucun)"
+    )
+    parser.add_argument("--devices", nargs="+", help="Liste explicite de devices (ignore --source)")
+    parser.add_argument(
+        "--merge",
+        action="store_true",
+        help="Met à jour les devices collectés dans les fichiers résultats existants au lieu de les remplacer"
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["state", "cli"],
+        default="state",
+        help="state: état opérationnel YANG (repli CLI par device), cli: show system lldp neighbor"
+    )
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Taille du pool de workers")
+    parser.add_argument("--timeout", type=float, default=DEVICE_TIMEOUT, help="Timeout par device (s)")
+    parser.add_argument(
+        "--reset-breakers",
+        action="store_true",
+        help=f"Ignore l'état des disjoncteurs du run précédent ({BREAKER_STATE_FILE})"
+    )
+    args = parser.parse_args()
+    
+    if args.source == "group" and not args.group and not args.devices:
+        parser.error("--source group nécessite --group")
+    
+    asyncio.run(main(args))
@@ -12,13 +12,61 @@ import json
 import re
 import logging
 import time
+import argparse
 
 from functools import wraps
+from pathlib import Path
 from neo4j import GraphDatabase
+from graph_mapping import load_graph_mapping
+from topology_mirror import RoutingGraphMirror
+import topology_history
+from push_journal import PushJournal, JournalRecorder, DEFAULT_JOURNAL_FILE
+from snapshot_file import load_section
 from typing import Optional, Any, Dict, List
 from dataclasses import dataclass, field
 
 
+# Distances des liens de routage, utilisées par Neo4j et par le miroir CSR
+ROUTING_DISTANCES: List[Dict[str, Any]] = [
+    {"from": "R1", "to": "R2", "distance": 20},
+    {"from": "R2", "to": "R1", "distance": 20},
+    {"from": "R1", "to": "R3", "distance": 100},
+    {"from": "R3", "to": "R1", "distance": 100},
+    {"from": "R2", "to": "R3", "distance": 50},
+    {"from": "R3", "to": "R2", "distance": 50},
+]
+
+# Fichier du miroir CSR de la topologie de routage (lu par 4.AINetwork_Agent)
+ROUTING_MIRROR_FILE = "7.RESULT_ROUTING_MIRROR.npz"
+# Miroir en attente : publié (rename atomique) une fois le journal appliqué sur Neo4j
+ROUTING_MIRROR_PENDING_FILE = "7.RESULT_ROUTING_MIRROR.pending.npz"
+
+# Snapshot NSO CDB à sections écrit par le script 5
+NSO_CDB_SNAPSHOT_FILE = "5.RESULT_NSO_CDB.jsonl"
+
+# NEO4J constraints name and uniqueness property
+NEO_CONSTRAINTS: Dict[str, List[str]] = {
+    "PROD_ROUTER": ["name"],
+    "PROD_IP": ["uid_isis_igp_router_id", "uid_isis_igp_router_name"],
+    "PROD_INT_LOGICAL": ["uid"],
+    "PROD_LAG": ["uid"],
+    "PROD_PORT": ["uid"],
+}
+
+# Relations dérivées par requête Cypher (hors graph_mapping.json)
+DERIVED_RELATIONSHIP_TYPES = ["PROD_ROUTING_LINK", "PROD_IP_OF_INTERFACE"]
+
+# Mode historique : propriétés dont la modification crée une nouvelle version
+HISTORY_TRACKED_NODE_PROPERTIES: Dict[str, List[str]] = {
+    "PROD_ROUTER": ["igp_router_id", "local_router_id", "asn", "srgb_start", "sr_prefix_sid"],
+    "PROD_INT_LOGICAL": ["ip", "mask", "vlan"],
+}
+HISTORY_TRACKED_RELATIONSHIP_PROPERTIES: Dict[str, List[str]] = {
+    "PROD_IP_ISIS_LINK": ["igp_metric", "sr_adjacency_sid"],
+    "PROD_ROUTING_LINK": ["igp_metric", "sr_adjacency_sid", "distance"],
+}
+
+
 @dataclass
 class Neo4jConfig:
     """
@@ -263,10 +311,12 @@ def set_delete_attribute(
         db=database
     )
     
+    # Les relations HIST_ (mode historique) ne sont jamais marquées
     query_delete_propriety_relationship = f"""
         MATCH (n)-[r]-(m)
         WHERE any(label IN labels(n) WHERE label STARTS WITH 'PROD_')
         AND any(label IN labels(m) WHERE label STARTS WITH 'PROD_')
+        AND type(r) STARTS WITH 'PROD_'
         SET r.delete = {delete}
         RETURN count(r)
     """
@@ -359,96 +409,19 @@ def create_isis_topology_from_gobgp(
     """
     Crée la topologie IS-IS dans Neo4j basée sur les données GoBGP.
     
-    Cette fonction crée :
+    Cette fonction crée (writers 'gobgp_*' de graph_mapping.json) :
         - Nœuds routers : routeurs avec leurs propriétés (loopbacks, AS, etc.)
         - Noeuds IP : adresses IP des interfaces
         - Relations : liens IS-IS entre routeurs basés sur les interfaces IP
     """
 
-    batch_router: List[Dict[str, Any]] = []
-    batch_ip: List[Dict[str, Any]] = []
-    batch_relation_router_ip: List[Dict[str, Any]] = []
-    batch_relation_ip_isis_link: List[Dict[str, Any]] = []
-    
-    # Construction des batches
-    for igp_router_id, attrs in gobgp_database['routers'].items():
-        router = {
-            "name": attrs['node_info']['node_name'],
-            "properties": {
-                "update_time": date,
-                "delete": False
-            }
-        }
-
-        local_router_id = attrs['node_info']['local_router_id']
-
-        router_name = attrs['node_info']['node_name']
-        router["properties"]["igp_router_id"] = attrs['node_info']['igp_router_id']
-        router["properties"]["local_router_id"] = local_router_id
-        router["properties"]["asn"] = attrs['node_info']['asn']
-        router["properties"]["srgb_start"] = attrs['node_info']['sr_capabilities']['ranges'][0]['begin']
-        batch_router.append(router)
-
-        for prefix in attrs['prefixes']:
-            if f'{local_router_id}/32' == prefix['prefix']:
-                router["properties"]["sr_prefix_sid"] = prefix['sr_prefix_sid']
-                router["properties"]["sr_prefix_sid_absolute"] = prefix['sr_prefix_sid'] + router["properties"]["srgb_start"]
-                batch_router.append(router)
-
-        for link in attrs['links']:
-            ip_address_local = link['local_ip']
-            ip_node_local = {
-                "uid_isis_igp_router_id": f"{igp_router_id}_{ip_address_local}",
-                "properties": {
-                    "update_time": date,
-                    "delete": False
-                }
-            }
-            ip_node_local["properties"]["node_name"] = router_name
-            ip_node_local["properties"]["uid_isis_router_name"] = f"{router_name}_{ip_address_local}"
-            ip_node_local["properties"]["ip"] = ip_address_local
-            batch_ip.append(ip_node_local)          
-
-            ip_address_remote = link['remote_ip']
-            remote_node_igp_router_id = link['remote_node_igp_router_id']
-            ip_node_remote = {
-                "uid_isis_igp_router_id": f"{remote_node_igp_router_id}_{ip_address_remote}",
-                "properties": {
-                    "update_time": date,
-                    "delete": False
-                }
-            } 
-            ip_node_remote["properties"]["ip"] = ip_address_remote
-            batch_ip.append(ip_node_remote)
-
-            relationship_router_ip = {
-                "router": router_name,
-                "uid_isis_router_name": f"{router_name}_{ip_address_local}",
-                "properties": {
-                    "update_time": date,
-                    "delete": False
-                }
-            }           
-            batch_relation_router_ip.append(relationship_router_ip)
-
-            relationship_router_ip_isis = {
-                "uid_isis_local": ip_node_local["uid_isis_igp_router_id"],
-                "uid_isis_remote": ip_node_remote["uid_isis_igp_router_id"],
-                "properties": {
-                    "update_time": date,
-                    "delete": False
-                }
-            }    
-            
-            relationship_router_ip_isis["properties"]["igp_metric"] = link['igp_metric']    
-            relationship_router_ip_isis["properties"]["sr_adjacency_sid"] = link['sr_adjacency_sid'] 
-            batch_relation_ip_isis_link.append(relationship_router_ip_isis)    
-
-    # Exécution des requêtes en batch
-    _create_router_nodes(neo_connection, batch_router, database)
-    _create_ip_nodes(neo_connection, batch_ip, database)
-    _create_router_ip_relationships(neo_connection, batch_relation_router_ip, database)
-    _create_router_ip_isis_link(neo_connection, batch_relation_ip_isis_link, database)
+    load_graph_mapping().write(
+        neo_connection,
+        source="gobgp",
+        source_data=gobgp_database,
+        context={"date": date},
+        database=database
+    )
    
 
 def _add_property_if_exists(
@@ -478,117 +451,6 @@ def _add_property_if_exists(
         pass
 
 
-def _create_router_nodes(
-    neo_connection: Neo4jConnection,
-    batch_router: List[Dict[str, Any]],
-    database: str
-) -> None:
-    """Crée ou met à jour les nœuds routeurs dans Neo4j."""
-    if not batch_router:
-        return
-    
-    query = """
-    CALL () {
-        UNWIND $batch as row
-        MERGE (n:PROD_ROUTER {name: row.name})
-        SET n += row.properties
-    }
-    IN TRANSACTIONS OF 1000 ROWS
-    """
-    
-    # IMPORTANT: Utiliser query() au lieu de execute_write() 
-    # car IN TRANSACTIONS nécessite une transaction implicite
-    neo_connection.query(
-        query=query,
-        parameters={"batch": batch_router},
-        db=database
-    )
-
-
-def _create_ip_nodes(
-    neo_connection: Neo4jConnection,
-    batch_ip: List[Dict[str, Any]],
-    database: str
-) -> None:
-    """Crée ou met à jour les nœuds routeurs dans Neo4j."""
-    if not batch_ip:
-        return
-    
-    query = """
-    CALL () {
-        UNWIND $batch as row
-        MERGE (n:PROD_IP {uid_isis_igp_router_id: row.uid_isis_igp_router_id})
-        SET n += row.properties
-    }
-    IN TRANSACTIONS OF 1000 ROWS
-    """
-    
-    # IMPORTANT: Utiliser query() au lieu de execute_write() 
-    # car IN TRANSACTIONS nécessite une transaction implicite
-    neo_connection.query(
-        query=query,
-        parameters={"batch": batch_ip},
-        db=database
-    )
-
-def _create_router_ip_relationships(
-    neo_connection: Neo4jConnection,
-    batch_relation_router_ip: List[Dict[str, Any]],
-    database: str
-) -> None:
-    """Crée ou met à jour les relations entre routeurs et préfixes dans Neo4j."""
-    if not batch_relation_router_ip:
-        return
-    
-    query = """
-    CALL () {
-        UNWIND $batch as row
-        MATCH (r:PROD_IP {uid_isis_router_name: row.uid_isis_router_name})
-        MATCH (p:PROD_ROUTER {name: row.router})
-        MERGE (r)-[router_ip:PROD_IP_BELONGS_TO]->(p)
-        SET router_ip += row.properties
-    }
-    IN TRANSACTIONS OF 1000 ROWS
-    """
-    
-    # IMPORTANT: Utiliser query() au lieu de execute_write() 
-    # car IN TRANSACTIONS nécessite une transaction implicite
-    neo_connection.query(
-        query=query,
-        parameters={"batch": batch_relation_router_ip},
-        db=database
-    )
-
-
-def _create_router_ip_isis_link(
-    neo_connection: Neo4jConnection,
-    batch_relation_ip_isis_link: List[Dict[str, Any]],
-    database: str
-) -> None:
-    """Crée ou met à jour les relations entre routeurs et préfixes dans Neo4j."""
-    if not batch_relation_ip_isis_link:
-        return
-    
-    query = """
-    CALL () {
-        UNWIND $batch as row
-        MATCH (r:PROD_IP {uid_isis_igp_router_id: row.uid_isis_local})
-        MATCH (p:PROD_IP {uid_isis_igp_router_id: row.uid_isis_remote})
-        MERGE (r)-[ip_isis_link:PROD_IP_ISIS_LINK]->(p)
-        SET ip_isis_link += row.properties
-    }
-    IN TRANSACTIONS OF 1000 ROWS
-    """
-    
-    # IMPORTANT: Utiliser query() au lieu de execute_write() 
-    # car IN TRANSACTIONS nécessite une transaction implicite
-    neo_connection.query(
-        query=query,
-        parameters={"batch": batch_relation_ip_isis_link},
-        db=database
-    )    
-
-
 #@execution_time
 def create_port_attach_logical_relationships(
     neo_connection: Neo4jConnection,
@@ -617,284 +479,14 @@ def create_port_attach_logical_relationships(
         None
     """
     
-    batch_port: List[Dict[str, Any]] = []
-    batch_lag: List[Dict[str, Any]] = []
-    batch_relation_port_lag: List[Dict[str, Any]] = []
-    batch_interface_logical: List[Dict[str, Any]] = []
-    batch_relation_logical_lag: List[Dict[str, Any]] = []
-    batch_relation_router_logical: List[Dict[str, Any]] = []
-
-    for router, attrs in nso_database.items():
-        # Traitement des ports physiques
-        if "PORT" in attrs:
-            for port, attach in attrs["PORT"].items():
-                port_id = {
-                    "uid": f"{router}_{port}",
-                    "properties": {
-                        "portId": port,
-                        "update_time": date,
-                        "delete": False
-                    }
-                }
-                batch_port.append(port_id)
-
-                if isinstance(attach, dict) and "LAG" in attach and attach["LAG"]:
-                    lag_id = {
-                        "uid": f"{router}_LAG{attach['LAG']}",
-                        "properties": {
-                            "name": attach['LAG'],
-                            "update_time": date,
-                            "delete": False
-                        }
-                    }
-                    batch_lag.append(lag_id)
-
-                    relationship_port_lag = {
-                        "uid_port": f"{router}_{port}",
-                        "uid_lag": f"{router}_LAG{attach['LAG']}",
-                        "properties": {
-                            'update_time': date,
-                            "delete": False
-                        }
-                    }
-                    batch_relation_port_lag.append(relationship_port_lag)
-
-        # Traitement des interfaces logiques
-        if "LOGICAL" in attrs:
-            for itf_logical, itf_logical_attrs in attrs["LOGICAL"].items():
-                if "IP" in itf_logical_attrs and itf_logical_attrs["IP"] != "":
-                    name = itf_logical
-                    prefix = itf_logical_attrs["IP"]
-                    mask = itf_logical_attrs.get("MASK", "")
-                    vlan = itf_logical_attrs.get("VLAN", "")
-                    attach = itf_logical_attrs.get("ATTACH", "")
-
-                    node_int = {
-                        "uid": f"{router}_{name}",
-                        "properties": {
-                            "name": name,
-                            "ip": prefix,
-                            "mask": mask,
-                            "vlan": vlan,
-                            "router": router,
-                            "update_time": date,
-                            "delete": False
-                        }
-                    }
-                    batch_interface_logical.append(node_int)
-
-                    if attach:
-                        relationship_logical_lag = {
-                            "uid_logical": f"{router}_{name}",
-                            "uid_lag": f"{router}_LAG{attach}",
-                            "properties": {
-                                "update_time": date,
-                                "delete": False
-                            }
-                        }
-                        batch_relation_logical_lag.append(relationship_logical_lag)
-
-                    relationship_router_logical = {
-                        "name_router": router,
-                        "uid_logical": f"{router}_{name}",
-                        "properties": {
-                            "update_time": date,
-                            "delete": False
-                        }
-                    }
-                    batch_relation_router_logical.append(relationship_router_logical)
-
-    # Exécution des requêtes en batch
-    _create_port_nodes(neo_connection, batch_port, database)
-    _create_lag_nodes(neo_connection, batch_lag, database)
-    _create_port_lag_relationships(neo_connection, batch_relation_port_lag, database)
-    _create_interface_logical_nodes(neo_connection, batch_interface_logical, database)
-    _create_logical_lag_relationships(neo_connection, batch_relation_logical_lag, database)
-    _create_router_logical_relationships(neo_connection, batch_relation_router_logical, database)
-    
-
-def _create_port_nodes(
-    neo_connection: Neo4jConnection,
-    batch_port: List[Dict[str, Any]],
-    database: str
-) -> None:
-    """Crée ou met à jour les nœuds ports dans Neo4j."""
-    if not batch_port:
-        return
-    
-    query = """
-    CALL () {
-        UNWIND $batch as row
-        MERGE (n:PROD_PORT {uid: row.uid})
-        SET n += row.properties
-    }
-    IN TRANSACTIONS OF 1000 ROWS
-    """
-    
-    neo_connection.query(
-        query=query,
-        parameters={"batch": batch_port},
-        db=database
-    )
-
-
-def _create_lag_nodes(
-    neo_connection: Neo4jConnection,
-    batch_lag: List[Dict[str, Any]],
-    database: str
-) -> None:
-    """Crée ou met à jour les nœuds LAG dans Neo4j."""
-    if not batch_lag:
-        return
-    
-    query = """
-    CALL () {
-        UNWIND $batch as row
-        MERGE (n:PROD_LAG {uid: row.uid})
-        SET n += row.properties
-    }
-    IN TRANSACTIONS OF 1000 ROWS
-    """
-    
-    neo_connection.query(
-        query=query,
-        parameters={"batch": batch_lag},
-        db=database
-    )
-
-
-def _create_port_lag_relationships(
-    neo_connection: Neo4jConnection,
-    batch_relation_port_lag: List[Dict[str, Any]],
-    database: str
-) -> None:
-    """Crée ou met à jour les relations entre ports et LAGs dans Neo4j."""
-    if not batch_relation_port_lag:
-        return
-    
-    query = """
-    CALL () {
-        UNWIND $batch as row
-        MATCH (p:PROD_PORT {uid: row.uid_port})
-        MATCH (l:PROD_LAG {uid: row.uid_lag})
-        MERGE (p)-[port_lag:PROD_IN_LAG]->(l)
-        SET port_lag += row.properties
-    }
-    IN TRANSACTIONS OF 1000 ROWS
-    """
-    
-    neo_connection.query(
-        query=query,
-        parameters={"batch": batch_relation_port_lag},
-        db=database
-    )
-
-
-def _create_interface_logical_nodes(
-    neo_connection: Neo4jConnection,
-    batch_interface_logical: List[Dict[str, Any]],
-    database: str
-) -> None:
-    """Crée ou met à jour les nœuds interfaces logiques dans Neo4j."""
-    if not batch_interface_logical:
-        return
-    
-    query = """
-    CALL () {
-        UNWIND $batch as row
-        MERGE (n:PROD_INT_LOGICAL {uid: row.uid})
-        SET n += row.properties
-    }
-    IN TRANSACTIONS OF 1000 ROWS
-    """
-    
-    neo_connection.query(
-        query=query,
-        parameters={"batch": batch_interface_logical},
-        db=database
-    )
-
-
-def _create_logical_lag_relationships(
-    neo_connection: Neo4jConnection,
-    batch_relation_logical_lag: List[Dict[str, Any]],
-    database: str
-) -> None:
-    """Crée ou met à jour les relations entre interfaces logiques et LAGs dans Neo4j."""
-    if not batch_relation_logical_lag:
-        return
-    
-    query = """
-    CALL () {
-        UNWIND $batch as row
-        MATCH (logical:PROD_INT_LOGICAL {uid: row.uid_logical})
-        MATCH (lag:PROD_LAG {uid: row.uid_lag})
-        MERGE (logical)-[logical_of:PROD_LOGICAL_OF_LAG]->(lag)
-        SET logical_of += row.properties
-    }
-    IN TRANSACTIONS OF 1000 ROWS
-    """
-    
-    neo_connection.query(
-        query=query,
-        parameters={"batch": batch_relation_logical_lag},
-        db=database
-    )
-
-
-def _create_router_logical_relationships(
-    neo_connection: Neo4jConnection,
-    batch_relation_router_logical: List[Dict[str, Any]],
-    database: str
-) -> None:
-    """Crée ou met à jour les relations entre interfaces logiques et routeurs dans Neo4j."""
-    if not batch_relation_router_logical:
-        return
-    
-    query = """
-    CALL () {
-        UNWIND $batch as row
-        MATCH (r:PROD_ROUTER {name: row.name_router})
-        MATCH (logical:PROD_INT_LOGICAL {uid: row.uid_logical})
-        MERGE (logical)-[l:PROD_LOGICAL_OF_ROUTER]->(r)
-        SET l += row.properties
-    }
-    IN TRANSACTIONS OF 1000 ROWS
-    """
-    
-    neo_connection.query(
-        query=query,
-        parameters={"batch": batch_relation_router_logical},
-        db=database
+    load_graph_mapping().write(
+        neo_connection,
+        source="nso",
+        source_data=nso_database,
+        context={"date": date},
+        database=database
     )
-
-
-def _create_lldp_relationships(
-    neo_connection: Neo4jConnection,
-    batch_relation_lldp: List[Dict[str, Any]],
-    database: str
-) -> None:
-    """Crée ou met à jour les relations LLDP entre ports dans Neo4j."""
-    if not batch_relation_lldp:
-        return
-    
-    query = """
-    CALL () {
-        UNWIND $batch as row
-        MATCH (p1:PROD_PORT {uid: row.uid_local_port})
-        MATCH (p2:PROD_PORT {uid: row.uid_remote_port})
-        MERGE (p1)-[l:PROD_LLDP_LINK]->(p2)
-        SET l += row.properties
-    }
-    IN TRANSACTIONS OF 1000 ROWS
-    """
     
-    neo_connection.query(
-        query=query,
-        parameters={"batch": batch_relation_lldp},
-        db=database
-    )
-
 
 #@execution_time
 def create_lldp_link(
@@ -924,29 +516,13 @@ def create_lldp_link(
             >>> create_lldp_link(neo, nso_lldp_database, "2024-11-02")
     """
     
-    batch_relation_lldp: List[Dict[str, Any]] = []
-    
-    # Construction des batches
-    for router, attrs in nso_lldp_database.items():
-        
-        # Traitement des loopbacks
-        if "neighbors" in attrs and isinstance(attrs["neighbors"], dict):
-            for local_port, neighbor_attrs in attrs["neighbors"].items():
-                remote_device = neighbor_attrs["remote_device"]
-                remote_port = neighbor_attrs["remote_port"]
-                
-                relationship_lldp = {
-                    "uid_local_port": f"{router}_{local_port}",
-                    "uid_remote_port": f"{remote_device}_{remote_port}",
-                    "properties": {
-                        "update_time": date,
-                        "delete": False
-                    }
-                }
-                batch_relation_lldp.append(relationship_lldp)
-    
-    # Exécution des requêtes en batch
-    _create_lldp_relationships(neo_connection, batch_relation_lldp, database)
+    load_graph_mapping().write(
+        neo_connection,
+        source="lldp",
+        source_data=nso_lldp_database,
+        context={"date": date},
+        database=database
+    )
 
 
 #@execution_time
@@ -1037,19 +613,13 @@ def create_ip_logical_relationship(
 #@execution_time
 def add_distance_attribute(
     neo_connection: Neo4jConnection,
-    database: str = "neo4j"
+    database: str = "neo4j",
+    distances: List[Dict[str, Any]] = ROUTING_DISTANCES
 ) -> None:
     """Crée un attribut distance sur la relation PROD_ROUTING_LINK dans Neo4j."""
 
     query = """
-        UNWIND [
-            {from: 'R1', to: 'R2', distance: 20},
-            {from: 'R2', to: 'R1', distance: 20},
-            {from: 'R1', to: 'R3', distance: 100},
-            {from: 'R3', to: 'R1', distance: 100},
-            {from: 'R2', to: 'R3', distance: 50},
-            {from: 'R3', to: 'R2', distance: 50}
-        ] AS data
+        UNWIND $distances AS data
 
         // 1. Trouver les nœuds de départ (n1) et d'arrivée (n2)
         MATCH (n1 {name: data.from})-[r:PROD_ROUTING_LINK]->(n2 {name: data.to})
@@ -1063,9 +633,65 @@ def add_distance_attribute(
     
     neo_connection.query(
         query=query,
+        parameters={"distances": distances},
         db=database
     )
 
+
+def save_routing_mirror(
+    gobgp_database: Dict[str, Any],
+    filename: str = ROUTING_MIRROR_PENDING_FILE,
+    distances: List[Dict[str, Any]] = ROUTING_DISTANCES,
+    base_file: str = ROUTING_MIRROR_FILE
+) -> RoutingGraphMirror:
+    """
+    Construit et sauvegarde le miroir CSR de PROD_ROUTER/PROD_ROUTING_LINK.
+
+    Le miroir est construit depuis le même snapshot GoBGP et les mêmes distances
+    que les relations PROD_ROUTING_LINK, pour que les tools de l'agent puissent
+    calculer les chemins sans requête Neo4j. Le miroir publié (base_file) est
+    mis à jour par différence (seuls les arcs ajoutés, modifiés ou disparus sont
+    touchés) ; il est reconstruit s'il est absent, illisible ou si des routeurs
+    ont disparu. Il est écrit en attente à côté du journal et n'est publié par
+    publish_routing_mirror() qu'après le rejeu.
+    """
+    names, edges = RoutingGraphMirror.gobgp_edges(gobgp_database, distances)
+
+    mirror = None
+    if os.path.exists(base_file):
+        try:
+            mirror = RoutingGraphMirror.load(base_file)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠ Miroir de routage {base_file} illisible, reconstruction: {e}")
+
+    if mirror is None or set(mirror.names) - set(names):
+        mirror = RoutingGraphMirror.from_edges(names, edges)
+    else:
+        delta = mirror.apply_edges(names, edges)
+        print(f"✓ Miroir de routage mis à jour: {delta['added']} arc(s) ajouté(s), "
+              f"{delta['updated']} modifié(s), {delta['removed']} supprimé(s)")
+    mirror.save(filename)
+    return mirror
+
+
+def publish_routing_mirror(
+    pending_file: str = ROUTING_MIRROR_PENDING_FILE,
+    filename: str = ROUTING_MIRROR_FILE
+) -> bool:
+    """
+    Publie le miroir en attente une fois le journal appliqué sur Neo4j.
+
+    Le rename est atomique : les consommateurs (agent, pré-vérification du
+    script 3, scheduler de reboot du script 0) voient soit l'ancien miroir,
+    soit celui qui décrit la topologie désormais présente dans Neo4j.
+    """
+    if not os.path.exists(pending_file):
+        return False
+    os.replace(pending_file, filename)
+    print(f"✓ Miroir de routage publié dans {filename}")
+    return True
+
+
 def get_node_statistics(
     neo_connection: Neo4jConnection,
     database: str = "neo4j"
@@ -1170,123 +796,265 @@ def delete_marked_elements(
     
     nodes_deleted = result_nodes[0]['deleted_count'] if result_nodes else 0
     
-    print(f"✓ {relationships_deleted} relations supprimées")
-    print(f"✓ {nodes_deleted} nœuds supprimés")
+    # Pas de résultat lors de l'enregistrement dans le journal
+    if result_relationships or result_nodes:
+        print(f"✓ {relationships_deleted} relations supprimées")
+        print(f"✓ {nodes_deleted} nœuds supprimés")
     
     return relationships_deleted, nodes_deleted
-    
+
+
+def history_targets() -> tuple:
+    """Labels et types de relation PROD_ concernés par le mode historique."""
+    mapping = load_graph_mapping()
+    relationship_types = mapping.targets("relationship") + [
+        rel_type for rel_type in DERIVED_RELATIONSHIP_TYPES
+        if rel_type not in mapping.targets("relationship")
+    ]
+    return mapping.targets("node"), relationship_types
+
+
+def record_import(
+    recorder: JournalRecorder,
+    gobgp_info: Dict[str, Any],
+    nso_router_info: Dict[str, Any],
+    nso_lldp_info: Dict[str, Any],
+    date: str,
+    history: bool = False
+) -> None:
+    """
+    Enregistre dans le journal toutes les écritures d'un import complet.
+
+    Les fonctions d'écriture sont appelées avec le recorder à la place de la
+    connexion Neo4j : rien n'est exécuté avant le rejeu du journal.
+    """
+    node_labels, relationship_types = history_targets()
+    generation = topology_history.generation_from_date(date)
+
+    if history:
+        with recorder.step("ensure_history_indexes"):
+            topology_history.ensure_history_indexes(
+                neo_connection=recorder,
+                node_labels=node_labels,
+                relationship_types=relationship_types
+            )
+        with recorder.step("snapshot_tracked_properties"):
+            topology_history.snapshot_tracked_properties(
+                neo_connection=recorder,
+                tracked_nodes=HISTORY_TRACKED_NODE_PROPERTIES,
+                tracked_relationships=HISTORY_TRACKED_RELATIONSHIP_PROPERTIES
+            )
+
+    # Set attribute delete to True
+    with recorder.step("set_delete_attribute"):
+        set_delete_attribute(
+            neo_connection=recorder, 
+            delete=True
+        )
+
+    # Création de la topologie réseau depuis GoBGP
+    with recorder.step("create_isis_topology_from_gobgp"):
+        create_isis_topology_from_gobgp(
+            neo_connection=recorder,
+            gobgp_database=gobgp_info,
+            date=date
+        )                
+    
+    # Création des relations de routage globales
+    with recorder.step("create_routing_relationship"):
+        create_routing_relationship(
+            neo_connection=recorder
+        )
+    
+    # Création de l'attribut distance sur les relations de routage
+    with recorder.step("add_distance_attribute"):
+        add_distance_attribute(
+            neo_connection=recorder,
+        )
+
+    # Création des relations port, LAG et interfaces logiques
+    with recorder.step("create_port_attach_logical_relationships"):
+        create_port_attach_logical_relationships(
+            neo_connection=recorder,
+            nso_database=nso_router_info,
+            date=date
+        )
+    
+    # Création des relations IP vers interfaces logiques
+    with recorder.step("create_ip_logical_relationship"):
+        create_ip_logical_relationship(
+            neo_connection=recorder
+        )            
+
+    # Création des relations LLDP entre ports
+    with recorder.step("create_lldp_link"):
+        create_lldp_link(
+            neo_connection=recorder,
+            nso_lldp_database=nso_lldp_info,
+            date=date
+        )
+
+    # Suppression des éléments marqués delete = True
+    if history:
+        # Versionner les modifications puis fermer les intervalles
+        with recorder.step("close_changed_versions"):
+            topology_history.close_changed_versions(
+                neo_connection=recorder,
+                tracked_nodes=HISTORY_TRACKED_NODE_PROPERTIES,
+                tracked_relationships=HISTORY_TRACKED_RELATIONSHIP_PROPERTIES,
+                generation=generation
+            )
+        with recorder.step("stamp_new_elements"):
+            topology_history.stamp_new_elements(
+                neo_connection=recorder,
+                node_labels=node_labels,
+                relationship_types=relationship_types,
+                generation=generation
+            )
+        with recorder.step("close_marked_elements"):
+            topology_history.close_marked_elements(
+                neo_connection=recorder,
+                node_labels=node_labels,
+                relationship_types=relationship_types,
+                generation=generation,
+                date=date
+            )
+    else:
+        with recorder.step("delete_marked_elements"):
+            delete_marked_elements(
+                neo_connection=recorder
+            )
+
+
+def print_statistics(neo_connection: Neo4jConnection) -> None:
+    """Affiche la synthèse des nœuds et relations présents dans Neo4j."""
+    print("Synthèse noeuds et relations dans la base Neo4j:")
+    # Statistiques des nœuds
+    node_stats = get_node_statistics(neo_connection=neo_connection)
+    for stat in node_stats:
+        print(f"NODE --> {stat['label']}: {stat['NombreDeNoeuds']} nœuds")
+
+    # Statistiques des relations
+    rel_stats = get_relationship_statistics(neo_connection=neo_connection)
+    for stat in rel_stats:
+        print(f"RELATION --> {stat['TypeRelation']}: {stat['NombreDeRelations']} relations")            
+
 
 if __name__ == "__main__":
 
+    parser = argparse.ArgumentParser(
+        description="Import GoBGP + NSO CDB + LLDP dans Neo4j"
+    )
+    parser.add_argument(
+        "--history",
+        action="store_true",
+        help="Mode historique: archive les éléments disparus/modifiés (valid_from/valid_to) au lieu de les supprimer"
+    )
+    parser.add_argument(
+        "--compact-history",
+        type=int,
+        metavar="GENERATION",
+        help="Supprime les versions archivées fermées avant GENERATION (YYYYMMDDHHMMSS) puis quitte"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Rejoue le journal en attente depuis le dernier chunk validé, sans relire les fichiers collectés"
+    )
+    parser.add_argument(
+        "--journal",
+        default=DEFAULT_JOURNAL_FILE,
+        help=f"Fichier journal d'import (défaut: {DEFAULT_JOURNAL_FILE})"
+    )
+    args = parser.parse_args()
+
     # Configuration du logging
     logging.basicConfig(level=logging.INFO)
 
     date = time.strftime("%Y%m%d-%H%M%S")
+    journal = PushJournal(path=Path(args.journal))
 
-    # Open file coming from GoBGP
-    with open(f"1.RESULT_BGPLS_GRPC_REORGANIZED.json") as json_file:
-        gobgp_info = json.load(json_file)        
-
-    # Open file coming from NSO CDB
-    with open(f"5.RESULT_NSO_CDB_DEVICE.json") as json_file:
-        nso_router_info = json.load(json_file)     
-
-    # Open file coming from NSO Live Status LLDP
-    with open(f"6.RESULT_LLDP_TOPOLOGY.json") as json_file:
-        nso_lldp_info = json.load(json_file)                  
-                         
     # Configuration et connexion
     config = Neo4jConfig(
         uri="bolt://localhost:7687",
         user="",
         password=""
     )
-    
+
+    if not args.resume and not args.compact_history:
+        # Open file coming from GoBGP
+        with open(f"1.RESULT_BGPLS_GRPC_REORGANIZED.json") as json_file:
+            gobgp_info = json.load(json_file)        
+
+        # Section DEVICE du snapshot NSO CDB (les autres sections ne sont pas lues)
+        nso_router_info = load_section(NSO_CDB_SNAPSHOT_FILE, "DEVICE", {})
+
+        # Open file coming from NSO Live Status LLDP
+        with open(f"6.RESULT_LLDP_TOPOLOGY.json") as json_file:
+            nso_lldp_info = json.load(json_file)                  
+
+        # Un nouvel import complet remplace un journal resté en attente
+        if journal.pending():
+            print(f"ℹ Journal en attente {journal.path} remplacé par le nouvel import")
+
+        # Écriture anticipée : le journal est durable avant toute écriture Neo4j
+        print("=" * 60)
+        print("Enregistrement du journal d'import")
+        print("=" * 60)
+        recorder = journal.recorder(journal_id=date)
+        record_import(
+            recorder=recorder,
+            gobgp_info=gobgp_info,
+            nso_router_info=nso_router_info,
+            nso_lldp_info=nso_lldp_info,
+            date=date,
+            history=args.history
+        )
+        journal.commit(recorder)
+
+        # Miroir CSR de la topologie de routage, publié après le rejeu
+        save_routing_mirror(
+            gobgp_database=gobgp_info
+        )
+
     # Utilisation avec context manager
     with Neo4jConnection(config) as neo:
-        if neo.verify_connectivity():
+        connected = neo.verify_connectivity()
+        if connected and args.compact_history:
+            node_labels, relationship_types = history_targets()
+            topology_history.compact_history(
+                neo_connection=neo,
+                node_labels=node_labels,
+                relationship_types=relationship_types,
+                before_generation=args.compact_history
+            )
+        elif connected and not journal.pending():
+            print("ℹ Aucun journal d'import en attente")
+            # Journal appliqué mais miroir non publié (arrêt entre les deux)
+            publish_routing_mirror()
+        elif connected:
             print("=" * 60)
             print("Début de l'import des données dans Neo4j")
             print("=" * 60)
-            
-            # NEO4J constraints name and uniqueness property
-            neo_constraints = {
-                "PROD_ROUTER": ["name"],
-                "PROD_IP": ["uid_isis_igp_router_id", "uid_isis_igp_router_name"],
-                "PROD_INT_LOGICAL": ["uid"],
-                "PROD_LAG": ["uid"],
-                "PROD_PORT": ["uid"],
-            }
 
             check_neo_constraints(
                 neo_connection=neo,
-                neo_constraints=neo_constraints
-)
-            # Set attribute delete to True
-            result_node, result_relationship = set_delete_attribute(
-                neo_connection=neo, 
-                delete=True
+                neo_constraints=NEO_CONSTRAINTS
             )
 
-            # Création de la topologie réseau depuis GoBGP
-            create_isis_topology_from_gobgp(
-                neo_connection=neo,
-                gobgp_database=gobgp_info,
-                date=date
-            )                
-            
-            # Création des relations de routage globales
-            create_routing_relationship(
-                neo_connection=neo
-            )
-            
-            # Création de l'attribut distance sur les relations de routage
-            add_distance_attribute(
-                neo_connection=neo,
-            )
-
-            # Création des relations port, LAG et interfaces logiques
-            create_port_attach_logical_relationships(
-                neo_connection=neo,
-                nso_database=nso_router_info,
-                date=date
-            )
-            
-            # Création des relations IP vers interfaces logiques
-            create_ip_logical_relationship(
-                neo_connection=neo
-            )            
+            try:
+                journal.replay(neo)
+            except Exception:
+                print(f"❌ Import interrompu, journal conservé: relancer avec --resume")
+                raise
+            publish_routing_mirror()
 
-            # Création des relations LLDP entre ports
-            create_lldp_link(
-                neo_connection=neo,
-                nso_lldp_database=nso_lldp_info,
-                date=date
-            )
-                        
-            # Suppression des éléments marqués delete = True
-            print("=" * 60)
-            print("Nettoyage des éléments marqués à supprimer")
             print("=" * 60)
-            
-            delete_marked_elements(
-                neo_connection=neo
-            )
-            print("=" * 60)
-
-            print("Synthèse noeuds et relations dans la base Neo4j:")
-            # Statistiques des nœuds
-            node_stats = get_node_statistics(neo_connection=neo)
-            for stat in node_stats:
-                print(f"NODE --> {stat['label']}: {stat['NombreDeNoeuds']} nœuds")
-
-            # Statistiques des relations
-            rel_stats = get_relationship_statistics(neo_connection=neo)
-            for stat in rel_stats:
-                print(f"RELATION --> {stat['TypeRelation']}: {stat['NombreDeRelations']} relations")            
-
+            print_statistics(neo)
             print("=" * 60)
             print("Import terminé avec succès!")
             print("=" * 60)
         else:
             print("❌ Échec de la connexion à Neo4j")
+            if journal.pending():
+                print(f"   Journal conservé dans {journal.path}: relancer avec --resume")
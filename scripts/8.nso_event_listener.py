@@ -0,0 +1,261 @@
+"""
+Script pour écouter les flux de notifications RESTCONF de NSO et relancer
+la collecte et l'import Neo4j uniquement pour les devices concernés.
+
+Flux écoutés (Server-Sent Events, /restconf/streams/<flux>/json) :
+    - NETCONF    : netconf-config-change (commit sur la config d'un device)
+    - ncs-events : progression des commit-queues
+    - ncs-alarms : alarmes NSO (perte de connexion, changement d'état...)
+
+Chaque notification est traduite en (type de données, device). Les
+événements sont regroupés (debounce) puis les scripts 5 (CDB) et 6 (LLDP)
+sont relancés avec --devices, suivis d'un seul import 7 dans Neo4j.
+
+Auteur: Marc De Oliveira
+Date: 2025
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from nso_client import NSOClient, NSOConfig, NSOError
+
+
+# ============================================================
+# CONFIGURATION & TYPES
+# ============================================================
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+DEFAULT_STREAMS = ["NETCONF", "ncs-events", "ncs-alarms"]
+DEBOUNCE_DELAY = 5.0        # Silence (s) avant de lancer la recollecte
+DEBOUNCE_MAX_WAIT = 30.0    # Attente maximale (s) depuis le premier événement
+RECONNECT_DELAY = 5.0       # Attente initiale avant reconnexion d'un flux
+
+# Types de données et scripts de recollecte associés
+CDB = "cdb"
+LLDP = "lldp"
+COLLECTORS = {
+    CDB: "5.get_nso_cdb_info.py",
+    LLDP: "6.get_lldp_info_live_status_nso.py",
+}
+COLLECTOR_ARGS = {
+    CDB: [],
+    LLDP: ["--merge"],
+}
+GRAPH_PUSH = "7.push_ALL_to_neo4j.py"
+
+# Nom du device dans un chemin XPath NSO: /ncs:devices/ncs:device[ncs:name='R1']/...
+DEVICE_IN_PATH = re.compile(r"device\[(?:[\w-]+:)?name='([^']+)'\]")
+
+
+@dataclass
+class PendingChanges:
+    """Devices à recollecter par type de données, en attente du debounce"""
+    devices: dict[str, set[str]] = field(default_factory=dict)
+    first_event: Optional[float] = None
+    last_event: Optional[float] = None
+
+    def add(self, data_type: str, device: str) -> None:
+        now = time.monotonic()
+        self.devices.setdefault(data_type, set()).add(device)
+        self.first_event = self.first_event or now
+        self.last_event = now
+
+    def ready(self, delay: float, max_wait: float) -> bool:
+        if not self.devices:
+            return False
+        now = time.monotonic()
+        return now - self.last_event >= delay or now - self.first_event >= max_wait
+
+    def take(self) -> dict[str, set[str]]:
+        devices, self.devices = self.devices, {}
+        self.first_event = self.last_event = None
+        return devices
+
+
+# ============================================================
+# EVENT MAPPING
+# ============================================================
+
+class EventMapper:
+    """Traduit une notification NSO en liste de (type de données, device)"""
+
+    @staticmethod
+    def _devices_in(value) -> set[str]:
+        """Noms de devices présents dans les chemins XPath d'une structure"""
+        return set(DEVICE_IN_PATH.findall(json.dumps(value)))
+
+    @classmethod
+    def map(cls, notification: dict) -> list[tuple[str, str]]:
+        body = notification.get("ietf-restconf:notification", notification)
+        changes = set()
+
+        for name, content in body.items():
+            if not isinstance(content, dict):
+                continue
+
+            # Commit sur la configuration d'un device
+            if name.endswith("netconf-config-change"):
+                for edit in content.get("edit", []):
+                    for device in cls._devices_in(edit.get("target", "")):
+                        changes.add((CDB, device))
+
+            # Commit-queue terminée : les devices de l'item ont changé
+            elif name.endswith("commit-queue-progress-event"):
+                if content.get("state") == "completed":
+                    for device in content.get("devices", []):
+                        changes.add((CDB, device))
+
+            # Alarme sur un device : l'état des liens peut avoir changé
+            elif name.endswith("alarm-notification"):
+                device = content.get("device")
+                if device:
+                    changes.add((LLDP, device))
+
+        return sorted(changes)
+
+
+# ============================================================
+# STREAM LISTENER
+# ============================================================
+
+class NSOEventListener:
+    """Abonné aux flux SSE NSO, avec debounce et recollecte ciblée"""
+
+    def __init__(
+        self,
+        client: NSOClient,
+        streams: list[str],
+        debounce: float = DEBOUNCE_DELAY,
+        max_wait: float = DEBOUNCE_MAX_WAIT,
+        push_graph: bool = True
+    ):
+        self.client = client
+        self.streams = streams
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.push_graph = push_graph
+        self.pending = PendingChanges()
+
+    async def _read_events(self, stream: str):
+        """Lit un flux SSE et restitue chaque notification JSON"""
+        buffer = ""
+        data_lines = []
+        async for chunk in self.client.stream(
+            "GET",
+            f"/restconf/streams/{stream}/json",
+            timeout=0,
+            headers={"Accept": "text/event-stream"}
+        ):
+            buffer += chunk.decode("utf-8", errors="replace")
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                line = line.rstrip("\r")
+                if line.startswith("data:"):
+                    data_lines.append(line[5:].strip())
+                elif not line and data_lines:
+                    try:
+                        yield json.loads("\n".join(data_lines))
+                    except json.JSONDecodeError as e:
+                        print(f"✗ Notification illisible sur {stream}: {e}")
+                    data_lines = []
+
+    async def listen(self, stream: str) -> None:
+        """Écoute un flux en continu, avec reconnexion"""
+        delay = RECONNECT_DELAY
+        while True:
+            try:
+                print(f"→ Abonnement au flux {stream}")
+                async for notification in self._read_events(stream):
+                    delay = RECONNECT_DELAY
+                    for data_type, device in EventMapper.map(notification):
+                        print(f"  • {stream}: {data_type} {device}")
+                        self.pending.add(data_type, device)
+            except NSOError as e:
+                print(f"✗ Flux {stream} interrompu: {e}")
+            print(f"  Reconnexion à {stream} dans {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60.0)
+
+    async def _run_script(self, script: str, args: list[str]) -> bool:
+        """Exécute un script du répertoire scripts/ dans le répertoire courant"""
+        print(f"\n▶ {script} {' '.join(args)}")
+        process = await asyncio.create_subprocess_exec(sys.executable, str(SCRIPTS_DIR / script), *args)
+        return await process.wait() == 0
+
+    async def refresh(self, changes: dict[str, set[str]]) -> None:
+        """Recollecte les devices concernés puis met à jour le graphe une seule fois"""
+        collected = False
+        for data_type, script in COLLECTORS.items():
+            devices = sorted(changes.get(data_type, ()))
+            if not devices:
+                continue
+            if await self._run_script(script, COLLECTOR_ARGS[data_type] + ["--devices", *devices]):
+                collected = True
+            else:
+                print(f"✗ Échec de {script}, devices remis en attente")
+                for device in devices:
+                    self.pending.add(data_type, device)
+
+        if collected and self.push_graph:
+            await self._run_script(GRAPH_PUSH, [])
+
+    async def dispatch(self) -> None:
+        """Lance la recollecte dès que le debounce est écoulé"""
+        while True:
+            await asyncio.sleep(0.5)
+            if self.pending.ready(self.debounce, self.max_wait):
+                changes = self.pending.take()
+                summary = ", ".join(f"{t}: {len(d)}" for t, d in changes.items())
+                print(f"\n{'='*60}\nRecollecte ciblée ({summary})\n{'='*60}")
+                await self.refresh(changes)
+
+    async def run(self) -> None:
+        await asyncio.gather(
+            self.dispatch(),
+            *(self.listen(stream) for stream in self.streams)
+        )
+
+
+# ============================================================
+# MAIN
+# ============================================================
+
+async def main(args: argparse.Namespace):
+    """Point d'entrée principal"""
+    print("="*60)
+    print("NSO Event Listener")
+    print("="*60)
+
+    async with NSOClient(NSOConfig()) as nso:
+        listener = NSOEventListener(
+            nso,
+            streams=args.streams,
+            debounce=args.debounce,
+            max_wait=args.max_wait,
+            push_graph=not args.no_push
+        )
+        await listener.run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recollecte pilotée par les notifications NSO")
+    parser.add_argument("--streams", nargs="+", default=DEFAULT_STREAMS, help="Flux RESTCONF à écouter")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_DELAY, help="Silence avant recollecte (s)")
+    parser.add_argument("--max-wait", type=float, default=DEBOUNCE_MAX_WAIT, help="Attente maximale (s)")
+    parser.add_argument("--no-push", action="store_true", help="Ne relance pas l'import Neo4j (script 7)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        print("\n✗ Listener arrêté")
+        sys.exit(130)
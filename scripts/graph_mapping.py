@@ -0,0 +1,417 @@
+"""
+Mapping déclaratif des snapshots collectés (GoBGP, NSO CDB, LLDP) vers le graphe Neo4j.
+
+Le fichier graph_mapping.json décrit, pour chaque writer, le chemin de parcours
+dans le snapshot source, le label PROD_ (ou le type de relation), les clés de
+MERGE et les propriétés à positionner. Il est compilé une seule fois en
+extracteurs de lignes et en requêtes Cypher paramétrées : le texte de chaque
+requête est constant, ce qui permet à Neo4j de réutiliser le plan en cache.
+
+Syntaxe des valeurs :
+    "$a.b.0.c"                  : valeur brute lue dans le scope (dict/list)
+    "{a.b}_{c}"                 : template chaîne (KeyError si une valeur manque)
+    {"path": "$a.b", "default": ""}
+    {"sum": ["$a", "$b"]}
+    toute autre valeur          : littéral
+
+Auteur: Marc De Oliveira
+Date: 2025
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+DEFAULT_MAPPING_FILE = Path(__file__).with_name("graph_mapping.json")
+
+_IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_TEMPLATE_PATTERN = re.compile(r"\{([^{}]+)\}")
+
+_MISSING = object()
+
+Scope = Dict[str, Any]
+ValueGetter = Callable[[Scope], Any]
+
+
+# ============================================================
+# COMPILATION DES EXPRESSIONS
+# ============================================================
+
+def _check_identifier(name: str, what: str) -> str:
+    """Valide un label, type ou nom de propriété avant injection dans le Cypher."""
+    if not isinstance(name, str) or not _IDENTIFIER_PATTERN.match(name):
+        raise ValueError(f"{what} invalide dans le mapping: {name!r}")
+    return name
+
+
+def _compile_path(path: str) -> ValueGetter:
+    """Compile un chemin pointé ('router.node_info.asn') en accesseur."""
+    segments = tuple(segment for segment in path.split(".") if segment)
+    if not segments:
+        raise ValueError(f"Chemin vide dans le mapping: {path!r}")
+
+    def getter(scope: Scope) -> Any:
+        value: Any = scope
+        for segment in segments:
+            if isinstance(value, dict):
+                value = value.get(segment, _MISSING)
+            elif isinstance(value, list) and segment.isdigit():
+                index = int(segment)
+                value = value[index] if index < len(value) else _MISSING
+            else:
+                return None
+            if value is _MISSING:
+                return None
+        return value
+
+    return getter
+
+
+def _compile_template(template: str) -> ValueGetter:
+    """Compile un template '{a.b}_{c}' en fonction de formatage."""
+    parts: List[Any] = []
+    position = 0
+    for match in _TEMPLATE_PATTERN.finditer(template):
+        if match.start() > position:
+            parts.append(template[position:match.start()])
+        parts.append(_compile_path(match.group(1)))
+        position = match.end()
+    if position < len(template):
+        parts.append(template[position:])
+
+    def getter(scope: Scope) -> str:
+        values = []
+        for part in parts:
+            value = part if isinstance(part, str) else part(scope)
+            if value is None:
+                # Comme les f-strings d'origine : pas de clé "R1_None" fusionnée par MERGE
+                raise KeyError(f"Valeur absente pour le template {template!r}")
+            values.append(str(value))
+        return "".join(values)
+
+    return getter
+
+
+def compile_value(spec: Any) -> ValueGetter:
+    """Compile une spécification de valeur du mapping en accesseur."""
+    if isinstance(spec, str):
+        if spec.startswith("$"):
+            return _compile_path(spec[1:])
+        if _TEMPLATE_PATTERN.search(spec):
+            return _compile_template(spec)
+        return lambda scope: spec
+
+    if isinstance(spec, dict):
+        if "path" in spec:
+            getter = compile_value(spec["path"])
+            default = spec.get("default")
+
+            def with_default(scope: Scope) -> Any:
+                value = getter(scope)
+                return default if value is None else value
+
+            return with_default
+
+        if "sum" in spec:
+            getters = [compile_value(item) for item in spec["sum"]]
+
+            def summed(scope: Scope) -> Any:
+                values = [getter(scope) for getter in getters]
+                if any(not isinstance(v, (int, float)) or isinstance(v, bool) for v in values):
+                    return None
+                return sum(values)
+
+            return summed
+
+        raise ValueError(f"Expression inconnue dans le mapping: {spec}")
+
+    return lambda scope: spec
+
+
+def _compile_condition(spec: Dict[str, Any]) -> Callable[[Scope], bool]:
+    """Compile une condition 'where' (equals / not_empty)."""
+    if "equals" in spec:
+        left, right = (compile_value(item) for item in spec["equals"])
+
+        def equals(scope: Scope) -> bool:
+            # Un template incomplet ne peut égaler aucune valeur
+            try:
+                return left(scope) == right(scope)
+            except KeyError:
+                return False
+
+        return equals
+
+    if "not_empty" in spec:
+        getter = compile_value(spec["not_empty"])
+        return lambda scope: getter(scope) not in (None, "", {}, [])
+
+    raise ValueError(f"Condition inconnue dans le mapping: {spec}")
+
+
+def _compile_properties(spec: Dict[str, Any]) -> List[Tuple[str, ValueGetter]]:
+    """Compile un dictionnaire {propriété: expression}."""
+    return [
+        (_check_identifier(name, "Propriété"), compile_value(value))
+        for name, value in spec.items()
+    ]
+
+
+def _iterate(container: Any) -> Iterator[Tuple[Any, Any]]:
+    """Itère un dict (clé, valeur) ou une liste (index, élément)."""
+    if isinstance(container, dict):
+        yield from container.items()
+    elif isinstance(container, list):
+        yield from enumerate(container)
+
+
+# ============================================================
+# WRITERS COMPILÉS
+# ============================================================
+
+@dataclass
+class ForeachStep:
+    """Étape de parcours du snapshot source."""
+    path: ValueGetter
+    bind_as: str
+    bind_key: Optional[str] = None
+
+
+@dataclass
+class CompiledWriter:
+    """
+    Writer compilé : extracteur de lignes + requête Cypher paramétrée.
+
+    Attributes:
+        name (str): Nom du writer (unique dans le mapping)
+        source (str): Nom du snapshot source (gobgp, nso, lldp...)
+        kind (str): 'node' ou 'relationship'
+        target (str): Label du nœud ou type de la relation écrite
+        query (str): Requête Cypher constante (plan mis en cache côté serveur)
+    """
+    name: str
+    source: str
+    kind: str
+    target: str
+    query: str
+    foreach: List[ForeachStep] = field(repr=False)
+    conditions: List[Callable[[Scope], bool]] = field(repr=False)
+    keys: Dict[str, List[Tuple[str, ValueGetter]]] = field(repr=False)
+    properties: List[Tuple[str, ValueGetter]] = field(repr=False)
+
+    def _scopes(self, scope: Scope, depth: int = 0) -> Iterator[Scope]:
+        """Parcourt récursivement les étapes foreach en empilant les bindings."""
+        if depth == len(self.foreach):
+            yield scope
+            return
+
+        step = self.foreach[depth]
+        for key, item in _iterate(step.path(scope)):
+            child = dict(scope)
+            child[step.bind_as] = item
+            if step.bind_key:
+                child[step.bind_key] = key
+            yield from self._scopes(child, depth + 1)
+
+    def extract(self, source_data: Any, context: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Extrait les lignes du batch depuis le snapshot.
+
+        Les lignes partageant la même clé de MERGE sont dédupliquées :
+        leurs propriétés sont fusionnées dans l'ordre de parcours, ce qui
+        équivaut à des SET += successifs.
+        """
+        root = dict(context)
+        root["source"] = source_data
+
+        rows: Dict[Tuple, Dict[str, Any]] = {}
+        for scope in self._scopes(root):
+            if not all(condition(scope) for condition in self.conditions):
+                continue
+
+            row: Dict[str, Any] = {
+                role: {name: getter(scope) for name, getter in getters}
+                for role, getters in self.keys.items()
+            }
+            properties = {name: getter(scope) for name, getter in self.properties}
+
+            dedup_key = tuple(
+                (role, tuple(sorted(row[role].items())))
+                for role in self.keys
+            )
+            if dedup_key in rows:
+                rows[dedup_key]["properties"].update(properties)
+            else:
+                row["properties"] = properties
+                rows[dedup_key] = row
+
+        return list(rows.values())
+
+    def write(
+        self,
+        neo_connection: Any,
+        source_data: Any,
+        context: Dict[str, Any],
+        database: str
+    ) -> int:
+        """Extrait puis pousse le batch dans Neo4j. Retourne le nombre de lignes."""
+        batch = self.extract(source_data, context)
+        if not batch:
+            return 0
+
+        # IMPORTANT: Utiliser query() au lieu de execute_write()
+        # car IN TRANSACTIONS nécessite une transaction implicite
+        neo_connection.query(
+            query=self.query,
+            parameters={"batch": batch},
+            db=database
+        )
+        return len(batch)
+
+
+def _key_pattern(keys: List[Tuple[str, ValueGetter]], row_field: str) -> str:
+    """Construit le motif '{name: row.key.name, ...}' d'un MERGE/MATCH."""
+    return ", ".join(f"{name}: row.{row_field}.{name}" for name, _ in keys)
+
+
+def _compile_writer(
+    spec: Dict[str, Any],
+    common_properties: Dict[str, Any],
+    batch_size: int
+) -> CompiledWriter:
+    """Compile la spécification d'un writer."""
+    name = spec["name"]
+    foreach = [
+        ForeachStep(
+            path=compile_value(step["path"]),
+            bind_as=step["as"],
+            bind_key=step.get("key")
+        )
+        for step in spec.get("foreach", [])
+    ]
+    conditions = [_compile_condition(condition) for condition in spec.get("where", [])]
+    properties = _compile_properties({**common_properties, **spec.get("properties", {})})
+
+    if "node" in spec:
+        label = _check_identifier(spec["node"]["label"], "Label")
+        keys = {"key": _compile_properties(spec["node"]["key"])}
+        body = (
+            f"MERGE (n:{label} {{{_key_pattern(keys['key'], 'key')}}})\n"
+            f"        SET n += row.properties"
+        )
+        kind = "node"
+        target = label
+
+    elif "relationship" in spec:
+        relationship = spec["relationship"]
+        rel_type = _check_identifier(relationship["type"], "Type de relation")
+        src_label = _check_identifier(relationship["from"]["label"], "Label")
+        dst_label = _check_identifier(relationship["to"]["label"], "Label")
+        keys = {
+            "src": _compile_properties(relationship["from"]["key"]),
+            "dst": _compile_properties(relationship["to"]["key"]),
+        }
+        body = (
+            f"MATCH (a:{src_label} {{{_key_pattern(keys['src'], 'src')}}})\n"
+            f"        MATCH (b:{dst_label} {{{_key_pattern(keys['dst'], 'dst')}}})\n"
+            f"        MERGE (a)-[r:{rel_type}]->(b)\n"
+            f"        SET r += row.properties"
+        )
+        kind = "relationship"
+        target = rel_type
+
+    else:
+        raise ValueError(f"Writer '{name}': 'node' ou 'relationship' attendu")
+
+    query = f"""
+    CALL () {{
+        UNWIND $batch as row
+        {body}
+    }}
+    IN TRANSACTIONS OF {int(batch_size)} ROWS
+    """
+
+    return CompiledWriter(
+        name=name,
+        source=spec["source"],
+        kind=kind,
+        target=target,
+        query=query,
+        foreach=foreach,
+        conditions=conditions,
+        keys=keys,
+        properties=properties
+    )
+
+
+# ============================================================
+# MAPPING COMPLET
+# ============================================================
+
+@dataclass
+class GraphMapping:
+    """Ensemble des writers compilés, regroupés par source et dans l'ordre du fichier."""
+    writers: List[CompiledWriter]
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> "GraphMapping":
+        """Compile un mapping déjà chargé en mémoire."""
+        batch_size = spec.get("batch_size", 1000)
+        common_properties = spec.get("common_properties", {})
+
+        writers = [
+            _compile_writer(writer_spec, common_properties, batch_size)
+            for writer_spec in spec.get("writers", [])
+        ]
+
+        names = [writer.name for writer in writers]
+        duplicates = {name for name in names if names.count(name) > 1}
+        if duplicates:
+            raise ValueError(f"Writers dupliqués dans le mapping: {sorted(duplicates)}")
+
+        return cls(writers=writers)
+
+    @classmethod
+    def load(cls, filename: Path | str = DEFAULT_MAPPING_FILE) -> "GraphMapping":
+        """Charge et compile un fichier de mapping JSON."""
+        with Path(filename).open("r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def writers_for(self, source: str) -> List[CompiledWriter]:
+        """Retourne les writers d'une source, dans l'ordre d'exécution."""
+        return [writer for writer in self.writers if writer.source == source]
+
+    def targets(self, kind: str) -> List[str]:
+        """Labels ('node') ou types de relation ('relationship') écrits, sans doublon."""
+        return list(dict.fromkeys(
+            writer.target for writer in self.writers if writer.kind == kind
+        ))
+
+    def write(
+        self,
+        neo_connection: Any,
+        source: str,
+        source_data: Any,
+        context: Dict[str, Any],
+        database: str = "neo4j"
+    ) -> Dict[str, int]:
+        """
+        Exécute tous les writers d'une source.
+
+        Returns:
+            Dict[str, int]: Nombre de lignes poussées par writer
+        """
+        return {
+            writer.name: writer.write(neo_connection, source_data, context, database)
+            for writer in self.writers_for(source)
+        }
+
+
+@lru_cache(maxsize=None)
+def load_graph_mapping(filename: str = str(DEFAULT_MAPPING_FILE)) -> GraphMapping:
+    """Charge le mapping une seule fois par processus."""
+    return GraphMapping.load(filename)
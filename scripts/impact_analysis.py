@@ -0,0 +1,343 @@
+"""
+Analyse d'impact trafic avant le shutdown d'interfaces (pré-vérification).
+
+Chaque interface est rattachée à ses PROD_ROUTING_LINK (les deux sens) via son
+adresse IP : snapshot CDB (5.RESULT_NSO_CDB.jsonl, section DEVICE) puis
+src_ip / dest_ip du miroir de routage (7.RESULT_ROUTING_MIRROR.npz). Les arcs
+sont masqués dans le miroir, sans rien écrire dans Neo4j, et seuls les calculs
+touchés sont refaits :
+    - sources concernées : celles dont un plus court chemin emprunte un arc
+      retiré (d(s, u) + w(u, v) == d(s, v)), trouvées par deux Dijkstra
+      inverses par arc
+    - chemins concernés : sous-arbre de l'arc retiré dans l'arbre de chaque
+      source concernée, recalculé après masquage (re-routé ou cassé)
+    - services TE : pile de labels contenant un SID d'adjacence retiré,
+      recalculée sur le nouveau plus court chemin
+    - VPRN clients : services dont deux PE voient leur chemin changer (section
+      VPRN du snapshot, collecteur vprns du script 5 ; non évalués sinon)
+
+Auteur: Marc De Oliveira
+Date: 2025
+"""
+
+import heapq
+import math
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from snapshot_file import SnapshotReader
+from topology_mirror import NO_SID, RoutingGraphMirror
+
+
+ROUTING_MIRROR_FILE = "7.RESULT_ROUTING_MIRROR.npz"
+NSO_CDB_SNAPSHOT_FILE = "5.RESULT_NSO_CDB.jsonl"
+
+REROUTED = "rerouted"
+BROKEN = "broken"
+RELABEL = "relabel"
+
+
+class TrafficImpactAnalyzer:
+    """
+    Impact du retrait d'interfaces sur les chemins SR, les services TE et les VPRN.
+
+    Le miroir n'est modifié que le temps de l'analyse (masque des arcs
+    restauré ensuite) : un même analyseur peut évaluer plusieurs scénarios,
+    les arbres de plus courts chemins d'avant retrait restant en cache.
+
+    vprns à None signifie que la section VPRN n'a pas été collectée : l'impact
+    VPRN est alors rapporté comme non évalué (None) et non comme nul.
+    """
+
+    def __init__(
+        self,
+        mirror: RoutingGraphMirror,
+        devices: Dict[str, Any],
+        vprns: Optional[Dict[str, Any]] = None,
+        weight_property: str = "igp_metric"
+    ):
+        self.mirror = mirror
+        self.devices = devices
+        self.vprns = vprns
+        self.weight_property = weight_property
+        self._edges_by_ip: Optional[Dict[str, List[int]]] = None
+        self._trees: Dict[int, Tuple[List[float], List[int], List[int]]] = {}
+        self._edge_src: Optional[List[int]] = None
+
+    @classmethod
+    def from_files(
+        cls,
+        mirror_file: Path | str = ROUTING_MIRROR_FILE,
+        snapshot_file: Path | str = NSO_CDB_SNAPSHOT_FILE,
+        weight_property: str = "igp_metric"
+    ) -> "TrafficImpactAnalyzer":
+        """
+        Charge le miroir et les seules sections DEVICE et VPRN du snapshot
+        (vprns à None si le collecteur vprns n'a pas été exécuté)
+        """
+        reader = SnapshotReader(snapshot_file)
+        return cls(
+            RoutingGraphMirror.load(mirror_file),
+            reader.load("DEVICE", {}),
+            reader.load("VPRN", {}) if "VPRN" in reader else None,
+            weight_property
+        )
+
+    # ==============================================
+    # Interface -> PROD_ROUTING_LINK
+    # ==============================================
+
+    def interface_links(self, device: str, interface: str) -> List[int]:
+        """Positions CSR des arcs portés par l'interface (sortant et entrant)"""
+        ip = self.devices.get(device, {}).get('LOGICAL', {}).get(interface, {}).get('IP')
+        if not ip:
+            raise KeyError(f"Interface sans adresse IP dans le snapshot CDB: {device} {interface}")
+
+        if self._edges_by_ip is None:
+            self._edges_by_ip = {}
+            for position, (src_ip, dest_ip) in enumerate(zip(self.mirror.src_ip, self.mirror.dest_ip)):
+                for address in {src_ip, dest_ip} - {""}:
+                    self._edges_by_ip.setdefault(address, []).append(position)
+
+        positions = [p for p in self._edges_by_ip.get(ip, []) if self.mirror.active[p]]
+        if not positions:
+            raise KeyError(f"Aucun PROD_ROUTING_LINK pour {device} {interface} ({ip})")
+        return positions
+
+    # ==============================================
+    # Chemins
+    # ==============================================
+
+    def _tree(self, source_id: int) -> Tuple[List[float], List[int], List[int]]:
+        """Arbre des plus courts chemins avant retrait et routeurs joignables par coût croissant (cache par source)"""
+        if source_id not in self._trees:
+            dist, pred_edge = self.mirror.shortest_path_tree(self.mirror.names[source_id], self.weight_property)
+            reachable = np.flatnonzero(np.isfinite(dist))
+            order = reachable[np.argsort(dist[reachable], kind="stable")]
+            self._trees[source_id] = (dist.tolist(), pred_edge.tolist(), order.tolist())
+        return self._trees[source_id]
+
+    def _affected_sources(self, removed: Iterable[int]) -> List[int]:
+        """Sources dont au moins un plus court chemin emprunte un arc retiré"""
+        weights = self.mirror._weights(self.weight_property)
+        names = self.mirror.names
+        sources = set()
+        for position in removed:
+            src_id, dst_id = self._edge_src[position], self._edge_dst[position]
+            to_src = self.mirror.distances_to(names[src_id], self.weight_property)
+            to_dst = self.mirror.distances_to(names[dst_id], self.weight_property)
+            on_path = np.isfinite(to_src) & np.isclose(to_src + weights[position], to_dst)
+            sources.update(int(s) for s in np.flatnonzero(on_path))
+        return sorted(sources)
+
+    def _cut_subtree(self, pred_edge: List[int], order: List[int], removed: set) -> List[int]:
+        """Routeurs dont le chemin depuis la source passe par un arc retiré (parcours par coût croissant)"""
+        flagged = [False] * len(pred_edge)
+        cut = []
+        for node in order:
+            position = pred_edge[node]
+            if position != -1 and (position in removed or flagged[self._edge_src[position]]):
+                flagged[node] = True
+                cut.append(node)
+        return cut
+
+    def _repair(self, dist: List[float], pred_edge: List[int], cut: List[int]) -> Tuple[List[float], List[int]]:
+        """
+        Arbre après retrait, recalculé sur le seul sous-arbre coupé.
+
+        Les distances ne peuvent qu'augmenter : les routeurs hors du sous-arbre
+        gardent leur chemin. Chaque routeur coupé est amorcé par ses arcs
+        entrants actifs venant de l'extérieur, puis Dijkstra se limite au
+        sous-arbre. Les arcs retirés doivent être masqués dans le miroir.
+        """
+        dist, pred_edge = list(dist), list(pred_edge)
+        inside = set(cut)
+        active = self._active
+        heap = []
+        for node in cut:
+            dist[node], pred_edge[node] = math.inf, -1
+        for node in cut:
+            for slot in range(self._rev_indptr[node], self._rev_indptr[node + 1]):
+                position = self._order[slot]
+                neighbor = self._edge_src[position]
+                if not active[position] or neighbor in inside:
+                    continue
+                cost = dist[neighbor] + self._weight_list[position]
+                if cost < dist[node]:
+                    dist[node], pred_edge[node] = cost, position
+            if not math.isinf(dist[node]):
+                heapq.heappush(heap, (dist[node], node))
+
+        indptr, indices = self._indptr, self._indices
+        while heap:
+            cost, node = heapq.heappop(heap)
+            if cost > dist[node]:
+                continue
+            for position in range(indptr[node], indptr[node + 1]):
+                neighbor = indices[position]
+                if not active[position] or neighbor not in inside:
+                    continue
+                new_cost = cost + self._weight_list[position]
+                if new_cost < dist[neighbor]:
+                    dist[neighbor], pred_edge[neighbor] = new_cost, position
+                    heapq.heappush(heap, (new_cost, neighbor))
+        return dist, pred_edge
+
+    def _path(self, source_id: int, pred_edge: List[int], target_id: int) -> Dict[str, Any]:
+        edges = []
+        node = target_id
+        while pred_edge[node] != -1:
+            edges.append(pred_edge[node])
+            node = self._edge_src[pred_edge[node]]
+        edges.reverse()
+        sids = [self._sid_list[e] for e in edges]
+        return {
+            "node_names": [self.mirror.names[source_id]] + [self.mirror.names[self._edge_dst[e]] for e in edges],
+            "labels": [None if sid == NO_SID else sid for sid in sids],
+        }
+
+    # ==============================================
+    # Analyse
+    # ==============================================
+
+    def _prepare(self) -> None:
+        """Vues Python du CSR (une fois par analyseur : la structure du miroir ne change pas)"""
+        if self._edge_src is not None:
+            return
+        mirror = self.mirror
+        if mirror._pending or len(mirror.indptr) != len(mirror.names) + 1:
+            mirror.compact()
+        rev_indptr, order = mirror.reverse_index()
+        self._edge_src = mirror.edge_sources().tolist()
+        self._edge_dst = mirror.indices.tolist()
+        self._indptr, self._indices = mirror.indptr.tolist(), self._edge_dst
+        self._rev_indptr, self._order = rev_indptr.tolist(), order.tolist()
+        self._weight_list = mirror._weights(self.weight_property).tolist()
+        self._sid_list = mirror.adj_sid.tolist()
+
+    def analyze(self, links: List[int], te_services: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Retire les arcs du miroir le temps du calcul et mesure l'impact.
+
+        Args:
+            links: Positions CSR des arcs à retirer (voir interface_links)
+            te_services: Services traffic-engineering NSO ({source, destination,
+                         color, service-name, label-path})
+
+        Returns:
+            dict: links, paths (rerouted / broken), te_services, vprns (None si
+                  non évalués), elapsed_ms
+        """
+        start = time.perf_counter()
+        self._prepare()
+        mirror = self.mirror
+        removed = set(links)
+        names = mirror.names
+
+        # Avant retrait : sources concernées et sous-arbres coupés
+        cuts: Dict[int, List[int]] = {}
+        for source_id in self._affected_sources(removed):
+            _, pred_edge, order = self._tree(source_id)
+            cut = self._cut_subtree(pred_edge, order, removed)
+            if cut:
+                cuts[source_id] = cut
+
+        saved_active = mirror.active.copy()
+        mirror.active[list(removed)] = False
+        self._active = mirror.active.tolist()
+        trees_after: Dict[int, Tuple[List[float], List[int]]] = {}
+
+        def tree_after(source_id: int) -> Tuple[List[float], List[int]]:
+            if source_id not in trees_after:
+                dist, pred_edge, order = self._tree(source_id)
+                cut = cuts.get(source_id)
+                if cut is None:
+                    cut = self._cut_subtree(pred_edge, order, removed)
+                trees_after[source_id] = self._repair(dist, pred_edge, cut) if cut else (dist, pred_edge)
+            return trees_after[source_id]
+
+        try:
+            paths = {REROUTED: [], BROKEN: []}
+            for source_id, cut in cuts.items():
+                dist, pred_edge, _ = self._tree(source_id)
+                dist_after, pred_after = tree_after(source_id)
+                for target_id in cut:
+                    change = {
+                        "source": names[source_id],
+                        "destination": names[target_id],
+                        "cost_before": dist[target_id],
+                        "before": self._path(source_id, pred_edge, target_id),
+                    }
+                    if math.isinf(dist_after[target_id]):
+                        paths[BROKEN].append(change)
+                    else:
+                        change["cost_after"] = dist_after[target_id]
+                        change["after"] = self._path(source_id, pred_after, target_id)
+                        paths[REROUTED].append(change)
+
+            te_report = self._te_impact(te_services or [], removed, tree_after)
+        finally:
+            mirror.active[:] = saved_active
+
+        return {
+            "links": [mirror.segment(position) for position in sorted(removed)],
+            "paths": {
+                "affected_sources": len(cuts),
+                REROUTED: paths[REROUTED],
+                BROKEN: paths[BROKEN],
+            },
+            "te_services": te_report,
+            "vprns": self._vprn_impact(paths) if self.vprns is not None else None,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+    def _te_impact(self, te_services: List[Dict[str, Any]], removed: set, tree_after) -> List[Dict[str, Any]]:
+        """Services TE dont la pile de labels emprunte une adjacence retirée"""
+        removed_sids = {self._sid_list[p] for p in removed} - {NO_SID}
+        report = []
+        for service in te_services:
+            labels = [int(label) for label in service.get("label-path", [])]
+            if not removed_sids.intersection(labels):
+                continue
+            source, destination = service.get("source"), service.get("destination")
+            entry = {
+                "source": source,
+                "destination": destination,
+                "color": service.get("color"),
+                "service_name": service.get("service-name", ""),
+                "labels_before": labels,
+            }
+            if source not in self.mirror.index or destination not in self.mirror.index:
+                entry["status"] = BROKEN
+                entry["error"] = "Routeur absent du miroir"
+            else:
+                source_id, target_id = self.mirror.index[source], self.mirror.index[destination]
+                dist, pred_edge = tree_after(source_id)
+                if math.isinf(dist[target_id]):
+                    entry["status"] = BROKEN
+                else:
+                    entry["status"] = RELABEL
+                    entry["labels_after"] = self._path(source_id, pred_edge, target_id)["labels"]
+            report.append(entry)
+        return report
+
+    def _vprn_impact(self, paths: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """VPRN dont deux PE voient leur chemin re-routé ou cassé"""
+        pes: Dict[str, set] = {}
+        for device, services in self.vprns.items():
+            for service_name in services:
+                pes.setdefault(service_name, set()).add(device)
+
+        report = []
+        for service_name, devices in sorted(pes.items()):
+            entry = {"service_name": service_name, "pes": sorted(devices), REROUTED: [], BROKEN: []}
+            for status in (REROUTED, BROKEN):
+                for change in paths[status]:
+                    if change["source"] in devices and change["destination"] in devices:
+                        entry[status].append(f"{change['source']}->{change['destination']}")
+            if entry[REROUTED] or entry[BROKEN]:
+                report.append(entry)
+        return report
@@ -0,0 +1,274 @@
+"""
+Banc de mesure des collecteurs NSO (scripts 5 et 6) sur le faux serveur NSO.
+
+Pour chaque taille de flotte, un faux NSO (nso_fake_server.py) est lancé dans
+un processus séparé, puis chaque scénario est exécuté pour chaque niveau de
+concurrence :
+    - cdb       : collecte CDB shardée par lots de noms (script 5), concurrence fixe
+    - cdb-aimd  : même collecte, concurrence adaptative AIMD
+    - lldp-cli  : show system lldp neighbor par device (script 6, pool de workers)
+    - lldp-state: état LLDP structuré, requête groupée puis repli par device (script 6)
+
+Mesures : durée, débit (devices/s), requêtes HTTP, erreurs, latence p95,
+pic mémoire Python (tracemalloc, option --trace-memory) et RSS maximal.
+
+Usage:
+    python nso_benchmark.py --sizes 10 100 1000 10000 --concurrency 2 8 32 --latency 0.02
+
+Auteur: Marc De Oliveira
+Date: 2025
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from nso_client import NSOClient, NSOConfig, NSOMetrics
+
+
+# ============================================================
+# CONFIGURATION & TYPES
+# ============================================================
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+SERVER_SCRIPT = "nso_fake_server.py"
+RESULT_FILE = "RESULT_NSO_BENCHMARK.json"
+
+DEFAULT_SIZES = [10, 100, 1000]
+DEFAULT_CONCURRENCY = [2, 8, 32]
+SCENARIOS = ["cdb", "cdb-aimd", "lldp-cli", "lldp-state"]
+BENCHMARK_PORT = 8089
+SERVER_START_TIMEOUT = 30.0
+
+
+def load_script(filename: str, module_name: str):
+    """Importe un script numéroté (nom de fichier non importable tel quel)"""
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPTS_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    # Enregistré avant exécution : les analyseurs envoyés au pool de processus sont retrouvés par nom
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+cdb = load_script("5.get_nso_cdb_info.py", "nso_cdb_collector")
+lldp = load_script("6.get_lldp_info_live_status_nso.py", "nso_lldp_collector")
+
+
+@dataclass
+class BenchmarkResult:
+    """Mesures d'un scénario pour une taille de flotte et une concurrence"""
+    scenario: str
+    devices: int
+    concurrency: int
+    duration: float
+    collected: int
+    requests: int
+    errors: int
+    p95_latency: float
+    peak_memory_mb: float | None
+    max_rss_mb: float
+
+    @property
+    def throughput(self) -> float:
+        return self.collected / self.duration if self.duration else 0.0
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "throughput": round(self.throughput, 1)}
+
+
+# ============================================================
+# FAKE SERVER PROCESS
+# ============================================================
+
+class FakeServerProcess:
+    """Faux NSO lancé dans un processus séparé (le client mesuré garde la boucle pour lui)"""
+
+    def __init__(self, devices: int, port: int, server_args: list[str]):
+        self.devices = devices
+        self.port = port
+        self.server_args = server_args
+        self.process: subprocess.Popen | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "FakeServerProcess":
+        self.process = subprocess.Popen(
+            [
+                sys.executable, str(SCRIPTS_DIR / SERVER_SCRIPT),
+                "--devices", str(self.devices), "--port", str(self.port), *self.server_args
+            ],
+            stdout=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Le faux NSO s'est arrêté (code {self.process.returncode})")
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=0.5):
+                    return self
+            except OSError:
+                time.sleep(0.1)
+        self.__exit__(None, None, None)
+        raise TimeoutError(f"Le faux NSO n'écoute pas sur le port {self.port}")
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait()
+
+
+# ============================================================
+# SCENARIOS
+# ============================================================
+
+async def run_cdb(nso: NSOClient, devices: list[str], concurrency: int, adaptive: bool) -> int:
+    """Collecte CDB shardée ; retourne le nombre de devices collectés"""
+    configs = cdb.get_sharded_request_configs(devices, shard_size=cdb.SHARD_SIZE)
+    target: dict = {}
+    await cdb.NSOQueryCollector(nso).fetch_all(configs, target, max_concurrent=concurrency, adaptive=adaptive)
+    return len(target.get('DEVICE', {}))
+
+
+async def run_lldp_cli(nso: NSOClient, devices: list[str], concurrency: int) -> int:
+    client = lldp.NSOLiveStatusClient(nso)
+    results = await client.get_lldp_neighbors(devices, max_concurrent=concurrency)
+    return sum(1 for result in results if not result.error)
+
+
+async def run_lldp_state(nso: NSOClient, devices: list[str], concurrency: int) -> int:
+    client = lldp.NSOLiveStatusClient(nso)
+    results = await client.collect_lldp(devices, max_concurrent=concurrency)
+    return sum(1 for result in results if not result.error)
+
+
+SCENARIO_RUNNERS: dict[str, Callable[[NSOClient, list[str], int], Awaitable[int]]] = {
+    "cdb": lambda nso, devices, c: run_cdb(nso, devices, c, adaptive=False),
+    "cdb-aimd": lambda nso, devices, c: run_cdb(nso, devices, c, adaptive=True),
+    "lldp-cli": run_lldp_cli,
+    "lldp-state": run_lldp_state,
+}
+
+
+def max_rss_mb() -> float:
+    """RSS maximal du processus depuis son démarrage (Mo)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def run_scenario(
+    scenario: str,
+    base_url: str,
+    devices: list[str],
+    concurrency: int,
+    trace_memory: bool
+) -> BenchmarkResult:
+    """Exécute un scénario avec une session NSO neuve et mesure"""
+    metrics = NSOMetrics()
+    config = NSOConfig(
+        base_url=base_url,
+        timeout=600,
+        limit_per_host=max(concurrency, cdb.ADAPTIVE_MAX_CONCURRENT)
+    )
+    if trace_memory:
+        tracemalloc.start()
+
+    start = time.monotonic()
+    async with NSOClient(config, metrics_hook=metrics) as nso:
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            collected = await SCENARIO_RUNNERS[scenario](nso, devices, concurrency)
+    duration = time.monotonic() - start
+
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+
+    latencies = sorted(metrics.durations)
+    return BenchmarkResult(
+        scenario=scenario,
+        devices=len(devices),
+        concurrency=concurrency,
+        duration=round(duration, 3),
+        collected=collected,
+        requests=len(latencies),
+        errors=metrics.errors,
+        p95_latency=round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0, 3),
+        peak_memory_mb=round(peak, 1) if peak is not None else None,
+        max_rss_mb=round(max_rss_mb(), 1)
+    )
+
+
+# ============================================================
+# REPORT
+# ============================================================
+
+def format_table(results: list[BenchmarkResult]) -> str:
+    header = (f"{'Scénario':<11} {'Devices':>7} {'Conc.':>5} {'Durée(s)':>9} {'Dev/s':>8} "
+              f"{'Collectés':>9} {'Req.':>6} {'Err.':>5} {'p95(s)':>7} {'Pic(Mo)':>8} {'RSS(Mo)':>8}")
+    lines = [header, "-" * len(header)]
+    for r in results:
+        peak = f"{r.peak_memory_mb:.1f}" if r.peak_memory_mb is not None else "-"
+        lines.append(
+            f"{r.scenario:<11} {r.devices:>7} {r.concurrency:>5} {r.duration:>9.2f} {r.throughput:>8.1f} "
+            f"{r.collected:>9} {r.requests:>6} {r.errors:>5} {r.p95_latency:>7.3f} {peak:>8} {r.max_rss_mb:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+# ============================================================
+# MAIN
+# ============================================================
+
+async def main(args: argparse.Namespace, server_args: list[str]):
+    """Point d'entrée principal"""
+    print("="*60)
+    print("NSO Collector Benchmark")
+    print("="*60)
+
+    results: list[BenchmarkResult] = []
+    for size in args.sizes:
+        devices = [f"R{i + 1}" for i in range(size)]
+        with FakeServerProcess(size, args.port, server_args) as server:
+            print(f"\n→ Flotte de {size} devices ({server.base_url})")
+            for scenario in args.scenarios:
+                for concurrency in args.concurrency:
+                    result = await run_scenario(scenario, server.base_url, devices, concurrency, args.trace_memory)
+                    results.append(result)
+                    print(f"  ✓ {scenario:<10} conc={concurrency:<3} {result.duration:8.2f}s "
+                          f"{result.throughput:8.1f} dev/s  {result.errors} erreurs")
+
+    print("\n" + format_table(results))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump([result.to_dict() for result in results], f, indent=2, ensure_ascii=False)
+    print(f"\n✓ Résultats sauvegardés dans {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Banc de mesure des collecteurs NSO sur le faux serveur "
+                    "(les options non reconnues sont transmises à nso_fake_server.py, ex: --latency 0.02)"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Tailles de flotte")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY, help="Niveaux de concurrence")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--port", type=int, default=BENCHMARK_PORT, help="Port du faux NSO")
+    parser.add_argument("--trace-memory", action="store_true", help="Pic mémoire Python par scénario (tracemalloc, plus lent)")
+    parser.add_argument("--output", default=RESULT_FILE)
+    args, server_args = parser.parse_known_args()
+
+    asyncio.run(main(args, server_args))
@@ -0,0 +1,694 @@
+"""
+Client RESTCONF NSO partagé par les collecteurs (scripts 5, 6) et les actions (script 3).
+
+Une seule session aiohttp longue durée par processus : pool de connexions
+limité par hôte et keep-alive, de sorte que toutes les requêtes NSO
+réutilisent des connexions TCP déjà établies. Authentification, en-têtes,
+reprises (retries), délai maximal par requête (deadline) et métriques
+(hook appelé après chaque requête) sont gérés ici et non plus dans chaque
+script.
+
+Auteur: Marc De Oliveira
+Date: 2025
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+import aiohttp
+from aiohttp import BasicAuth, ClientTimeout, TCPConnector
+
+
+# ============================================================
+# CONFIGURATION & TYPES
+# ============================================================
+
+YANG_JSON = "application/yang-data+json"
+
+# Durée de vie des résultats live-status en cache, par préfixe de commande/chemin
+LIVE_STATUS_DEFAULT_TTL = 30.0
+LIVE_STATUS_TTLS = {
+    "show system lldp neighbor": 60.0,
+    "nokia-state:state/port": 60.0,
+    "show card": 5.0,  # sous l'intervalle de sondage des cartes (script 0)
+}
+
+# Disjoncteurs par device (live-status) : état conservé entre deux exécutions
+BREAKER_STATE_FILE = "NSO_DEVICE_BREAKERS.json"
+BREAKER_FAILURE_THRESHOLD = 3       # Échecs consécutifs avant ouverture
+BREAKER_RESET_TIMEOUT = 60.0        # Durée d'ouverture avant un essai (half-open)
+BREAKER_MAX_RESET_TIMEOUT = 900.0   # Plafond de la durée d'ouverture (doublée à chaque essai raté)
+
+T = TypeVar("T")
+
+
+@dataclass
+class NSOConfig:
+    """
+    Configuration de connexion NSO.
+
+    Attributes:
+        base_url (str): URL de base NSO (les chemins relatifs y sont ajoutés)
+        timeout (float): Deadline d'une requête, tentatives et attentes comprises
+        connect_timeout (float): Délai maximal d'établissement d'une connexion TCP
+        limit_per_host (int): Nombre maximal de connexions simultanées vers NSO
+        keepalive_timeout (float): Durée de conservation d'une connexion inactive
+        retries (int): Nombre de nouvelles tentatives après un échec transitoire
+        backoff (float): Attente initiale entre tentatives (doublée à chaque fois, avec jitter)
+        max_backoff (float): Plafond de l'attente entre tentatives
+        retry_budget_ratio (float): Reprises autorisées par requête, sur toute la session
+        retry_budget_min (int): Reprises toujours autorisées en plus du ratio
+    """
+    base_url: str = "http://localhost:8080"
+    username: str = "admin"
+    password: str = "admin"
+    timeout: float = 30
+    connect_timeout: float = 10
+    limit_per_host: int = 10
+    keepalive_timeout: float = 60
+    retries: int = 2
+    backoff: float = 0.5
+    max_backoff: float = 10.0
+    retry_budget_ratio: float = 0.2
+    retry_budget_min: int = 10
+    retry_statuses: tuple[int, ...] = (502, 503, 504)
+    verify_ssl: bool = False
+
+
+@dataclass
+class NSOResponse:
+    """Réponse d'une requête NSO (status 0 si aucune réponse HTTP, en-têtes en minuscules)"""
+    method: str
+    url: str
+    status: int = 0
+    data: Any = None
+    text: str = ""
+    error: Optional[str] = None
+    duration: float = 0.0
+    attempts: int = 0
+    headers: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and 200 <= self.status < 300
+
+
+MetricsHook = Callable[[NSOResponse], None]
+
+
+class NSOError(Exception):
+    """Échec d'une requête en flux (NSOClient.stream), porte la NSOResponse"""
+
+    def __init__(self, response: NSOResponse, transient: bool = False):
+        super().__init__(response.error)
+        self.response = response
+        self.transient = transient
+
+
+@dataclass
+class NSOMetrics:
+    """Hook de métriques simple : compte les requêtes et agrège les latences"""
+    durations: list[float] = field(default_factory=list)
+    errors: int = 0
+    retries: int = 0
+
+    def __call__(self, response: NSOResponse) -> None:
+        self.durations.append(response.duration)
+        self.retries += max(response.attempts - 1, 0)
+        if not response.ok:
+            self.errors += 1
+
+    def summary(self) -> str:
+        if not self.durations:
+            return "NSO: aucune requête"
+        ordered = sorted(self.durations)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return (
+            f"NSO: {len(ordered)} requêtes, {self.errors} erreurs, {self.retries} reprises, "
+            f"latence moy {sum(ordered) / len(ordered):.2f}s / p95 {p95:.2f}s"
+        )
+
+
+# ============================================================
+# REPRISES : BACKOFF ET BUDGET
+# ============================================================
+
+def backoff_delay(base: float, attempt: int, cap: float) -> float:
+    """Attente avant la reprise n° attempt + 1 : backoff exponentiel à jitter complet"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class RetryBudget:
+    """
+    Budget global de reprises, partagé par toutes les requêtes d'une session.
+
+    Chaque requête crédite ratio reprise ; au-delà de min_retries, une reprise
+    n'est accordée que si le crédit le permet. Quand NSO ou une partie du
+    réseau est en panne, les reprises ne multiplient donc pas la charge : au
+    plus (1 + ratio) fois le nombre de requêtes.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+        self.denied = 0
+
+    def record_request(self) -> None:
+        self.requests += 1
+
+    def try_retry(self) -> bool:
+        """Consomme une reprise si le budget le permet"""
+        if self.retries < self.min_retries + self.ratio * self.requests:
+            self.retries += 1
+            return True
+        self.denied += 1
+        return False
+
+
+# ============================================================
+# DISJONCTEURS PAR DEVICE
+# ============================================================
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+@dataclass
+class CircuitBreaker:
+    """
+    Disjoncteur d'un device (horodatages en temps Unix pour être persistés).
+
+    closed    : appels autorisés, failures compte les échecs consécutifs
+    open      : appels refusés jusqu'à opened_at + reset_timeout
+    half-open : un seul appel d'essai ; succès -> closed, échec -> open avec
+                une durée d'ouverture doublée
+    """
+    state: str = CLOSED
+    failures: int = 0
+    opened_at: float = 0.0
+    reset_timeout: float = BREAKER_RESET_TIMEOUT
+    probing: bool = field(default=False, repr=False)
+
+    def current_state(self, now: float) -> str:
+        if self.state == OPEN and now >= self.opened_at + self.reset_timeout:
+            return HALF_OPEN
+        return self.state
+
+    def allow(self, now: float) -> bool:
+        """Autorise un appel (en half-open, un seul essai à la fois)"""
+        state = self.current_state(now)
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self.probing:
+            self.state = HALF_OPEN
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self, base_timeout: float) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self.reset_timeout = base_timeout
+        self.probing = False
+
+    def record_failure(self, now: float, threshold: int, max_timeout: float) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            # Essai raté : réouverture plus longue, avec jitter pour étaler les essais
+            self.reset_timeout = min(max_timeout, self.reset_timeout * 2) * random.uniform(0.9, 1.1)
+            self._open(now)
+        elif self.failures >= threshold:
+            self._open(now)
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self.opened_at = now
+        self.probing = False
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        del data["probing"]
+        return data
+
+
+class DeviceBreakers:
+    """
+    Disjoncteurs par device, persistés dans un fichier JSON.
+
+    Un device dont le disjoncteur est ouvert est écarté immédiatement (erreur
+    CIRCUIT_OPEN) au lieu d'occuper un worker pendant tout son timeout ; il
+    est réessayé une fois la durée d'ouverture écoulée. Seuls les échecs
+    imputables au device comptent (timeout, erreur applicative NSO), pas les
+    statuts transitoires de NSO lui-même.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str | Path] = None,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = BREAKER_RESET_TIMEOUT,
+        max_reset_timeout: float = BREAKER_MAX_RESET_TIMEOUT,
+        retry_statuses: tuple[int, ...] = NSOConfig.retry_statuses
+    ):
+        self.path = Path(path) if path else None
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.retry_statuses = retry_statuses
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.rejected = 0
+
+    @classmethod
+    def load(cls, path: str | Path = BREAKER_STATE_FILE, **kwargs) -> "DeviceBreakers":
+        """État du run précédent (vide si le fichier est absent ou illisible)"""
+        breakers = cls(path, **kwargs)
+        try:
+            with breakers.path.open("r", encoding="utf-8") as f:
+                for device, data in json.load(f).items():
+                    breakers.breakers[device] = CircuitBreaker(**data)
+        except (FileNotFoundError, json.JSONDecodeError, TypeError):
+            pass
+        return breakers
+
+    def save(self) -> None:
+        """Persiste les disjoncteurs non fermés (écriture atomique)"""
+        if self.path is None:
+            return
+        data = {
+            device: breaker.to_dict()
+            for device, breaker in self.breakers.items()
+            if breaker.state != CLOSED or breaker.failures
+        }
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _breaker(self, device: str) -> CircuitBreaker:
+        breaker = self.breakers.get(device)
+        if breaker is None:
+            breaker = self.breakers[device] = CircuitBreaker(reset_timeout=self.reset_timeout)
+        return breaker
+
+    def state(self, device: str) -> str:
+        breaker = self.breakers.get(device)
+        return breaker.current_state(time.time()) if breaker else CLOSED
+
+    def allow(self, device: str) -> bool:
+        if self._breaker(device).allow(time.time()):
+            return True
+        self.rejected += 1
+        return False
+
+    def is_device_failure(self, response: NSOResponse) -> bool:
+        """Échec imputable au device (et non à NSO ou au réseau vers NSO)"""
+        if response.ok:
+            return False
+        if response.status == 0:
+            return response.error == "TIMEOUT"
+        return response.status not in self.retry_statuses
+
+    def record(self, device: str, response: NSOResponse) -> None:
+        """Met à jour le disjoncteur d'un device avec le résultat d'un appel"""
+        breaker = self._breaker(device)
+        if response.ok:
+            breaker.record_success(self.reset_timeout)
+        elif self.is_device_failure(response):
+            breaker.record_failure(time.time(), self.failure_threshold, self.max_reset_timeout)
+        else:
+            breaker.probing = False
+
+    def summary(self) -> str:
+        now = time.time()
+        states = [breaker.current_state(now) for breaker in self.breakers.values()]
+        return (
+            f"Disjoncteurs: {states.count(OPEN)} ouverts, {states.count(HALF_OPEN)} à réessayer, "
+            f"{self.rejected} appels écartés"
+        )
+
+
+# ============================================================
+# CONCURRENCE ADAPTATIVE
+# ============================================================
+
+class AIMDLimiter:
+    """
+    Limiteur de concurrence AIMD (additive increase / multiplicative decrease).
+
+    La limite augmente d'environ 1 par fenêtre de requêtes réussies et rapides,
+    et est divisée (decrease_factor) sur une réponse 5xx, un timeout ou une
+    latence au-delà de target_latency, au plus une fois par durée de requête
+    pour ne pas s'effondrer sur une rafale d'erreurs. Avec minimum == maximum
+    c'est un simple sémaphore.
+
+    Utilisation:
+        async with limiter:
+            ...
+            limiter.record(latency, overloaded)
+    """
+
+    def __init__(
+        self,
+        initial: int = 2,
+        minimum: int = 1,
+        maximum: int = 16,
+        target_latency: float = 30.0,
+        decrease_factor: float = 0.5
+    ):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+        self._last_decrease = 0.0
+
+    async def __aenter__(self) -> "AIMDLimiter":
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def record(self, latency: float, overloaded: bool = False) -> None:
+        """Ajuste la limite selon le résultat d'une requête"""
+        now = time.monotonic()
+        if overloaded or latency > self.target_latency:
+            if now - self._last_decrease > latency:
+                self.limit = max(float(self.minimum), self.limit * self.decrease_factor)
+                self._last_decrease = now
+        else:
+            self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+
+
+# ============================================================
+# CACHE LIVE-STATUS
+# ============================================================
+
+class LiveStatusCache:
+    """
+    Cache TTL + LRU des appels live-status, avec coalescence des appels en cours.
+
+    Clé (device, commande ou chemin). La durée de vie dépend de la commande
+    (plus long préfixe de ttls, sinon default_ttl) ; au-delà de max_entries
+    l'entrée la moins récemment utilisée est évincée. Si la même clé est
+    déjà en cours d'appel, les demandeurs suivants attendent ce même appel
+    (single-flight) au lieu d'interroger à nouveau le routeur.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        default_ttl: float = LIVE_STATUS_DEFAULT_TTL,
+        ttls: Optional[dict[str, float]] = None
+    ):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = LIVE_STATUS_TTLS if ttls is None else ttls
+        self._entries: OrderedDict[tuple[str, str], tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[tuple[str, str], asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def ttl_for(self, command: str) -> float:
+        """Durée de vie d'une commande : plus long préfixe connu, sinon default_ttl"""
+        matches = [prefix for prefix in self.ttls if command.startswith(prefix)]
+        return self.ttls[max(matches, key=len)] if matches else self.default_ttl
+
+    def invalidate(self, device: Optional[str] = None) -> None:
+        """Oublie les entrées d'un device (ou toutes)"""
+        for key in [key for key in self._entries if device is None or key[0] == device]:
+            del self._entries[key]
+
+    async def get_or_fetch(
+        self,
+        device: str,
+        command: str,
+        fetch: Callable[[], Awaitable[T]],
+        cacheable: Callable[[T], bool] = lambda value: True
+    ) -> T:
+        """Retourne la valeur en cache ou exécute fetch() une seule fois pour tous les demandeurs"""
+        key = (device, command)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, value = entry
+            if expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.misses += 1
+        task = asyncio.ensure_future(fetch())
+        self._inflight[key] = task
+        try:
+            value = await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._inflight.pop(key, None)
+            else:
+                # Demandeur annulé : l'appel continue pour les autres et se retire à la fin
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        if cacheable(value):
+            self._entries[key] = (time.monotonic() + self.ttl_for(command), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def summary(self) -> str:
+        return (
+            f"Cache live-status: {self.hits} hits, {self.misses} appels, "
+            f"{self.coalesced} coalescés, {len(self._entries)} entrées"
+        )
+
+
+# ============================================================
+# NSO CLIENT
+# ============================================================
+
+class NSOClient:
+    """
+    Client RESTCONF NSO avec session poolée longue durée.
+
+    Utilisation:
+        async with NSOClient(NSOConfig()) as nso:
+            response = await nso.post("/restconf/tailf/query", json=payload)
+    """
+
+    def __init__(
+        self,
+        config: Optional[NSOConfig] = None,
+        metrics_hook: Optional[MetricsHook] = None,
+        retry_budget: Optional[RetryBudget] = None
+    ):
+        self.config = config or NSOConfig()
+        self.metrics_hook = metrics_hook
+        self.retry_budget = retry_budget or RetryBudget(
+            self.config.retry_budget_ratio,
+            self.config.retry_budget_min
+        )
+        self.auth = BasicAuth(self.config.username, self.config.password)
+        self.headers = {
+            "Content-Type": YANG_JSON,
+            "Accept": YANG_JSON
+        }
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "NSOClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Session partagée, créée à la première requête"""
+        if self._session is None or self._session.closed:
+            connector = TCPConnector(
+                limit_per_host=self.config.limit_per_host,
+                keepalive_timeout=self.config.keepalive_timeout,
+                ssl=self.config.verify_ssl
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                auth=self.auth,
+                headers=self.headers,
+                timeout=ClientTimeout(sock_connect=self.config.connect_timeout)
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """Ferme la session et libère les connexions du pool"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def url(self, path: str) -> str:
+        """Construit l'URL complète (les URLs absolues sont conservées)"""
+        if path.startswith(("http://", "https://")):
+            return path
+        return f"{self.config.base_url.rstrip('/')}/{path.lstrip('/')}"
+
+    # ==============================================
+    # Requêtes
+    # ==============================================
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        json: Any = None,
+        headers: Optional[dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        parse_json: bool = True
+    ) -> NSOResponse:
+        """
+        Exécute une requête RESTCONF avec reprises et deadline.
+
+        Les erreurs réseau, les dépassements de délai et les statuts
+        config.retry_statuses sont retentés avec un backoff exponentiel à
+        jitter, tant que la deadline n'est pas atteinte et que le budget
+        global de reprises le permet. La réponse n'est jamais levée en
+        exception : l'échec est décrit par NSOResponse.error.
+        """
+        loop = asyncio.get_running_loop()
+        retries = self.config.retries if retries is None else retries
+        deadline = loop.time() + (timeout or self.config.timeout)
+        response = NSOResponse(method=method, url=self.url(path))
+        start_time = time.monotonic()
+        self.retry_budget.record_request()
+
+        for attempt in range(retries + 1):
+            response.attempts = attempt + 1
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                response.error = response.error or "DEADLINE_EXCEEDED"
+                break
+
+            transient = False
+            try:
+                async with self.session.request(
+                    method,
+                    response.url,
+                    json=json,
+                    headers=headers,
+                    timeout=ClientTimeout(total=remaining)
+                ) as http_response:
+                    response.status = http_response.status
+                    response.headers = {name.lower(): value for name, value in http_response.headers.items()}
+                    response.text = await http_response.text()
+
+                    if 200 <= http_response.status < 300:
+                        response.error = None
+                        if parse_json and response.text:
+                            response.data = await http_response.json(content_type=None)
+                        break
+
+                    response.error = f"HTTP {http_response.status}: {response.text[:200]}"
+                    transient = http_response.status in self.config.retry_statuses
+
+            except asyncio.TimeoutError:
+                response.error = "TIMEOUT"
+                transient = True
+            except aiohttp.ClientError as e:
+                response.error = f"CLIENT_ERROR: {e}"
+                transient = True
+            except ValueError as e:
+                response.error = f"INVALID_JSON: {e}"
+                break
+
+            if not transient or attempt == retries or not self.retry_budget.try_retry():
+                break
+            delay = backoff_delay(self.config.backoff, attempt, self.config.max_backoff)
+            await asyncio.sleep(min(delay, max(deadline - loop.time(), 0)))
+
+        response.duration = time.monotonic() - start_time
+        if self.metrics_hook:
+            self.metrics_hook(response)
+        return response
+
+    async def get(self, path: str, **kwargs) -> NSOResponse:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, json: Any = None, **kwargs) -> NSOResponse:
+        return await self.request("POST", path, json=json, **kwargs)
+
+    async def patch(self, path: str, json: Any = None, **kwargs) -> NSOResponse:
+        return await self.request("PATCH", path, json=json, **kwargs)
+
+    async def head(self, path: str, **kwargs) -> NSOResponse:
+        return await self.request("HEAD", path, parse_json=False, **kwargs)
+
+    async def stream(
+        self,
+        method: str,
+        path: str,
+        json: Any = None,
+        chunk_size: int = 65536,
+        timeout: Optional[float] = None,
+        headers: Optional[dict[str, str]] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Exécute une requête et restitue le corps par blocs au fil de la réception.
+
+        timeout=0 désactive la deadline (flux de notifications longue durée).
+        Pas de reprise automatique : un flux partiellement consommé ne peut pas
+        être rejoué ici, c'est à l'appelant de relancer (NSOError.transient).
+
+        Raises:
+            NSOError: Statut non 2xx, erreur réseau ou deadline dépassée
+        """
+        response = NSOResponse(method=method, url=self.url(path), attempts=1)
+        start_time = time.monotonic()
+        self.retry_budget.record_request()
+        try:
+            async with self.session.request(
+                method,
+                response.url,
+                json=json,
+                headers=headers,
+                timeout=ClientTimeout(total=None if timeout == 0 else (timeout or self.config.timeout))
+            ) as http_response:
+                response.status = http_response.status
+                if not 200 <= http_response.status < 300:
+                    response.text = await http_response.text()
+                    response.error = f"HTTP {http_response.status}: {response.text[:200]}"
+                    raise NSOError(response, http_response.status in self.config.retry_statuses)
+
+                async for chunk in http_response.content.iter_chunked(chunk_size):
+                    yield chunk
+
+        except asyncio.TimeoutError:
+            response.status, response.error = 0, "TIMEOUT"
+            raise NSOError(response, transient=True) from None
+        except aiohttp.ClientError as e:
+            response.status, response.error = 0, f"CLIENT_ERROR: {e}"
+            raise NSOError(response, transient=True) from None
+        finally:
+            response.duration = time.monotonic() - start_time
+            if self.metrics_hook:
+                self.metrics_hook(response)
@@ -0,0 +1,716 @@
+"""
+Faux serveur NSO RESTCONF (aiohttp) pour tester les scripts 3, 5 et 6 hors
+ligne et à grande échelle, sur une flotte synthétique de N routeurs Nokia.
+
+Points servis :
+    - POST /restconf/tailf/query                      : immediate-query (interfaces,
+      LAG, ISIS, BGP, VPRN, état LLDP), pagination limit/offset, réponse en flux
+    - GET  /restconf/data/tailf-ncs:devices/device    : inventaire (name, device-type, state)
+    - GET  /restconf/data/tailf-ncs:devices/device-group[={groupe}]
+    - HEAD /restconf/data/tailf-ncs:devices/device={d}/config : marqueur ETag
+    - POST .../device={d}/live-status/global-operations/md-cli-raw-command
+    - GET  .../device={d}/live-status/nokia-state:state/port
+    - GET/PATCH /restconf/data/devices/device={d}/config/configure/router={r}/interface={i}
+    - PATCH /restconf/data : YANG-Patch ou fusion racine (admin-state d'interfaces),
+      transaction atomique, dry-run=native et commit-queue=async|sync
+
+Topologie : graphe circulant, chaque routeur Ri est relié à R(i+1) ...
+R(i+degree/2). Injection de latence (fixe, aléatoire, par résultat) et
+d'erreurs (503, requêtes bloquées, devices injoignables en live-status).
+
+Carte 1 (script 0) : show card 1 en live-status, cartes failed ou booting
+injectées, admin reboot now rend le device injoignable reboot_time secondes
+puis la carte démarre (booting) pendant boot_time secondes avant d'être up.
+
+Usage:
+    python nso_fake_server.py --devices 1000 --port 8080 --latency 0.05 --error-rate 0.01
+
+Auteur: Marc De Oliveira
+Date: 2025
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from ipaddress import IPv4Address
+from itertools import islice
+from typing import Iterator, Optional
+from urllib.parse import unquote
+
+from aiohttp import web
+
+
+# ============================================================
+# CONFIGURATION & TYPES
+# ============================================================
+
+DEFAULT_PORT = 8080
+DEFAULT_DEVICES = 10
+DEFAULT_DEGREE = 4              # Liens par routeur (graphe circulant)
+GROUP_SIZE = 50                 # Devices par device-group
+STREAM_BATCH = 500              # Résultats écrits par bloc sur la réponse
+ADJ_SID_BASE = 524288
+LINK_NETWORK = int(IPv4Address("10.0.0.0"))
+SYSTEM_NETWORK = int(IPv4Address("192.0.0.0"))
+
+# Type de requête reconnu dans le foreach immediate-query (premier motif trouvé)
+QUERY_KINDS = [
+    ("lldp/dest-mac/remote-system", "lldp"),
+    ("/isis/interface", "isis"),
+    ("router[router-name='Base']/interface", "interfaces"),
+    ("/lag/port/port-id", "lags"),
+    ("/bgp/neighbor", "bgp"),
+    ("/service/vprn", "vprns"),
+]
+
+GROUP_IN_XPATH = re.compile(r"device-group\[name='([^']+)'\]")
+DEVICE_FILTER = re.compile(r"^/devices/device\[([^\]]*)\]/")
+NAME_IN_FILTER = re.compile(r"(?<![\w-])name='([^']+)'")
+INTERFACE_TARGET = re.compile(
+    r"^/?devices/device=([^/]+)/config/(?:nokia-conf:)?configure/router=([^/]+)/interface=(.+)$"
+)
+
+
+@dataclass
+class FaultInjection:
+    """
+    Latence et erreurs injectées.
+
+    Attributes:
+        latency (float): Latence fixe ajoutée à chaque requête (s)
+        jitter (float): Latence aléatoire supplémentaire, uniforme dans [0, jitter] (s)
+        row_latency (float): Latence par résultat de requête query (s)
+        error_rate (float): Proportion de requêtes en 503
+        hang_rate (float): Proportion de requêtes bloquées hang secondes
+        hang (float): Durée d'une requête bloquée (s)
+        dead_delay (float): Attente avant l'erreur d'un device injoignable (s)
+    """
+    latency: float = 0.0
+    jitter: float = 0.0
+    row_latency: float = 0.0
+    error_rate: float = 0.0
+    hang_rate: float = 0.0
+    hang: float = 60.0
+    dead_delay: float = 0.0
+
+
+@dataclass
+class FakeLink:
+    """Lien point à point entre deux routeurs"""
+    index: int
+    a: int
+    b: int
+    port_a: int
+    port_b: int
+
+    def ip(self, side: int) -> str:
+        return str(IPv4Address(LINK_NETWORK + self.index * 4 + side + 1))
+
+
+# ============================================================
+# SYNTHETIC FLEET
+# ============================================================
+
+@dataclass
+class FakeFleet:
+    """Flotte synthétique : devices, liens, groupes et état de configuration"""
+    size: int = DEFAULT_DEVICES
+    degree: int = DEFAULT_DEGREE
+    prefix: str = "R"
+    group_size: int = GROUP_SIZE
+    ungrouped: int = 0
+    dead_rate: float = 0.0
+    card_failed_rate: float = 0.0
+    card_booting_rate: float = 0.0
+    reboot_time: float = 5.0
+    boot_time: float = 5.0
+    seed: int = 0
+    links: list[FakeLink] = field(default_factory=list, init=False)
+    admin_states: dict[tuple[str, str, str], str] = field(default_factory=dict, init=False)
+    versions: dict[str, int] = field(default_factory=dict, init=False)
+    dead: set[str] = field(default_factory=set, init=False)
+    cards: dict[int, str] = field(default_factory=dict, init=False)
+    rebooting_until: dict[int, float] = field(default_factory=dict, init=False)
+    booting_until: dict[int, float] = field(default_factory=dict, init=False)
+    reboots: dict[int, int] = field(default_factory=dict, init=False)
+
+    def __post_init__(self):
+        self._by_device: dict[int, list[tuple[FakeLink, int]]] = {i: [] for i in range(self.size)}
+        ports = [0] * self.size
+        seen = set()
+        for i in range(self.size):
+            for k in range(1, self.degree // 2 + 1):
+                j = (i + k) % self.size
+                if i == j or (min(i, j), max(i, j)) in seen:
+                    continue
+                seen.add((min(i, j), max(i, j)))
+                ports[i] += 1
+                ports[j] += 1
+                link = FakeLink(len(self.links), i, j, ports[i], ports[j])
+                self.links.append(link)
+                self._by_device[i].append((link, 0))
+                self._by_device[j].append((link, 1))
+
+        rng = random.Random(self.seed)
+        self.dead = {self.name(i) for i in range(self.size) if rng.random() < self.dead_rate}
+        now = time.monotonic()
+        for i in range(self.size):
+            draw = rng.random()
+            if draw < self.card_failed_rate:
+                self.cards[i] = "failed"
+            elif draw < self.card_failed_rate + self.card_booting_rate:
+                self.booting_until[i] = now + self.boot_time
+
+    # ==============================================
+    # Inventaire
+    # ==============================================
+
+    def name(self, index: int) -> str:
+        return f"{self.prefix}{index + 1}"
+
+    def index(self, name: str) -> Optional[int]:
+        if not name.startswith(self.prefix) or not name[len(self.prefix):].isdigit():
+            return None
+        index = int(name[len(self.prefix):]) - 1
+        return index if 0 <= index < self.size else None
+
+    def device_names(self) -> list[str]:
+        return [self.name(i) for i in range(self.size)]
+
+    def groups(self) -> dict[str, list[str]]:
+        """Device-groups de group_size devices ; les ungrouped derniers devices n'ont pas de groupe"""
+        grouped = max(0, self.size - self.ungrouped)
+        return {
+            f"G{start // self.group_size + 1}": [self.name(i) for i in range(start, min(start + self.group_size, grouped))]
+            for start in range(0, grouped, self.group_size)
+        }
+
+    def etag(self, device: str) -> str:
+        return f'"{device}-{self.versions.get(device, 0)}"'
+
+    def select_devices(self, foreach: str) -> list[int]:
+        """Devices visés par le foreach (liste de noms, device-group ou tous)"""
+        group = GROUP_IN_XPATH.search(foreach)
+        if group:
+            members = self.groups().get(group.group(1), [])
+            return [self.index(name) for name in members]
+        match = DEVICE_FILTER.match(foreach)
+        if match is None:
+            return list(range(self.size))
+        indexes = (self.index(name) for name in NAME_IN_FILTER.findall(match.group(1)))
+        return sorted({index for index in indexes if index is not None})
+
+    # ==============================================
+    # Interfaces
+    # ==============================================
+
+    def interfaces(self, i: int) -> Iterator[dict]:
+        """Interfaces de lien d'un device (nom, port, adresses, voisin)"""
+        for link, side in self._by_device[i]:
+            peer = link.b if side == 0 else link.a
+            port = link.port_a if side == 0 else link.port_b
+            peer_port = link.port_b if side == 0 else link.port_a
+            yield {
+                "name": f"to-{self.name(peer)}",
+                "link": link,
+                "side": side,
+                "peer": peer,
+                "port": f"1/1/c{port}/1",
+                "peer_port": f"1/1/c{peer_port}/1",
+                "lag": port % 2 == 0,
+                "lag_id": port,
+            }
+
+    def admin_state(self, device: str, router: str, interface: str) -> str:
+        return self.admin_states.get((device, router, interface), "enable")
+
+    def has_interface(self, device: str, router: str, interface: str) -> bool:
+        index = self.index(device)
+        if index is None or router != "Base":
+            return False
+        return interface == "system" or any(itf["name"] == interface for itf in self.interfaces(index))
+
+    def set_admin_state(self, device: str, router: str, interface: str, state: str) -> None:
+        self.admin_states[(device, router, interface)] = state
+        self.versions[device] = self.versions.get(device, 0) + 1
+
+    # ==============================================
+    # Carte 1
+    # ==============================================
+
+    def is_rebooting(self, i: int) -> bool:
+        return time.monotonic() < self.rebooting_until.get(i, 0.0)
+
+    def card_state(self, i: int) -> str:
+        """État opérationnel de la carte 1 (booting jusqu'à la fin du démarrage)"""
+        if time.monotonic() < self.booting_until.get(i, 0.0):
+            return "booting"
+        return self.cards.get(i, "up")
+
+    def reboot(self, i: int) -> None:
+        """admin reboot now : injoignable, puis carte en démarrage, puis up"""
+        now = time.monotonic()
+        self.rebooting_until[i] = now + self.reboot_time
+        self.booting_until[i] = now + self.reboot_time + self.boot_time
+        self.cards.pop(i, None)
+        self.reboots[i] = self.reboots.get(i, 0) + 1
+
+    @staticmethod
+    def mac(index: int) -> str:
+        return ":".join(f"{byte:02X}" for byte in (0x0C, 0x00, *(index + 1).to_bytes(4, "big")))
+
+    # ==============================================
+    # Résultats immediate-query (label -> valeur)
+    # ==============================================
+
+    def rows(self, kind: str, devices: list[int]) -> Iterator[dict]:
+        for i in devices:
+            device = self.name(i)
+            base = f"/ncs:devices/device{{{device}}}/config/nokia-conf:configure"
+
+            if kind == "interfaces":
+                yield {
+                    "device": device, "name": "system",
+                    "path": f"{base}/router{{Base}}/interface{{system}}",
+                    "address": str(IPv4Address(SYSTEM_NETWORK + i + 1)), "mask": "32",
+                    "admin-state": self.admin_state(device, "Base", "system"),
+                }
+                for itf in self.interfaces(i):
+                    yield {
+                        "device": device, "name": itf["name"],
+                        "path": f"{base}/router{{Base}}/interface{{{itf['name']}}}",
+                        "address": itf["link"].ip(itf["side"]), "mask": "30",
+                        "port": f"lag-{itf['lag_id']}" if itf["lag"] else f"{itf['port']}:0",
+                        "admin-state": self.admin_state(device, "Base", itf["name"]),
+                    }
+
+            elif kind == "lags":
+                for itf in self.interfaces(i):
+                    if itf["lag"]:
+                        yield {
+                            "device": device, "lag-name": f"lag-{itf['lag_id']}",
+                            "admin-state": "enable", "port": itf["port"],
+                        }
+
+            elif kind == "isis":
+                yield {
+                    "device": device, "name": "system", "node-sid": str(i + 1),
+                    "path": f"{base}/router{{Base}}/isis{{0}}/interface{{system}}",
+                }
+                for itf in self.interfaces(i):
+                    yield {
+                        "device": device, "name": itf["name"], "metric": "10",
+                        "adj-sid": str(ADJ_SID_BASE + itf["link"].index * 2 + itf["side"]),
+                        "path": f"{base}/router{{Base}}/isis{{0}}/interface{{{itf['name']}}}",
+                    }
+
+            elif kind == "bgp":
+                for rr in range(min(2, self.size)):
+                    if rr != i:
+                        yield {
+                            "device": device, "ip-address": str(IPv4Address(SYSTEM_NETWORK + rr + 1)),
+                            "group": "RR", "peer-as": "65000", "admin-state": "enable",
+                            "description": self.name(rr),
+                        }
+
+            elif kind == "vprns":
+                yield {
+                    "device": device, "service-name": f"VPRN-{i % 10}",
+                    "service-id": str(1000 + i % 10), "customer": "1", "admin-state": "enable",
+                }
+
+            elif kind == "lldp":
+                for itf in self.interfaces(i):
+                    yield {
+                        "device": device, "local_port": itf["port"], "mac_type": "nearest-bridge",
+                        "index": "1", "chassis_id": self.mac(itf["peer"]),
+                        "remote_port": itf["peer_port"], "system_name": self.name(itf["peer"]),
+                    }
+
+    # ==============================================
+    # Live-status
+    # ==============================================
+
+    def lldp_state(self, i: int) -> dict:
+        """Réponse GET live-status nokia-state:state/port"""
+        return {"nokia-state:port": [
+            {
+                "port-id": itf["port"],
+                "ethernet": {"lldp": {"dest-mac": [{
+                    "mac-type": "nearest-bridge",
+                    "remote-system": [{
+                        "remote-index": 1,
+                        "chassis-id": self.mac(itf["peer"]),
+                        "port-id": itf["peer_port"],
+                        "system-name": self.name(itf["peer"]),
+                    }]
+                }]}}
+            }
+            for itf in self.interfaces(i)
+        ]}
+
+    def cli(self, i: int, command: str) -> str:
+        """Sortie MD-CLI d'une commande live-status"""
+        if command.startswith("show system lldp neighbor"):
+            lines = [
+                "Lcl Port      Scope Remote Chassis ID  Index  Remote Port     Remote Sys Name",
+                "-" * 79,
+            ]
+            for itf in self.interfaces(i):
+                lines.append(
+                    f"{itf['port']:<13} NB    {self.mac(itf['peer'])}  1      "
+                    f"{itf['peer_port']}, 100-* {self.name(itf['peer'])}"
+                )
+            return "\r\n".join(lines) + "\r\n"
+        if command.startswith("show card"):
+            return "\r\n".join([
+                "Slot      Provisioned Type                         Admin Operational   Comments",
+                "          Equipped Type (if different)             State State",
+                "-" * 79,
+                f"1         iom-1                                    up    {self.card_state(i)}",
+                "A         cpm-1                                    up    up/active",
+            ]) + "\r\n"
+        if command.startswith("admin reboot"):
+            self.reboot(i)
+        return ""
+
+
+# ============================================================
+# RESTCONF SERVER
+# ============================================================
+
+def rpc_error(status: int, message: str) -> web.Response:
+    """Erreur RESTCONF au format NSO"""
+    return web.json_response(
+        {"ietf-restconf:errors": {"error": [{"error-type": "application", "error-message": message}]}},
+        status=status
+    )
+
+
+class FakeNSOServer:
+    """Application aiohttp servant la flotte synthétique"""
+
+    def __init__(self, fleet: FakeFleet, faults: Optional[FaultInjection] = None, seed: int = 0):
+        self.fleet = fleet
+        self.faults = faults or FaultInjection()
+        self.random = random.Random(seed)
+        self.requests = 0
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self.inject_faults])
+        data = "/restconf/data/tailf-ncs:devices"
+        app.router.add_post("/restconf/tailf/query", self.query)
+        app.router.add_post("/restconf/tailf/query/", self.query)
+        app.router.add_get(f"{data}/device", self.devices)
+        app.router.add_get(f"{data}/device-group", self.groups)
+        app.router.add_get(f"{data}/device-group={{group}}", self.group)
+        app.router.add_route("HEAD", f"{data}/device={{device}}/config", self.marker)
+        app.router.add_get(f"{data}/device={{device}}/live-status/nokia-state:state/port", self.lldp_state)
+        app.router.add_post(
+            "/restconf/operations/tailf-ncs:devices/device={device}/live-status/global-operations/md-cli-raw-command",
+            self.cli
+        )
+        interface = "/restconf/data/devices/device={device}/config/configure/router={router}/interface={interface}"
+        app.router.add_get(interface, self.get_interface)
+        app.router.add_patch(interface, self.patch_interface)
+        app.router.add_patch("/restconf/data", self.patch_data)
+        return app
+
+    @web.middleware
+    async def inject_faults(self, request: web.Request, handler):
+        self.requests += 1
+        faults = self.faults
+        delay = faults.latency + (self.random.uniform(0, faults.jitter) if faults.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        draw = self.random.random()
+        if draw < faults.error_rate:
+            return rpc_error(503, "Injected error")
+        if draw < faults.error_rate + faults.hang_rate:
+            await asyncio.sleep(faults.hang)
+        return await handler(request)
+
+    async def _device(self, request: web.Request, live: bool = False) -> tuple[Optional[int], Optional[web.Response]]:
+        """Index du device de l'URL, ou réponse d'erreur (inconnu, injoignable)"""
+        device = request.match_info["device"]
+        index = self.fleet.index(device)
+        if index is None:
+            return None, rpc_error(404, f"Device {device} not found")
+        if live and (device in self.fleet.dead or self.fleet.is_rebooting(index)):
+            await asyncio.sleep(self.faults.dead_delay)
+            return None, rpc_error(400, f"Failed to connect to device {device}: connection refused")
+        return index, None
+
+    # ==============================================
+    # immediate-query
+    # ==============================================
+
+    async def query(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        query = body.get("tailf-rest-query:immediate-query", {})
+        foreach = query.get("foreach", "")
+        labels = [selector["label"] for selector in query.get("select", [])]
+        kind = next((kind for pattern, kind in QUERY_KINDS if pattern in foreach), None)
+        devices = self.fleet.select_devices(foreach)
+
+        # Comme NSO, une requête live-status échoue entière si un device est injoignable
+        if kind == "lldp":
+            dead = [self.fleet.name(i) for i in devices if self.fleet.name(i) in self.fleet.dead]
+            if dead:
+                await asyncio.sleep(self.faults.dead_delay)
+                return rpc_error(400, f"Failed to connect to device {dead[0]}: connection refused")
+
+        rows = self.fleet.rows(kind, devices) if kind else iter(())
+        offset = max(int(query.get("offset", 1)), 1) - 1
+        limit = int(query["limit"]) if query.get("limit") else None
+        rows = islice(rows, offset, offset + limit if limit else None)
+
+        response = web.StreamResponse(headers={"Content-Type": "application/yang-data+json"})
+        await response.prepare(request)
+        await response.write(b'{"tailf-rest-query:query-result": {"result": [')
+        first = True
+        while True:
+            batch = list(islice(rows, STREAM_BATCH))
+            if not batch:
+                break
+            if self.faults.row_latency:
+                await asyncio.sleep(self.faults.row_latency * len(batch))
+            items = (json.dumps({"select": [self.field(label, row) for label in labels]}) for row in batch)
+            chunk = ",".join(items)
+            await response.write((("" if first else ",") + chunk).encode())
+            first = False
+        await response.write(b"]}}")
+        await response.write_eof()
+        return response
+
+    @staticmethod
+    def field(label: str, row: dict) -> dict:
+        if label == "path":
+            return {"label": label, "path": row.get("path", "")}
+        return {"label": label, "value": row.get(label, "")}
+
+    # ==============================================
+    # Inventaire et marqueurs
+    # ==============================================
+
+    async def devices(self, request: web.Request) -> web.Response:
+        return web.json_response({"tailf-ncs:device": [
+            {
+                "name": name,
+                "device-type": {"netconf": {"ned-id": "nokia-nc-1.0:nokia-nc-1.0"}},
+                "state": {"admin-state": "unlocked"},
+            }
+            for name in self.fleet.device_names()
+        ]})
+
+    async def groups(self, request: web.Request) -> web.Response:
+        return web.json_response({"tailf-ncs:device-group": [
+            {"name": name, "member": members} for name, members in self.fleet.groups().items()
+        ]})
+
+    async def group(self, request: web.Request) -> web.Response:
+        name = request.match_info["group"]
+        members = self.fleet.groups().get(name)
+        if members is None:
+            return rpc_error(404, f"Device-group {name} not found")
+        return web.json_response({"tailf-ncs:device-group": [{"name": name, "member": members}]})
+
+    async def marker(self, request: web.Request) -> web.Response:
+        _, error = await self._device(request)
+        if error is not None:
+            return web.Response(status=error.status)
+        return web.Response(headers={"ETag": self.fleet.etag(request.match_info["device"])})
+
+    # ==============================================
+    # Live-status
+    # ==============================================
+
+    async def lldp_state(self, request: web.Request) -> web.Response:
+        index, error = await self._device(request, live=True)
+        if error is not None:
+            return error
+        return web.json_response(self.fleet.lldp_state(index))
+
+    async def cli(self, request: web.Request) -> web.Response:
+        index, error = await self._device(request, live=True)
+        if error is not None:
+            return error
+        body = await request.json()
+        command = body.get("input", {}).get("md-cli-input-line", "")
+        return web.json_response({
+            "nokia-oper-global:output": {"results": {"md-cli-output-block": self.fleet.cli(index, command)}}
+        })
+
+    # ==============================================
+    # Configuration des interfaces
+    # ==============================================
+
+    async def get_interface(self, request: web.Request) -> web.Response:
+        device, router, interface = (request.match_info[key] for key in ("device", "router", "interface"))
+        if not self.fleet.has_interface(device, router, interface):
+            return rpc_error(404, "uri keypath not found")
+        return web.json_response({"nokia-conf:interface": [{
+            "interface-name": interface,
+            "admin-state": self.fleet.admin_state(device, router, interface),
+        }]})
+
+    async def patch_interface(self, request: web.Request) -> web.Response:
+        device, router, interface = (request.match_info[key] for key in ("device", "router", "interface"))
+        if not self.fleet.has_interface(device, router, interface):
+            return rpc_error(404, "uri keypath not found")
+        body = await request.json()
+        state = body.get("nokia-conf:interface", {}).get("admin-state")
+        if state not in ("enable", "disable"):
+            return rpc_error(400, f"invalid admin-state: {state}")
+        self.fleet.set_admin_state(device, router, interface, state)
+        return web.Response(status=204)
+
+    @staticmethod
+    def _merge_edits(body: dict) -> list[tuple[str, str, str, Optional[str]]]:
+        """Éditions (device, router, interface, admin-state) d'un PATCH fusionné à la racine"""
+        edits = []
+        for device in body.get("tailf-ncs:devices", {}).get("device", []):
+            configure = device.get("config", {}).get("nokia-conf:configure", {})
+            for router in configure.get("router", []):
+                for interface in router.get("interface", []):
+                    edits.append((device["name"], router["router-name"], interface["interface-name"], interface.get("admin-state")))
+        return edits
+
+    @staticmethod
+    def _yang_patch_edits(body: dict) -> list[tuple[str, str, str, Optional[str]]]:
+        edits = []
+        for edit in body.get("ietf-yang-patch:yang-patch", {}).get("edit", []):
+            match = INTERFACE_TARGET.match(edit.get("target", ""))
+            values = edit.get("value", {}).get("nokia-conf:interface", [{}])
+            state = values[0].get("admin-state") if values else None
+            if match is None:
+                edits.append(("", "", edit.get("target", ""), state))
+            else:
+                edits.append((unquote(match.group(1)), unquote(match.group(2)), unquote(match.group(3)), state))
+        return edits
+
+    async def patch_data(self, request: web.Request) -> web.Response:
+        """Transaction atomique sur plusieurs interfaces (tout ou rien)"""
+        body = await request.json()
+        yang_patch = "yang-patch" in request.content_type
+        edits = self._yang_patch_edits(body) if yang_patch else self._merge_edits(body)
+
+        errors = [
+            (position, f"{interface}: uri keypath not found" if state in ("enable", "disable") else f"invalid admin-state: {state}")
+            for position, (device, router, interface, state) in enumerate(edits, start=1)
+            if not self.fleet.has_interface(device, router, interface) or state not in ("enable", "disable")
+        ]
+        if errors:
+            if not yang_patch:
+                return rpc_error(400, errors[0][1])
+            return web.json_response({"ietf-yang-patch:yang-patch-status": {
+                "patch-id": body["ietf-yang-patch:yang-patch"].get("patch-id"),
+                "edit-status": {"edit": [
+                    {"edit-id": str(position), "errors": {"error": [{"error-type": "application", "error-message": message}]}}
+                    for position, message in errors
+                ]}
+            }}, status=400)
+
+        if request.query.get("dry-run"):
+            diffs: dict[str, list[str]] = {}
+            for device, router, interface, state in edits:
+                if self.fleet.admin_state(device, router, interface) != state:
+                    diffs.setdefault(device, []).append(
+                        f"configure {{\n    router \"{router}\" {{\n        interface \"{interface}\" {{\n"
+                        f"            admin-state {state}\n        }}\n    }}\n}}\n"
+                    )
+            return web.json_response({"dry-run-result": {"native": {"device": [
+                {"name": device, "data": "".join(blocks)} for device, blocks in diffs.items()
+            ]}}})
+
+        for device, router, interface, state in edits:
+            self.fleet.set_admin_state(device, router, interface, state)
+
+        if request.query.get("commit-queue"):
+            return web.json_response({"tailf-restconf:result": {"commit-queue": {
+                "id": int(time.time() * 1000),
+                "status": request.query["commit-queue"]
+            }}})
+        return web.Response(status=204)
+
+
+async def start_server(
+    fleet: FakeFleet,
+    faults: Optional[FaultInjection] = None,
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT
+) -> web.AppRunner:
+    """Démarre le serveur dans la boucle courante (runner.cleanup() pour l'arrêter)"""
+    runner = web.AppRunner(FakeNSOServer(fleet, faults).app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Faux serveur NSO RESTCONF (flotte synthétique)")
+    parser.add_argument("--devices", type=int, default=DEFAULT_DEVICES, help="Nombre de routeurs")
+    parser.add_argument("--degree", type=int, default=DEFAULT_DEGREE, help="Liens par routeur")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="Latence fixe par requête (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Latence aléatoire supplémentaire max (s)")
+    parser.add_argument("--row-latency", type=float, default=0.0, help="Latence par résultat query (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proportion de réponses 503")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Proportion de requêtes bloquées")
+    parser.add_argument("--hang", type=float, default=60.0, help="Durée d'une requête bloquée (s)")
+    parser.add_argument("--dead-rate", type=float, default=0.0, help="Proportion de devices injoignables (live-status)")
+    parser.add_argument("--dead-delay", type=float, default=0.0, help="Attente avant l'erreur d'un device injoignable (s)")
+    parser.add_argument("--card-failed-rate", type=float, default=0.0, help="Proportion de cartes 1 failed")
+    parser.add_argument("--card-booting-rate", type=float, default=0.0, help="Proportion de cartes 1 en démarrage")
+    parser.add_argument("--reboot-time", type=float, default=5.0, help="Durée d'un reboot, device injoignable (s)")
+    parser.add_argument("--boot-time", type=float, default=5.0, help="Durée de démarrage de la carte (s)")
+    parser.add_argument("--ungrouped", type=int, default=0, help="Devices hors device-group")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+async def main(args: argparse.Namespace):
+    """Point d'entrée principal"""
+    fleet = FakeFleet(
+        size=args.devices,
+        degree=args.degree,
+        ungrouped=args.ungrouped,
+        dead_rate=args.dead_rate,
+        card_failed_rate=args.card_failed_rate,
+        card_booting_rate=args.card_booting_rate,
+        reboot_time=args.reboot_time,
+        boot_time=args.boot_time,
+        seed=args.seed
+    )
+    faults = FaultInjection(
+        latency=args.latency,
+        jitter=args.jitter,
+        row_latency=args.row_latency,
+        error_rate=args.error_rate,
+        hang_rate=args.hang_rate,
+        hang=args.hang,
+        dead_delay=args.dead_delay
+    )
+    runner = await start_server(fleet, faults, args.host, args.port)
+    print(f"✓ Faux NSO sur http://{args.host}:{args.port} : {fleet.size} devices, "
+          f"{len(fleet.links)} liens, {len(fleet.dead)} injoignables")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main(build_parser().parse_args()))
+    except KeyboardInterrupt:
+        print("\n✗ Serveur arrêté")
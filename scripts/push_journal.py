@@ -0,0 +1,226 @@
+"""
+Journal d'écriture anticipée (write-ahead journal) pour les imports Neo4j.
+
+L'import est d'abord enregistré dans un fichier JSON Lines local (une requête
+Cypher + ses paramètres par ligne, les batches découpés en chunks), rendu
+durable (fsync + rename atomique), puis rejoué sur Neo4j avec un checkpoint
+après chaque chunk validé. Si Neo4j redémarre pendant l'import, ou n'est pas
+joignable, le journal reste sur disque et la reprise repart du dernier chunk
+validé sans refaire la collecte. Les requêtes étant des MERGE sur les clés
+d'unicité, rejouer un chunk déjà appliqué est sans effet ; les archivages du
+mode historique (CREATE HIST_) sont gardés par le numéro de génération.
+
+Auteur: Marc De Oliveira
+Date: 2025
+"""
+
+import json
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+DEFAULT_JOURNAL_FILE = "7.PUSH_JOURNAL.jsonl"
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _fsync_write(path: Path, content: str) -> None:
+    """Écrit un fichier de façon atomique et durable (tmp + fsync + rename)."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+@dataclass
+class JournalRecorder:
+    """
+    Remplace Neo4jConnection pendant l'enregistrement : même signature query(),
+    mais les requêtes sont journalisées au lieu d'être exécutées.
+
+    Les paramètres 'batch' plus grands que chunk_size sont découpés : chaque
+    chunk devient une entrée du journal, donc une unité de reprise.
+    """
+    journal_id: str
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    entries: List[Dict[str, Any]] = field(default_factory=list)
+    current_step: str = ""
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        """Nomme les entrées enregistrées dans le bloc (affiché au rejeu)."""
+        previous, self.current_step = self.current_step, name
+        try:
+            yield
+        finally:
+            self.current_step = previous
+
+    def _append(self, query: str, parameters: Optional[Dict[str, Any]], db: Optional[str]) -> None:
+        self.entries.append({
+            "seq": len(self.entries) + 1,
+            "step": self.current_step,
+            "query": query,
+            "parameters": parameters or {},
+            "db": db,
+        })
+
+    def query(
+        self,
+        query: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        db: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Journalise la requête (découpée en chunks si batch) et ne retourne aucun résultat."""
+        batch = (parameters or {}).get("batch")
+        if isinstance(batch, list) and len(batch) > self.chunk_size:
+            for start in range(0, len(batch), self.chunk_size):
+                chunk_parameters = dict(parameters)
+                chunk_parameters["batch"] = batch[start:start + self.chunk_size]
+                self._append(query, chunk_parameters, db)
+        else:
+            self._append(query, parameters, db)
+        return []
+
+
+@dataclass
+class PushJournal:
+    """
+    Journal d'import persistant et son checkpoint.
+
+    Attributes:
+        path (Path): Fichier journal JSON Lines (1re ligne = en-tête)
+        chunk_size (int): Nombre de lignes max par entrée de batch
+    """
+    path: Path = Path(DEFAULT_JOURNAL_FILE)
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+
+    def __post_init__(self):
+        self.path = Path(self.path)
+
+    @property
+    def checkpoint_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".checkpoint")
+
+    # ==============================================
+    # Enregistrement
+    # ==============================================
+
+    def recorder(self, journal_id: str) -> JournalRecorder:
+        """Crée un enregistreur pour un nouvel import."""
+        return JournalRecorder(journal_id=journal_id, chunk_size=self.chunk_size)
+
+    def commit(self, recorder: JournalRecorder) -> int:
+        """
+        Rend le journal durable sur disque avant toute écriture Neo4j.
+
+        Returns:
+            int: Nombre d'entrées journalisées
+        """
+        header = {"journal_id": recorder.journal_id, "entries": len(recorder.entries)}
+        lines = [json.dumps(header, ensure_ascii=False)]
+        lines.extend(
+            json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+            for entry in recorder.entries
+        )
+        _fsync_write(self.path, "\n".join(lines) + "\n")
+        self._save_checkpoint(recorder.journal_id, 0)
+        print(f"✓ Journal {self.path} enregistré ({len(recorder.entries)} entrées)")
+        return len(recorder.entries)
+
+    # ==============================================
+    # Checkpoint
+    # ==============================================
+
+    def _save_checkpoint(self, journal_id: str, last_seq: int) -> None:
+        _fsync_write(
+            self.checkpoint_path,
+            json.dumps({"journal_id": journal_id, "last_seq": last_seq})
+        )
+
+    def _load_checkpoint(self, journal_id: str) -> int:
+        """Dernière entrée validée pour ce journal (0 si aucune)."""
+        try:
+            with self.checkpoint_path.open("r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return 0
+        if checkpoint.get("journal_id") != journal_id:
+            return 0
+        return int(checkpoint.get("last_seq", 0))
+
+    def _header(self) -> Optional[Dict[str, Any]]:
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                return json.loads(f.readline())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def pending(self) -> bool:
+        """True si un journal existe et n'a pas été entièrement appliqué."""
+        header = self._header()
+        if header is None:
+            return False
+        return self._load_checkpoint(header["journal_id"]) < header["entries"]
+
+    def discard(self) -> None:
+        """Supprime le journal et son checkpoint."""
+        for path in (self.path, self.checkpoint_path):
+            if path.exists():
+                path.unlink()
+
+    # ==============================================
+    # Rejeu
+    # ==============================================
+
+    def replay(self, neo_connection: Any) -> int:
+        """
+        Applique le journal sur Neo4j depuis le dernier checkpoint.
+
+        Chaque entrée est exécutée dans sa propre transaction implicite ; le
+        checkpoint est écrit dès qu'elle est validée. En cas d'erreur, le
+        journal est conservé et l'exception est propagée.
+
+        Returns:
+            int: Nombre d'entrées appliquées lors de cet appel
+        """
+        header = self._header()
+        if header is None:
+            return 0
+
+        journal_id = header["journal_id"]
+        total = header["entries"]
+        last_seq = self._load_checkpoint(journal_id)
+        if last_seq:
+            print(f"↻ Reprise du journal {journal_id} après l'entrée {last_seq}/{total}")
+
+        applied = 0
+        current_step = None
+        with self.path.open("r", encoding="utf-8") as f:
+            next(f)
+            for line in f:
+                entry = json.loads(line)
+                if entry["seq"] <= last_seq:
+                    continue
+
+                if entry["step"] != current_step:
+                    current_step = entry["step"]
+                    print(f"→ {current_step or 'requêtes'}")
+
+                result = neo_connection.query(
+                    query=entry["query"],
+                    parameters=entry["parameters"],
+                    db=entry["db"]
+                )
+                self._save_checkpoint(journal_id, entry["seq"])
+                applied += 1
+
+                if result and len(result) == 1:
+                    print(f"  ✓ {result[0]}")
+
+        print(f"✓ Journal {journal_id} appliqué ({applied} entrées, {total} au total)")
+        self.discard()
+        return applied
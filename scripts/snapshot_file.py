@@ -0,0 +1,145 @@
+"""
+Snapshot à sections nommées dans un seul fichier compact, avec index de fin.
+
+Format (JSON Lines, une valeur JSON compacte par ligne) :
+    {"format": "sectioned-snapshot", "version": 1}     en-tête
+    <section 1>                                          une ligne par section
+    <section 2>
+    ...
+    {"DEVICE": [offset, taille], "ISIS": [...], ...}     index des sections
+    00000000000000012345                                 position de l'index
+
+Le fichier est écrit en une passe, section après section, sans construire la
+chaîne JSON complète en mémoire (JSONEncoder.iterencode), puis rendu durable
+(fsync + rename atomique). La lecture d'une section ne lit que la fin du
+fichier (position de l'index), l'index, puis les octets de la section : les
+autres sections ne sont ni lues ni parsées.
+
+Auteur: Marc De Oliveira
+Date: 2025
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, BinaryIO, Optional
+
+
+SNAPSHOT_FORMAT = "sectioned-snapshot"
+SNAPSHOT_VERSION = 1
+FOOTER_DIGITS = 20
+FOOTER_SIZE = FOOTER_DIGITS + 1     # Chiffres + saut de ligne
+
+
+class SnapshotWriter:
+    """
+    Écrit les sections d'un snapshot au fil de l'eau.
+
+    Usage:
+        with SnapshotWriter("5.RESULT_NSO_CDB.jsonl") as writer:
+            writer.write_section("DEVICE", devices)
+            writer.write_section("ISIS", isis)
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self.index: dict[str, list[int]] = {}
+        self._encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+        self._file: Optional[BinaryIO] = None
+
+    def __enter__(self) -> "SnapshotWriter":
+        self._file = self.tmp_path.open("wb")
+        self._write_line({"format": SNAPSHOT_FORMAT, "version": SNAPSHOT_VERSION})
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                self._finish()
+        finally:
+            self._file.close()
+            if exc_type is not None:
+                self.tmp_path.unlink(missing_ok=True)
+
+    def _write_line(self, value: Any) -> None:
+        for chunk in self._encoder.iterencode(value):
+            self._file.write(chunk.encode("utf-8"))
+        self._file.write(b"\n")
+
+    def write_section(self, name: str, data: Any) -> None:
+        """Ajoute une section (un nom ne peut être écrit qu'une fois)"""
+        if name in self.index:
+            raise ValueError(f"Section déjà écrite: {name}")
+        offset = self._file.tell()
+        self._write_line(data)
+        self.index[name] = [offset, self._file.tell() - offset]
+
+    def _finish(self) -> None:
+        """Écrit l'index et sa position, puis remplace le fichier de façon atomique"""
+        index_offset = self._file.tell()
+        self._write_line(self.index)
+        self._file.write(f"{index_offset:0{FOOTER_DIGITS}d}\n".encode("ascii"))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        os.replace(self.tmp_path, self.path)
+
+
+class SnapshotReader:
+    """Lecture paresseuse des sections d'un snapshot"""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._index: Optional[dict[str, list[int]]] = None
+
+    @property
+    def index(self) -> dict[str, list[int]]:
+        """Index des sections (lu une seule fois)"""
+        if self._index is None:
+            with self.path.open("rb") as f:
+                header = json.loads(f.readline())
+                if header.get("format") != SNAPSHOT_FORMAT:
+                    raise ValueError(f"{self.path} n'est pas un snapshot à sections")
+                if header.get("version", 0) > SNAPSHOT_VERSION:
+                    raise ValueError(f"Version de snapshot non supportée: {header.get('version')}")
+                f.seek(-FOOTER_SIZE, os.SEEK_END)
+                index_offset = int(f.read(FOOTER_DIGITS))
+                f.seek(index_offset)
+                self._index = json.loads(f.readline())
+        return self._index
+
+    def sections(self) -> list[str]:
+        return list(self.index)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def load(self, name: str, default: Any = None) -> Any:
+        """Charge une seule section (default si absente)"""
+        if name not in self.index:
+            return default
+        offset, size = self.index[name]
+        with self.path.open("rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(size))
+
+    def load_all(self) -> dict[str, Any]:
+        """Charge toutes les sections, dans l'ordre d'écriture"""
+        with self.path.open("rb") as f:
+            sections = {}
+            for name, (offset, size) in self.index.items():
+                f.seek(offset)
+                sections[name] = json.loads(f.read(size))
+            return sections
+
+
+def write_snapshot(path: str | Path, sections: dict[str, Any]) -> None:
+    """Écrit un snapshot complet depuis un dictionnaire {section: données}"""
+    with SnapshotWriter(path) as writer:
+        for name, data in sections.items():
+            writer.write_section(name, data)
+
+
+def load_section(path: str | Path, name: str, default: Any = None) -> Any:
+    """Charge une section d'un snapshot sans lire les autres"""
+    return SnapshotReader(path).load(name, default)
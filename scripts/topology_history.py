@@ -0,0 +1,420 @@
+"""
+Historique temporel de la topologie Neo4j (mode historique de 7.push_ALL_to_neo4j.py).
+
+Chaque import porte un numéro de génération (YYYYMMDDHHMMSS). En mode historique :
+    - les éléments PROD_ vivants portent valid_from (génération d'apparition
+      ou de dernière modification d'une propriété suivie) ;
+    - au lieu d'être supprimés, les éléments disparus sont archivés avec
+      valid_to : les nœuds sont relabellisés HIST_<label> (ils conservent leurs
+      relations), les relations sont recopiées en HIST_<type> ;
+    - une modification d'une propriété suivie archive l'ancienne version.
+
+Seuls les changements créent des versions : l'espace consommé est proportionnel
+au churn et non au nombre d'imports. Les index (valid_from, valid_to) sur les
+labels/types HIST_ permettent les requêtes de voyage dans le temps.
+
+Auteur: Marc De Oliveira
+Date: 2025
+"""
+
+from typing import Any, Dict, List, Optional
+
+
+HISTORY_PREFIX = "HIST_"
+PREVIOUS_PREFIX = "prev_"
+GENERATION_LABEL = "TOPOLOGY_GENERATION"
+
+
+def generation_from_date(date: str) -> int:
+    """Convertit la date d'import ('%Y%m%d-%H%M%S') en numéro de génération."""
+    return int(date.replace("-", ""))
+
+
+def _changed_condition(variable: str, properties: List[str]) -> str:
+    """Condition Cypher vraie si une propriété suivie diffère de sa valeur précédente (null inclus)."""
+    return " OR ".join(
+        f"coalesce(toString({variable}.{PREVIOUS_PREFIX}{prop}), '<null>') "
+        f"<> coalesce(toString({variable}.{prop}), '<null>')"
+        for prop in properties
+    )
+
+
+# ============================================================
+# INDEX
+# ============================================================
+
+def ensure_history_indexes(
+    neo_connection: Any,
+    node_labels: List[str],
+    relationship_types: List[str],
+    database: str = "neo4j"
+) -> None:
+    """Crée les index de validité sur les éléments vivants et archivés."""
+    queries = [
+        f"CREATE INDEX {GENERATION_LABEL}_id IF NOT EXISTS "
+        f"FOR (g:{GENERATION_LABEL}) ON (g.id)"
+    ]
+    for label in node_labels:
+        queries.append(
+            f"CREATE INDEX {label}_valid_from IF NOT EXISTS "
+            f"FOR (n:{label}) ON (n.valid_from)"
+        )
+        queries.append(
+            f"CREATE INDEX {HISTORY_PREFIX}{label}_validity IF NOT EXISTS "
+            f"FOR (n:{HISTORY_PREFIX}{label}) ON (n.valid_from, n.valid_to)"
+        )
+    for rel_type in relationship_types:
+        queries.append(
+            f"CREATE INDEX {rel_type}_valid_from IF NOT EXISTS "
+            f"FOR ()-[r:{rel_type}]-() ON (r.valid_from)"
+        )
+        queries.append(
+            f"CREATE INDEX {HISTORY_PREFIX}{rel_type}_validity IF NOT EXISTS "
+            f"FOR ()-[r:{HISTORY_PREFIX}{rel_type}]-() ON (r.valid_from, r.valid_to)"
+        )
+
+    for query in queries:
+        neo_connection.query(query=query, parameters=None, db=database)
+
+
+# ============================================================
+# VERSIONS DES PROPRIÉTÉS SUIVIES
+# ============================================================
+
+def snapshot_tracked_properties(
+    neo_connection: Any,
+    tracked_nodes: Dict[str, List[str]],
+    tracked_relationships: Dict[str, List[str]],
+    database: str = "neo4j"
+) -> None:
+    """
+    Copie les propriétés suivies dans prev_<propriété> avant l'import.
+
+    À appeler avant les writers, pour que close_changed_versions() puisse
+    détecter les modifications et archiver l'ancienne version.
+    """
+    for label, properties in tracked_nodes.items():
+        assignments = ", ".join(f"n.{PREVIOUS_PREFIX}{p} = n.{p}" for p in properties)
+        neo_connection.query(
+            query=f"MATCH (n:{label}) SET {assignments}",
+            parameters=None,
+            db=database
+        )
+
+    for rel_type, properties in tracked_relationships.items():
+        assignments = ", ".join(f"r.{PREVIOUS_PREFIX}{p} = r.{p}" for p in properties)
+        neo_connection.query(
+            query=f"MATCH ()-[r:{rel_type}]->() SET {assignments}",
+            parameters=None,
+            db=database
+        )
+
+
+def close_changed_versions(
+    neo_connection: Any,
+    tracked_nodes: Dict[str, List[str]],
+    tracked_relationships: Dict[str, List[str]],
+    generation: int,
+    database: str = "neo4j"
+) -> None:
+    """
+    Archive l'ancienne version des éléments dont une propriété suivie a changé.
+
+    La copie HIST_ reçoit les anciennes valeurs et valid_to = generation ;
+    l'élément vivant repart avec valid_from = generation. Les propriétés
+    prev_ sont ensuite retirées.
+
+    Idempotent au rejeu du journal (--resume) : un élément déjà archivé pour
+    cette génération porte valid_from = generation et n'est plus sélectionné,
+    même si ses propriétés prev_ n'ont pas encore été retirées.
+    """
+    for label, properties in tracked_nodes.items():
+        restore = ", ".join(f"h.{p} = n.{PREVIOUS_PREFIX}{p}" for p in properties)
+        cleanup = ", ".join(f"h.{PREVIOUS_PREFIX}{p}" for p in properties)
+        neo_connection.query(
+            query=f"""
+                MATCH (n:{label})
+                WHERE n.delete = false AND n.valid_from < $generation
+                  AND ({_changed_condition('n', properties)})
+                CREATE (h:{HISTORY_PREFIX}{label})
+                SET h = properties(n), {restore}, h.valid_to = $generation
+                REMOVE {cleanup}, h.delete
+                SET n.valid_from = $generation
+            """,
+            parameters={"generation": generation},
+            db=database
+        )
+        neo_connection.query(
+            query=f"MATCH (n:{label}) REMOVE " + ", ".join(f"n.{PREVIOUS_PREFIX}{p}" for p in properties),
+            parameters=None,
+            db=database
+        )
+
+    for rel_type, properties in tracked_relationships.items():
+        restore = ", ".join(f"h.{p} = r.{PREVIOUS_PREFIX}{p}" for p in properties)
+        cleanup = ", ".join(f"h.{PREVIOUS_PREFIX}{p}" for p in properties)
+        neo_connection.query(
+            query=f"""
+                MATCH (a)-[r:{rel_type}]->(b)
+                WHERE r.delete = false AND r.valid_from < $generation
+                  AND ({_changed_condition('r', properties)})
+                CREATE (a)-[h:{HISTORY_PREFIX}{rel_type}]->(b)
+                SET h = properties(r), {restore}, h.valid_to = $generation
+                REMOVE {cleanup}, h.delete
+                SET r.valid_from = $generation
+            """,
+            parameters={"generation": generation},
+            db=database
+        )
+        neo_connection.query(
+            query=f"MATCH ()-[r:{rel_type}]->() REMOVE " + ", ".join(f"r.{PREVIOUS_PREFIX}{p}" for p in properties),
+            parameters=None,
+            db=database
+        )
+
+
+# ============================================================
+# CYCLE DE VIE (APPARITION / DISPARITION)
+# ============================================================
+
+def stamp_new_elements(
+    neo_connection: Any,
+    node_labels: List[str],
+    relationship_types: List[str],
+    generation: int,
+    database: str = "neo4j"
+) -> None:
+    """Positionne valid_from sur les éléments vivants apparus lors de cet import."""
+    for label in node_labels:
+        neo_connection.query(
+            query=f"""
+                MATCH (n:{label})
+                WHERE n.valid_from IS NULL AND n.delete = false
+                SET n.valid_from = $generation
+            """,
+            parameters={"generation": generation},
+            db=database
+        )
+    for rel_type in relationship_types:
+        neo_connection.query(
+            query=f"""
+                MATCH ()-[r:{rel_type}]->()
+                WHERE r.valid_from IS NULL AND r.delete = false
+                SET r.valid_from = $generation
+            """,
+            parameters={"generation": generation},
+            db=database
+        )
+
+
+def close_marked_elements(
+    neo_connection: Any,
+    node_labels: List[str],
+    relationship_types: List[str],
+    generation: int,
+    date: str,
+    database: str = "neo4j"
+) -> tuple:
+    """
+    Équivalent historisé de delete_marked_elements : ferme l'intervalle de validité.
+
+    Les relations marquées delete = true sont recopiées en HIST_<type> puis
+    supprimées ; les nœuds marqués sont relabellisés HIST_<label>. La génération
+    est enregistrée dans un nœud TOPOLOGY_GENERATION.
+
+    Returns:
+        tuple: (relationships_closed, nodes_closed)
+    """
+    executed = False
+    relationships_closed = 0
+    for rel_type in relationship_types:
+        result = neo_connection.query(
+            query=f"""
+                MATCH (a)-[r:{rel_type}]->(b)
+                WHERE r.delete = true
+                CREATE (a)-[h:{HISTORY_PREFIX}{rel_type}]->(b)
+                SET h = properties(r), h.valid_to = $generation
+                REMOVE h.delete
+                DELETE r
+                RETURN count(h) as closed_count
+            """,
+            parameters={"generation": generation},
+            db=database
+        )
+        relationships_closed += result[0]['closed_count'] if result else 0
+        executed = executed or bool(result)
+
+    nodes_closed = 0
+    for label in node_labels:
+        result = neo_connection.query(
+            query=f"""
+                MATCH (n:{label})
+                WHERE n.delete = true
+                REMOVE n:{label}, n.delete
+                SET n:{HISTORY_PREFIX}{label}, n.valid_to = $generation
+                RETURN count(n) as closed_count
+            """,
+            parameters={"generation": generation},
+            db=database
+        )
+        nodes_closed += result[0]['closed_count'] if result else 0
+        executed = executed or bool(result)
+
+    neo_connection.query(
+        query=f"MERGE (g:{GENERATION_LABEL} {{id: $generation}}) SET g.date = $date",
+        parameters={"generation": generation, "date": date},
+        db=database
+    )
+
+    # Pas de résultat lors de l'enregistrement dans le journal
+    if executed:
+        print(f"✓ {relationships_closed} relations archivées (génération {generation})")
+        print(f"✓ {nodes_closed} nœuds archivés (génération {generation})")
+
+    return relationships_closed, nodes_closed
+
+
+# ============================================================
+# VOYAGE DANS LE TEMPS
+# ============================================================
+
+def generation_at(
+    neo_connection: Any,
+    date: str,
+    database: str = "neo4j"
+) -> Optional[int]:
+    """
+    Retourne la dernière génération importée au plus tard à la date donnée
+    (None si la date précède la plus ancienne génération conservée).
+    """
+    result = neo_connection.query(
+        query=f"""
+            MATCH (g:{GENERATION_LABEL})
+            WHERE g.id <= $generation
+            RETURN max(g.id) as generation
+        """,
+        parameters={"generation": generation_from_date(date)},
+        db=database
+    )
+    return result[0]['generation'] if result else None
+
+
+def get_nodes_at(
+    neo_connection: Any,
+    label: str,
+    generation: int,
+    database: str = "neo4j"
+) -> List[Dict[str, Any]]:
+    """Nœuds d'un label tels qu'ils étaient à une génération donnée."""
+    query = f"""
+        MATCH (n:{label})
+        WHERE n.valid_from <= $generation
+        RETURN properties(n) as properties
+        UNION ALL
+        MATCH (n:{HISTORY_PREFIX}{label})
+        WHERE n.valid_from <= $generation AND n.valid_to > $generation
+        RETURN properties(n) as properties
+    """
+    result = neo_connection.query(
+        query=query,
+        parameters={"generation": generation},
+        db=database
+    )
+    return [record['properties'] for record in result]
+
+
+def get_relationships_at(
+    neo_connection: Any,
+    rel_type: str,
+    generation: int,
+    database: str = "neo4j"
+) -> List[Dict[str, Any]]:
+    """
+    Relations d'un type telles qu'elles étaient à une génération donnée.
+
+    Example:
+        >>> g = generation_at(neo, "20251017-230000")
+        >>> links = get_relationships_at(neo, "PROD_ROUTING_LINK", g)
+    """
+    query = f"""
+        MATCH ()-[r:{rel_type}]->()
+        WHERE r.valid_from <= $generation
+        RETURN properties(r) as properties
+        UNION ALL
+        MATCH ()-[r:{HISTORY_PREFIX}{rel_type}]->()
+        WHERE r.valid_from <= $generation AND r.valid_to > $generation
+        RETURN properties(r) as properties
+    """
+    result = neo_connection.query(
+        query=query,
+        parameters={"generation": generation},
+        db=database
+    )
+    return [record['properties'] for record in result]
+
+
+# ============================================================
+# COMPACTION
+# ============================================================
+
+def compact_history(
+    neo_connection: Any,
+    node_labels: List[str],
+    relationship_types: List[str],
+    before_generation: int,
+    database: str = "neo4j"
+) -> tuple:
+    """
+    Supprime les versions archivées fermées avant une génération.
+
+    Les générations antérieures sont supprimées avec leurs versions : leur état
+    ne peut plus être reconstitué, generation_at() retourne donc None pour une
+    date antérieure à la plus ancienne génération conservée. Les requêtes de
+    voyage dans le temps restent exactes pour toute génération conservée.
+
+    Returns:
+        tuple: (relationships_deleted, nodes_deleted)
+    """
+    relationships_deleted = 0
+    for rel_type in relationship_types:
+        result = neo_connection.query(
+            query=f"""
+                MATCH ()-[h:{HISTORY_PREFIX}{rel_type}]->()
+                WHERE h.valid_to <= $generation
+                DELETE h
+                RETURN count(h) as deleted_count
+            """,
+            parameters={"generation": before_generation},
+            db=database
+        )
+        relationships_deleted += result[0]['deleted_count'] if result else 0
+
+    nodes_deleted = 0
+    for label in node_labels:
+        result = neo_connection.query(
+            query=f"""
+                MATCH (h:{HISTORY_PREFIX}{label})
+                WHERE h.valid_to <= $generation
+                DETACH DELETE h
+                RETURN count(h) as deleted_count
+            """,
+            parameters={"generation": before_generation},
+            db=database
+        )
+        nodes_deleted += result[0]['deleted_count'] if result else 0
+
+    # Une génération antérieure n'a plus son historique complet : la supprimer
+    neo_connection.query(
+        query=f"""
+            MATCH (g:{GENERATION_LABEL})
+            WHERE g.id < $generation
+            DELETE g
+        """,
+        parameters={"generation": before_generation},
+        db=database
+    )
+
+    print(f"✓ {relationships_deleted} versions de relations compactées")
+    print(f"✓ {nodes_deleted} versions de nœuds compactées")
+
+    return relationships_deleted, nodes_deleted
@@ -0,0 +1,539 @@
+"""
+Miroir en mémoire (CSR) de la topologie de routage PROD_ROUTER / PROD_ROUTING_LINK.
+
+Le graphe est stocké en Compressed Sparse Row : identifiants entiers pour les
+routeurs, tableaux NumPy pour igp_metric, distance et sr_adjacency_sid. Il est
+construit depuis le snapshot GoBGP (1.RESULT_BGPLS_GRPC_REORGANIZED.json) en
+même temps que l'écriture Neo4j, et sauvegardé dans un fichier .npz que les
+tools de l'agent rechargent pour répondre aux calculs de chemin sans aller-retour
+base de données.
+
+Auteur: Marc De Oliveira
+Date: 2025
+"""
+
+import heapq
+import math
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+# Valeurs par défaut alignées sur la projection GDS (defaultValue: 1.0)
+DEFAULT_WEIGHT = 1.0
+NO_SID = -1
+
+WEIGHT_PROPERTIES = ("igp_metric", "distance")
+
+
+@dataclass
+class RoutingGraphMirror:
+    """
+    Graphe orienté des liens de routage au format CSR.
+
+    Les arcs d'un routeur i sont indices[indptr[i]:indptr[i+1]]. Les mises à
+    jour d'attributs et les suppressions d'arcs se font en place ; les ajouts
+    sont mis en attente et intégrés au prochain compactage (lazy).
+
+    Attributes:
+        names (List[str]): Nom des routeurs, indexé par identifiant entier
+        indptr (np.ndarray): Offsets CSR (taille n+1)
+        indices (np.ndarray): Routeur destination de chaque arc
+        igp_metric (np.ndarray): Métrique IGP de chaque arc
+        distance (np.ndarray): Distance de chaque arc (NaN si inconnue)
+        adj_sid (np.ndarray): SID d'adjacence SR de chaque arc (-1 si absent)
+        active (np.ndarray): Masque des arcs présents
+    """
+    names: List[str] = field(default_factory=list)
+    indptr: np.ndarray = field(default_factory=lambda: np.zeros(1, dtype=np.int64))
+    indices: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int32))
+    igp_metric: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.float64))
+    distance: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.float64))
+    adj_sid: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    active: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=bool))
+    src_ip: List[str] = field(default_factory=list)
+    dest_ip: List[str] = field(default_factory=list)
+    index: Dict[str, int] = field(init=False, repr=False)
+    _pending: Dict[Tuple[int, int], Dict[str, Any]] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self._pending = {}
+
+    # ==============================================
+    # Construction
+    # ==============================================
+
+    @classmethod
+    def from_edges(cls, names: Iterable[str], edges: Iterable[Dict[str, Any]]) -> "RoutingGraphMirror":
+        """
+        Construit le CSR depuis une liste d'arcs.
+
+        Chaque arc est un dict {src, dst, igp_metric, distance, sr_adjacency_sid,
+        src_ip, dest_ip}. Comme le MERGE Neo4j, un seul arc est conservé par
+        couple (src, dst) : le dernier gagne.
+        """
+        mirror = cls(names=list(names))
+        for edge in edges:
+            mirror._pending[mirror._edge_key(edge["src"], edge["dst"])] = edge
+        mirror.compact()
+        return mirror
+
+    @classmethod
+    def from_gobgp(
+        cls,
+        gobgp_database: Dict[str, Any],
+        distances: Optional[List[Dict[str, Any]]] = None
+    ) -> "RoutingGraphMirror":
+        """
+        Construit le miroir depuis le snapshot GoBGP réorganisé par IGP Router ID.
+
+        Args:
+            gobgp_database: Contenu de 1.RESULT_BGPLS_GRPC_REORGANIZED.json
+            distances: Liste [{from, to, distance}] (voir ROUTING_DISTANCES)
+        """
+        return cls.from_edges(*cls.gobgp_edges(gobgp_database, distances))
+
+    @staticmethod
+    def gobgp_edges(
+        gobgp_database: Dict[str, Any],
+        distances: Optional[List[Dict[str, Any]]] = None
+    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Routeurs et arcs (format from_edges) du snapshot GoBGP réorganisé."""
+        routers = gobgp_database.get("routers", {})
+        name_by_igp_id = {
+            igp_router_id: attrs["node_info"]["node_name"]
+            for igp_router_id, attrs in routers.items()
+        }
+        distance_by_pair = {
+            (item["from"], item["to"]): item["distance"]
+            for item in distances or []
+        }
+
+        edges = []
+        for igp_router_id, attrs in routers.items():
+            src = name_by_igp_id[igp_router_id]
+            for link in attrs.get("links", []):
+                dst = name_by_igp_id.get(link["remote_node_igp_router_id"])
+                if dst is None:
+                    continue
+                edges.append({
+                    "src": src,
+                    "dst": dst,
+                    "igp_metric": link.get("igp_metric"),
+                    "distance": distance_by_pair.get((src, dst)),
+                    "sr_adjacency_sid": link.get("sr_adjacency_sid"),
+                    "src_ip": link.get("local_ip"),
+                    "dest_ip": link.get("remote_ip"),
+                })
+
+        return list(name_by_igp_id.values()), edges
+
+    def _node_id(self, name: str) -> int:
+        """Retourne l'identifiant entier d'un routeur, en le créant si besoin."""
+        node_id = self.index.get(name)
+        if node_id is None:
+            node_id = len(self.names)
+            self.names.append(name)
+            self.index[name] = node_id
+        return node_id
+
+    def _edge_key(self, src: str, dst: str) -> Tuple[int, int]:
+        return self._node_id(src), self._node_id(dst)
+
+    def _find_edge(self, src_id: int, dst_id: int) -> Optional[int]:
+        """Position de l'arc actif src -> dst dans le CSR (O(degré))."""
+        if src_id + 1 >= len(self.indptr):
+            return None
+        start, end = self.indptr[src_id], self.indptr[src_id + 1]
+        for position in range(start, end):
+            if self.indices[position] == dst_id and self.active[position]:
+                return int(position)
+        return None
+
+    def compact(self) -> None:
+        """Reconstruit le CSR en intégrant les ajouts en attente et en purgeant les arcs supprimés."""
+        edges: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        for src_id in range(len(self.indptr) - 1):
+            for position in range(self.indptr[src_id], self.indptr[src_id + 1]):
+                if self.active[position]:
+                    edges[(src_id, int(self.indices[position]))] = self._edge_attrs(int(position))
+        edges.update(self._pending)
+        self._pending = {}
+
+        ordered = sorted(edges.items(), key=lambda item: item[0])
+        count = len(ordered)
+        n = len(self.names)
+
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        self.indices = np.empty(count, dtype=np.int32)
+        self.igp_metric = np.empty(count, dtype=np.float64)
+        self.distance = np.empty(count, dtype=np.float64)
+        self.adj_sid = np.empty(count, dtype=np.int64)
+        self.active = np.ones(count, dtype=bool)
+        self.src_ip = []
+        self.dest_ip = []
+
+        for position, ((src_id, dst_id), attrs) in enumerate(ordered):
+            self.indptr[src_id + 1] += 1
+            self.indices[position] = dst_id
+            self._set_edge_attrs(position, attrs)
+            self.src_ip.append(attrs.get("src_ip") or "")
+            self.dest_ip.append(attrs.get("dest_ip") or "")
+
+        np.cumsum(self.indptr, out=self.indptr)
+
+    def _set_edge_attrs(self, position: int, attrs: Dict[str, Any]) -> None:
+        igp_metric = attrs.get("igp_metric")
+        distance = attrs.get("distance")
+        sid = attrs.get("sr_adjacency_sid")
+        self.igp_metric[position] = DEFAULT_WEIGHT if igp_metric is None else float(igp_metric)
+        self.distance[position] = math.nan if distance is None else float(distance)
+        self.adj_sid[position] = NO_SID if sid is None else int(sid)
+
+    def _edge_attrs(self, position: int) -> Dict[str, Any]:
+        distance = float(self.distance[position])
+        sid = int(self.adj_sid[position])
+        return {
+            "igp_metric": float(self.igp_metric[position]),
+            "distance": None if math.isnan(distance) else distance,
+            "sr_adjacency_sid": None if sid == NO_SID else sid,
+            "src_ip": self.src_ip[position],
+            "dest_ip": self.dest_ip[position],
+        }
+
+    # ==============================================
+    # Mises à jour incrémentales
+    # ==============================================
+
+    def upsert_edge(self, src: str, dst: str, **attrs: Any) -> None:
+        """
+        Ajoute ou met à jour l'arc src -> dst.
+
+        Un arc existant est mis à jour en place ; un nouvel arc est mis en attente
+        jusqu'au prochain compactage.
+        """
+        src_id, dst_id = self._edge_key(src, dst)
+        position = self._find_edge(src_id, dst_id)
+        if position is None:
+            merged = self._pending.get((src_id, dst_id), {})
+            merged.update(attrs)
+            self._pending[(src_id, dst_id)] = merged
+            return
+
+        current = self._edge_attrs(position)
+        current.update(attrs)
+        self._set_edge_attrs(position, current)
+        self.src_ip[position] = current.get("src_ip") or ""
+        self.dest_ip[position] = current.get("dest_ip") or ""
+
+    def remove_edge(self, src: str, dst: str) -> bool:
+        """Supprime l'arc src -> dst (masquage en place). Retourne False si absent."""
+        if src not in self.index or dst not in self.index:
+            return False
+        key = (self.index[src], self.index[dst])
+        if self._pending.pop(key, None) is not None:
+            return True
+        position = self._find_edge(*key)
+        if position is None:
+            return False
+        self.active[position] = False
+        return True
+
+    @staticmethod
+    def _normalized_attrs(attrs: Dict[str, Any]) -> Dict[str, Any]:
+        """Attributs d'arc tels que stockés (comparables à _edge_attrs)."""
+        igp_metric = attrs.get("igp_metric")
+        distance = attrs.get("distance")
+        sid = attrs.get("sr_adjacency_sid")
+        return {
+            "igp_metric": DEFAULT_WEIGHT if igp_metric is None else float(igp_metric),
+            "distance": None if distance is None else float(distance),
+            "sr_adjacency_sid": None if sid is None else int(sid),
+            "src_ip": attrs.get("src_ip") or "",
+            "dest_ip": attrs.get("dest_ip") or "",
+        }
+
+    def apply_edges(self, names: Iterable[str], edges: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Amène le miroir à un nouvel état complet des arcs par différence.
+
+        Seuls les arcs modifiés sont touchés : mise à jour en place, ajout en
+        attente, masquage des arcs disparus (upsert_edge / remove_edge). Comme
+        from_edges, le dernier arc d'un couple (src, dst) gagne.
+
+        Returns:
+            dict: Nombre d'arcs added, updated, removed
+        """
+        for name in names:
+            self._node_id(name)
+
+        wanted: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for edge in edges:
+            wanted[(edge["src"], edge["dst"])] = self._normalized_attrs(edge)
+
+        counts = {"added": 0, "updated": 0, "removed": 0}
+        for src_id in range(len(self.indptr) - 1):
+            for position in range(self.indptr[src_id], self.indptr[src_id + 1]):
+                if not self.active[position]:
+                    continue
+                key = (self.names[src_id], self.names[int(self.indices[position])])
+                if key not in wanted:
+                    self.remove_edge(*key)
+                    counts["removed"] += 1
+                elif self._edge_attrs(int(position)) != wanted[key]:
+                    self.upsert_edge(*key, **wanted[key])
+                    counts["updated"] += 1
+                wanted.pop(key, None)
+
+        for (src, dst), attrs in wanted.items():
+            self.upsert_edge(src, dst, **attrs)
+            counts["added"] += 1
+        return counts
+
+    # ==============================================
+    # Calcul de chemins
+    # ==============================================
+
+    def _weights(self, weight_property: str) -> np.ndarray:
+        if weight_property not in WEIGHT_PROPERTIES:
+            raise ValueError(f"Propriété de poids inconnue: {weight_property}")
+        weights = self.igp_metric if weight_property == "igp_metric" else self.distance
+        return np.where(np.isnan(weights), DEFAULT_WEIGHT, weights)
+
+    def shortest_path_tree(
+        self,
+        source: str,
+        weight_property: str = "igp_metric"
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Dijkstra depuis une source sur le CSR.
+
+        Returns:
+            (dist, pred_edge): coût par routeur (inf si injoignable) et position
+            CSR de l'arc prédécesseur (-1 pour la source ou si injoignable)
+        """
+        if self._pending or len(self.indptr) != len(self.names) + 1:
+            self.compact()
+
+        n = len(self.names)
+        dist = np.full(n, np.inf)
+        pred_edge = np.full(n, -1, dtype=np.int64)
+        source_id = self.index[source]
+        dist[source_id] = 0.0
+
+        # Listes Python : l'accès élément par élément aux tableaux NumPy est bien plus lent
+        weights = self._weights(weight_property).tolist()
+        indptr, indices, active = self.indptr.tolist(), self.indices.tolist(), self.active.tolist()
+        best = dist.tolist()
+        pred = pred_edge.tolist()
+        heap = [(0.0, source_id)]
+        while heap:
+            cost, node = heapq.heappop(heap)
+            if cost > best[node]:
+                continue
+            for position in range(indptr[node], indptr[node + 1]):
+                if not active[position]:
+                    continue
+                neighbor = indices[position]
+                new_cost = cost + weights[position]
+                if new_cost < best[neighbor]:
+                    best[neighbor] = new_cost
+                    pred[neighbor] = position
+                    heapq.heappush(heap, (new_cost, neighbor))
+
+        return np.array(best), np.array(pred, dtype=np.int64)
+
+    def edge_sources(self) -> np.ndarray:
+        """Routeur source de chaque arc CSR (vectorisé)"""
+        return np.repeat(np.arange(len(self.names), dtype=np.int64), np.diff(self.indptr))
+
+    def reverse_index(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Transposée du CSR : les arcs entrants du routeur i sont les positions
+        order[rev_indptr[i]:rev_indptr[i+1]].
+
+        Returns:
+            (rev_indptr, order)
+        """
+        order = np.argsort(self.indices, kind="stable")
+        rev_indptr = np.zeros(len(self.names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=len(self.names)), out=rev_indptr[1:])
+        return rev_indptr, order
+
+    def distances_to(self, target: str, weight_property: str = "igp_metric") -> np.ndarray:
+        """
+        Dijkstra inverse : coût du plus court chemin de chaque routeur vers target.
+
+        Les arcs sont parcourus à rebours via la transposée du CSR (arcs
+        masqués ignorés), sans modifier le miroir.
+        """
+        if self._pending or len(self.indptr) != len(self.names) + 1:
+            self.compact()
+
+        rev_indptr, order = self.reverse_index()
+        sources = self.edge_sources()
+        dist = [math.inf] * len(self.names)
+        target_id = self.index[target]
+        dist[target_id] = 0.0
+
+        weights = self._weights(weight_property).tolist()
+        active = self.active.tolist()
+        rev_indptr, order, sources = rev_indptr.tolist(), order.tolist(), sources.tolist()
+        heap = [(0.0, target_id)]
+        while heap:
+            cost, node = heapq.heappop(heap)
+            if cost > dist[node]:
+                continue
+            for slot in range(rev_indptr[node], rev_indptr[node + 1]):
+                position = order[slot]
+                if not active[position]:
+                    continue
+                neighbor = sources[position]
+                new_cost = cost + weights[position]
+                if new_cost < dist[neighbor]:
+                    dist[neighbor] = new_cost
+                    heapq.heappush(heap, (new_cost, neighbor))
+
+        return np.array(dist)
+
+    def _edge_source(self, position: int) -> int:
+        return int(np.searchsorted(self.indptr, position, side="right") - 1)
+
+    def path_edges(self, pred_edge: np.ndarray, target_id: int) -> List[int]:
+        """Reconstruit la liste ordonnée des arcs CSR menant à target_id."""
+        edges = []
+        node = target_id
+        while pred_edge[node] != -1:
+            position = int(pred_edge[node])
+            edges.append(position)
+            node = self._edge_source(position)
+        edges.reverse()
+        return edges
+
+    def segment(self, position: int) -> Dict[str, Any]:
+        """Propriétés d'un arc au format de la relation PROD_ROUTING_LINK."""
+        attrs = self._edge_attrs(position)
+        segment = {
+            "igp_metric": int(attrs["igp_metric"]),
+            "sr_adjacency_sid": attrs["sr_adjacency_sid"],
+            "src_rtr": self.names[self._edge_source(position)],
+            "dest_rtr": self.names[int(self.indices[position])],
+            "src_ip": attrs["src_ip"],
+            "dest_ip": attrs["dest_ip"],
+        }
+        if attrs["distance"] is not None:
+            segment["distance"] = int(attrs["distance"])
+        return segment
+
+    def edge_columns(self, weight_property: str = "igp_metric") -> Dict[str, np.ndarray]:
+        """
+        Colonnes des arcs actifs, prêtes pour une construction GDS (gds.graph.construct).
+
+        Returns:
+            dict: sourceNodeId, targetNodeId (identifiants entiers du miroir),
+                  weight, igp_metric, distance (valeurs par défaut de la projection)
+        """
+        if self._pending or len(self.indptr) != len(self.names) + 1:
+            self.compact()
+
+        sources = self.edge_sources()
+        active = self.active
+        return {
+            "sourceNodeId": sources[active],
+            "targetNodeId": self.indices[active].astype(np.int64),
+            "weight": self._weights(weight_property)[active],
+            "igp_metric": self.igp_metric[active],
+            "distance": np.nan_to_num(self.distance[active], nan=0.0),
+        }
+
+    def path_segments(self, node_names: List[str], weight_property: str = "igp_metric") -> List[Dict[str, Any]]:
+        """
+        Segments d'un chemin donné par ses routeurs (calculé hors du miroir).
+
+        Entre deux routeurs reliés par plusieurs arcs, l'arc de poids minimal
+        est retenu, comme le ferait Dijkstra.
+        """
+        weights = self._weights(weight_property)
+        segments = []
+        for src, dst in zip(node_names, node_names[1:]):
+            src_id, dst_id = self.index[src], self.index[dst]
+            best = None
+            for position in range(self.indptr[src_id], self.indptr[src_id + 1]):
+                if self.indices[position] != dst_id or not self.active[position]:
+                    continue
+                if best is None or weights[position] < weights[best]:
+                    best = position
+            if best is None:
+                raise ValueError(f"Lien absent du miroir: {src} -> {dst}")
+            segments.append(self.segment(int(best)))
+        return segments
+
+    def shortest_path(
+        self,
+        start_node: str,
+        end_node: str,
+        weight_property: str = "igp_metric"
+    ) -> Dict[str, Any]:
+        """
+        Plus court chemin entre deux routeurs.
+
+        Returns:
+            dict: Même format que NetworkTools._calculate_shortest_path_data
+                  ({total_cost, node_names, segments} ou {error})
+        """
+        for name in (start_node, end_node):
+            if name not in self.index:
+                return {"error": f"Routeur inconnu: {name}"}
+
+        dist, pred_edge = self.shortest_path_tree(start_node, weight_property)
+        target_id = self.index[end_node]
+        if math.isinf(dist[target_id]):
+            return {"error": f"Aucun chemin trouvé entre {start_node} et {end_node}"}
+
+        edges = self.path_edges(pred_edge, target_id)
+        node_names = [start_node] + [self.names[int(self.indices[e])] for e in edges]
+        return {
+            "total_cost": float(dist[target_id]),
+            "node_names": node_names,
+            "segments": [self.segment(e) for e in edges],
+        }
+
+    # ==============================================
+    # Persistance
+    # ==============================================
+
+    def save(self, filename: Path | str) -> None:
+        """Sauvegarde le miroir compacté dans un fichier .npz."""
+        if self._pending or not self.active.all():
+            self.compact()
+        np.savez_compressed(
+            filename,
+            names=np.array(self.names, dtype=str),
+            indptr=self.indptr,
+            indices=self.indices,
+            igp_metric=self.igp_metric,
+            distance=self.distance,
+            adj_sid=self.adj_sid,
+            src_ip=np.array(self.src_ip, dtype=str),
+            dest_ip=np.array(self.dest_ip, dtype=str),
+        )
+        print(f"✓ Miroir de routage sauvegardé dans {filename}")
+
+    @classmethod
+    def load(cls, filename: Path | str) -> "RoutingGraphMirror":
+        """Charge un miroir sauvegardé par save()."""
+        with np.load(filename, allow_pickle=False) as data:
+            return cls(
+                names=data["names"].tolist(),
+                indptr=data["indptr"],
+                indices=data["indices"],
+                igp_metric=data["igp_metric"],
+                distance=data["distance"],
+                adj_sid=data["adj_sid"],
+                active=np.ones(len(data["indices"]), dtype=bool),
+                src_ip=data["src_ip"].tolist(),
+                dest_ip=data["dest_ip"].tolist(),
+            )